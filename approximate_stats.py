@@ -0,0 +1,211 @@
+"""
+Sampling-based global statistics with confidence intervals.
+
+Green fraction, green color std and mean local variance are averages over
+every pixel. On huge scenes a stratified block sample estimates them at a
+fraction of the cost. The image is cut into a lattice of non-overlapping
+blocks, the lattice into square strata of blocks, and each stratum's
+blocks are drawn at random without replacement, the same share in every
+stratum but at least two blocks. Small strata along the image edges
+therefore measure a larger share of their pixels. Each drawn block is
+measured exactly, with enough context around it for the local variance.
+Stratum totals are the drawn block totals scaled by blocks / drawn blocks,
+which keeps the estimate unbiased despite the uneven shares; with a sample
+fraction of 1 every block is drawn and the result is exact.
+
+Confidence intervals are normal intervals from the without-replacement
+variance of the stratified estimate, with the finite population
+correction, after linearizing each statistic around the estimated totals.
+The within-stratum variance is pooled over strata, since a few blocks per
+stratum give too noisy a variance on their own. RobustCemeteryDetector
+computes every pixel instead when the score interval straddles a decision
+threshold.
+
+Usage:
+    python approximate_stats.py scene.png --fraction 0.05
+"""
+
+import argparse
+import os
+import time
+from collections import namedtuple
+from statistics import NormalDist
+
+import cv2
+import numpy as np
+
+from color_statistics import masked_color_statistics
+from image_loading import decode_image
+
+StatisticEstimate = namedtuple('StatisticEstimate', ['value', 'lower', 'upper', 'exact'])
+
+STATISTICS = ('green_percentage', 'color_std', 'mean_variance')
+
+# Score thresholds the interpretation is based on (HIGH >= 0.7, MEDIUM >= 0.4)
+DECISION_THRESHOLDS = (0.4, 0.7)
+
+# Images smaller than this are always measured exactly
+MIN_SAMPLED_PIXELS = 4_000_000
+
+# Per-block totals: pixels, green count, green channel sums and square sums,
+# local variance sum
+_PIXELS, _GREEN, _SUMS, _SQUARES, _VARIANCE = 0, 1, slice(2, 5), slice(5, 8), 8
+_TOTALS = 9
+
+def _local_variance(img_gray, variance_window):
+    kernel = np.ones((variance_window, variance_window), np.float32) / (variance_window * variance_window)
+    img_float = img_gray.astype(np.float32)
+    local_mean = cv2.filter2D(img_float, -1, kernel)
+    return cv2.filter2D(img_float * img_float, -1, kernel) - local_mean * local_mean
+
+def _statistics(totals):
+    """The statistics from (..., _TOTALS) summed totals"""
+    pixels, green = totals[..., _PIXELS], totals[..., _GREEN]
+    safe_green = np.maximum(green, 1)[..., None]
+    mean = totals[..., _SUMS] / safe_green
+    std = np.sqrt(np.maximum(totals[..., _SQUARES] / safe_green - mean * mean, 0))
+    return {
+        'green_percentage': green / pixels,
+        'color_std': np.where(green > 0, std.mean(axis=-1), 0.0),
+        'mean_variance': totals[..., _VARIANCE] / pixels
+    }
+
+def _gradients(totals):
+    """{name: d statistic / d totals} at the given totals, by central differences"""
+    steps = np.maximum(np.abs(totals), 1.0) * 1e-6
+    shifted = totals + np.diag(steps)[:, None] * np.array([1.0, -1.0])[None, :, None]
+    values = _statistics(shifted)
+    return {name: (values[name][:, 0] - values[name][:, 1]) / (2 * steps) for name in STATISTICS}
+
+def exact_statistics(img_rgb, img_gray, variance_window=9):
+    """The statistics over every pixel, as exact StatisticEstimates"""
+    stats = masked_color_statistics(img_rgb)
+    values = {
+        'green_percentage': stats['green_fraction'],
+        'color_std': float(np.mean(stats['std'])),
+        'mean_variance': float(np.mean(_local_variance(img_gray, variance_window)))
+    }
+    return {name: StatisticEstimate(value, value, value, True) for name, value in values.items()}
+
+class SampledStatistics:
+    """Stratified block-sample estimates of whole-image statistics"""
+
+    def __init__(self, sample_fraction=0.05, block_size=64, per_stratum=4, confidence=0.95,
+                 variance_window=9, seed=0, min_pixels=MIN_SAMPLED_PIXELS):
+        if not 0 < sample_fraction <= 1:
+            raise ValueError(f"Sample fraction must be in (0, 1], got {sample_fraction}")
+        if per_stratum < 2:
+            raise ValueError("At least two blocks per stratum are needed for an interval")
+        self.sample_fraction = sample_fraction
+        self.block_size = block_size
+        self.per_stratum = per_stratum
+        self.confidence = confidence
+        self.variance_window = variance_window
+        self.seed = seed
+        self.min_pixels = min_pixels
+        # Side, in blocks, of a square stratum holding per_stratum drawn blocks
+        self.stratum_blocks = max(int(round(np.sqrt(per_stratum / sample_fraction))), 1)
+
+    def sample_blocks(self, shape):
+        """[(blocks in stratum, drawn block origins as an n x 2 array)] per stratum.
+
+        Blocks tile the image without overlap (the last row and column may be
+        smaller). Every stratum draws the same share of its blocks, at least
+        two (or all of them), without replacement.
+        """
+        height, width = shape
+        block = self.block_size
+        rows, cols = -(-height // block), -(-width // block)
+        rng = np.random.default_rng(self.seed)
+        strata = []
+        for row0 in range(0, rows, self.stratum_blocks):
+            for col0 in range(0, cols, self.stratum_blocks):
+                stratum_rows = np.arange(row0, min(row0 + self.stratum_blocks, rows))
+                stratum_cols = np.arange(col0, min(col0 + self.stratum_blocks, cols))
+                count = stratum_rows.size * stratum_cols.size
+                drawn = min(count, max(int(round(self.sample_fraction * count)), 2))
+                picks = rng.choice(count, drawn, replace=False)
+                origins = np.stack([stratum_rows[picks // stratum_cols.size],
+                                    stratum_cols[picks % stratum_cols.size]], axis=1) * block
+                strata.append((count, origins))
+        return strata
+
+    def _block_totals(self, img_rgb, img_gray, y, x):
+        """Exact totals for one lattice block, with context for the local variance"""
+        height, width = img_gray.shape
+        y1, x1 = min(y + self.block_size, height), min(x + self.block_size, width)
+        totals = np.zeros(_TOTALS)
+        totals[_PIXELS] = (y1 - y) * (x1 - x)
+
+        stats = masked_color_statistics(img_rgb[y:y1, x:x1])
+        count = stats['green_count']
+        totals[_GREEN] = count
+        totals[_SUMS] = stats['mean'] * count
+        totals[_SQUARES] = (stats['std'] ** 2 + stats['mean'] ** 2) * count
+
+        context = self.variance_window // 2
+        wy0, wx0 = max(y - context, 0), max(x - context, 0)
+        wy1, wx1 = min(y1 + context, height), min(x1 + context, width)
+        window = img_gray[wy0:wy1, wx0:wx1]
+        inner = (slice(y - wy0, y1 - wy0), slice(x - wx0, x1 - wx0))
+        totals[_VARIANCE] = np.sum(_local_variance(window, self.variance_window)[inner], dtype=np.float64)
+        return totals
+
+    def estimate(self, img_rgb, img_gray):
+        """{name: StatisticEstimate} from a stratified block sample.
+
+        Images below min_pixels are measured exactly.
+        """
+        if img_gray.size < self.min_pixels:
+            return exact_statistics(img_rgb, img_gray, self.variance_window)
+
+        strata = self.sample_blocks(img_gray.shape)
+        samples = [(count, np.array([self._block_totals(img_rgb, img_gray, y, x) for y, x in origins]))
+                   for count, origins in strata]
+        totals = sum(count * blocks.mean(axis=0) for count, blocks in samples)
+        values = _statistics(totals)
+        exact = all(len(blocks) == count for count, blocks in samples)
+
+        # Variance of each statistic's linearization. A few blocks give a very
+        # noisy variance per stratum, so the within-stratum variance is pooled
+        # over all strata and scaled by each stratum's design factor.
+        gradients = _gradients(totals)
+        design = sum(count * count * (1 - len(blocks) / count) / len(blocks) for count, blocks in samples)
+        freedom = sum(len(blocks) - 1 for _, blocks in samples)
+        z = NormalDist().inv_cdf(0.5 + self.confidence / 2)
+        estimates = {}
+        for name in STATISTICS:
+            value = float(values[name])
+            linear = [blocks @ gradients[name] for _, blocks in samples]
+            residuals = sum(np.sum((block_values - block_values.mean()) ** 2) for block_values in linear)
+            margin = z * np.sqrt(design * residuals / freedom) if freedom else 0.0
+            estimates[name] = StatisticEstimate(value, max(value - margin, 0.0), value + margin, exact)
+        return estimates
+
+def main():
+    parser = argparse.ArgumentParser(description="Estimate global image statistics from a stratified sample")
+    parser.add_argument('image', help="Image to analyze")
+    parser.add_argument('--fraction', type=float, default=0.05, help="Share of pixels to sample")
+    parser.add_argument('--exact', action='store_true', help="Also compute the exact values")
+    args = parser.parse_args()
+
+    img_rgb, img_gray = decode_image(args.image)
+    sampler = SampledStatistics(args.fraction)
+
+    start = time.perf_counter()
+    estimates = sampler.estimate(img_rgb, img_gray)
+    elapsed = time.perf_counter() - start
+    print(f"🎲 {os.path.basename(args.image)}: sampled estimates in {elapsed:.2f}s")
+    for name, estimate in estimates.items():
+        print(f"   • {name}: {estimate.value:.4f} [{estimate.lower:.4f}, {estimate.upper:.4f}]")
+
+    if args.exact:
+        start = time.perf_counter()
+        exact = exact_statistics(img_rgb, img_gray, sampler.variance_window)
+        elapsed = time.perf_counter() - start
+        print(f"📐 Exact values in {elapsed:.2f}s")
+        for name, estimate in exact.items():
+            print(f"   • {name}: {estimate.value:.4f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+"""
+Batch scoring with per-image time budgets.
+
+Each image is scored in a worker process that the runner can kill. A worker
+that exceeds the per-image timeout is terminated and replaced, so one
+pathological input (a HoughLines call on a noisy edge map, a contour search
+on a speckled threshold) cannot stall the rest of the run. Failures,
+timeouts and crashed workers become structured error rows in the
+ResultsStore instead of silent zero scores. Images that time out, crash or
+run out of memory can optionally be retried once at a reduced resolution.
+Workers build their detector before taking work, so import and setup time
+does not count against the first image's budget.
+
+Usage:
+    python batch_runner.py images/*.png --detector robust --timeout 60 --retry-downsample 2
+"""
+
+import argparse
+import multiprocessing
+import os
+import time
+from collections import deque
+from multiprocessing.connection import wait
+
+from dedup import image_duplicate_groups
+from ground_scale import GroundScale
+from pyramid_cache import file_content_hash
+from results_store import ResultsStore, DEFAULT_STORE_PATH
+
+# Seconds between timeout checks while waiting for results
+POLL_INTERVAL = 0.5
+
+# Sent by a worker once its detector is built
+READY = 'ready'
+
+def create_detector(detector_name, gsd=None, downsample=1):
+    """Detector instance for a name used in the results store"""
+    if detector_name == 'robust':
+        from final_cemetery_detector import RobustCemeteryDetector
+        return RobustCemeteryDetector(gsd, downsample)
+    if detector_name == 'simple':
+        from simple_cemetery_detector import SimpleCemeteryDetector
+        return SimpleCemeteryDetector(gsd, downsample)
+    if detector_name == 'cemetery':
+        from cemetery_detector import CemeteryDetector
+        return CemeteryDetector(gsd, downsample)
+    raise ValueError(f"Unknown detector: {detector_name}")
+
+def _worker_loop(conn, detector_name, gsd, downsample):
+    """Worker process: build the detector, report ready over conn, then
+    score images sent over conn until told to stop"""
+    detectors = {}
+    try:
+        detectors[downsample] = create_detector(detector_name, gsd, downsample)
+    except Exception:
+        pass  # the first task rebuilds it and reports the error
+    conn.send(READY)
+    while True:
+        task = conn.recv()
+        if task is None:
+            break
+        index, image_path, downsample = task
+        start = time.perf_counter()
+        content_hash = None
+        try:
+            content_hash = file_content_hash(image_path)
+            if downsample not in detectors:
+                detectors[downsample] = create_detector(detector_name, gsd, downsample)
+            score, features, _ = detectors[downsample].calculate_cemetery_score(image_path,
+                                                                                raise_errors=True)
+            result = ('ok', float(score), {key: float(value) for key, value in features.items()}, None)
+        except Exception as e:
+            result = ('error', None, {}, f"{type(e).__name__}: {e}")
+        conn.send((index,) + result + (time.perf_counter() - start, content_hash))
+
+class _Worker:
+    """One worker process and the task it is running"""
+
+    def __init__(self, context, detector_name, gsd, downsample):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_loop,
+                                       args=(child_conn, detector_name, gsd, downsample), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.ready = False
+        self.task = None
+        self.started = None
+        self.completed = 0
+
+    def assign(self, task):
+        self.task = task
+        self.started = time.monotonic()
+        self.conn.send(task[:3])
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(1)
+        self.kill()
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(1)
+            if self.process.is_alive():
+                self.process.kill()
+                self.process.join()
+        self.conn.close()
+
+class BatchRunner:
+    """Score many images with a per-image timeout and worker recycling.
+
+    Workers are replaced after a timeout or crash, and after
+    max_tasks_per_worker images if set. With retry_downsample, images that
+    time out, crash or raise MemoryError are retried once at that
+    downsample factor. With
+    dedup_distance, only one image per group of perceptual-hash
+    near-duplicates (confirmed by a detail check, see dedup) is scored and
+    the others take its result.
+    """
+
+    def __init__(self, detector_name='robust', timeout=60.0, max_workers=None, gsd=None,
+                 downsample=1, retry_downsample=None, max_tasks_per_worker=None, store=None,
+                 dedup_distance=None):
+        self.detector_name = detector_name
+        self.timeout = timeout
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.gsd = gsd
+        self.downsample = downsample
+        self.retry_downsample = retry_downsample
+        self.max_tasks_per_worker = max_tasks_per_worker
+        self.store = store
+        self.dedup_distance = dedup_distance
+
+    def run(self, image_paths):
+        """Score all images, returning one result dict per image in input order.
+
+        Each result has image, status ('ok', 'error', 'timeout' or
+        'crashed'), score, features, message, elapsed, downsample, attempts
+        and content_hash (blake2b of the file, None if it could not be read),
+        plus duplicate_of: the image whose result was copied, or None.
+        """
+        context = multiprocessing.get_context()
+        if self.dedup_distance is not None:
+            representatives = image_duplicate_groups(image_paths, self.dedup_distance, self.max_workers)
+        else:
+            representatives = list(range(len(image_paths)))
+        # Tasks are (index, image_path, downsample, attempt)
+        pending = deque((index, path, self.downsample, 1) for index, path in enumerate(image_paths)
+                        if representatives[index] == index)
+        results = [None] * len(image_paths)
+        workers = []
+
+        def new_worker():
+            return _Worker(context, self.detector_name, self.gsd, self.downsample)
+
+        def finish(task, status, score, features, message, elapsed, content_hash=None):
+            index, path, downsample, attempt = task
+            out_of_memory = status == 'error' and message.startswith('MemoryError')
+            if ((status in ('timeout', 'crashed') or out_of_memory)
+                    and self.retry_downsample and attempt == 1):
+                retry = downsample * self.retry_downsample
+                print(f"⏱️  {os.path.basename(path)}: {status}, retrying at 1/{retry:g} resolution")
+                pending.append((index, path, retry, attempt + 1))
+                return
+            if status == 'ok' and attempt > 1:
+                message = f"scored at 1/{downsample:g} resolution after a retry"
+            results[index] = {
+                'image': path,
+                'status': status,
+                'score': score,
+                'features': features,
+                'message': message,
+                'elapsed': elapsed,
+                'downsample': downsample,
+                'attempts': attempt,
+                'content_hash': content_hash,
+                'duplicate_of': None
+            }
+            if self.store is not None:
+                self.store.save_result(path, self.detector_name, score, features, status=status,
+                                       message=message, content_hash=content_hash, commit=False,
+                                       gsd=GroundScale(self.gsd).source_gsd, downsample=downsample)
+            icon = "✅" if status == 'ok' else "❌"
+            detail = f"score {score:.4f}" if status == 'ok' else message
+            print(f"{icon} {os.path.basename(path)}: {detail} ({elapsed:.1f}s)")
+
+        try:
+            workers = [new_worker() for _ in range(min(self.max_workers, len(pending)))]
+
+            while pending or any(worker.task is not None for worker in workers):
+                # Hand out work to idle workers; the time budget starts once
+                # a worker has reported ready
+                for worker in workers:
+                    if worker.ready and worker.task is None and pending:
+                        worker.assign(pending.popleft())
+
+                busy = [worker for worker in workers if worker.task is not None or not worker.ready]
+                ready = wait([worker.conn for worker in busy], timeout=POLL_INTERVAL)
+
+                for i, worker in enumerate(workers):
+                    if not worker.ready:
+                        if worker.conn in ready:
+                            try:
+                                worker.ready = worker.conn.recv() == READY
+                            except EOFError:
+                                worker.kill()
+                                workers[i] = new_worker()
+                        continue
+                    if worker.task is None:
+                        continue
+                    task = worker.task
+                    elapsed = time.monotonic() - worker.started
+
+                    if worker.conn in ready:
+                        try:
+                            _, status, score, features, message, elapsed, content_hash = worker.conn.recv()
+                        except EOFError:
+                            # The process died mid-task (e.g. killed for memory)
+                            worker.kill()
+                            workers[i] = new_worker()
+                            finish(task, 'crashed', None, {}, "Worker process exited unexpectedly",
+                                   elapsed)
+                            continue
+                        worker.task = None
+                        worker.completed += 1
+                        finish(task, status, score, features, message, elapsed, content_hash)
+                        if self.max_tasks_per_worker and worker.completed >= self.max_tasks_per_worker:
+                            worker.stop()
+                            workers[i] = new_worker()
+
+                    elif self.timeout is not None and elapsed > self.timeout:
+                        worker.kill()
+                        workers[i] = new_worker()
+                        finish(task, 'timeout', None, {}, f"Exceeded {self.timeout:g}s time budget",
+                               elapsed)
+
+            # Near-duplicates take the result of their group's representative
+            copied = 0
+            for index, representative in enumerate(representatives):
+                if representative == index:
+                    continue
+                source, path = results[representative], image_paths[index]
+                note = f"duplicate of {os.path.basename(source['image'])}"
+                message = f"{source['message']} ({note})" if source['message'] else note
+                try:
+                    content_hash = file_content_hash(path)
+                except OSError:
+                    content_hash = None
+                results[index] = dict(source, image=path, message=message, elapsed=0.0, attempts=0,
+                                      content_hash=content_hash, duplicate_of=source['image'])
+                if self.store is not None:
+                    self.store.save_result(path, self.detector_name, source['score'], source['features'],
+                                           status=source['status'], message=message,
+                                           content_hash=content_hash, commit=False,
+                                           gsd=GroundScale(self.gsd).source_gsd,
+                                           downsample=source['downsample'], duplicate_of=source['image'])
+                copied += 1
+            if copied:
+                print(f"♻️  {copied} near-duplicate image(s) took their representative's result")
+        finally:
+            for worker in workers:
+                worker.stop()
+            if self.store is not None:
+                self.store.commit()
+
+        return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Score images with per-image time budgets")
+    parser.add_argument('images', nargs='+', help="Images to analyze")
+    parser.add_argument('--detector', choices=['robust', 'simple', 'cemetery'], default='robust')
+    parser.add_argument('--timeout', type=float, default=60.0, help="Seconds allowed per image")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument('--gsd', type=float, default=None, help="Ground sample distance in meters/pixel")
+    parser.add_argument('--retry-downsample', type=float, default=None,
+                        help="Retry timed-out, crashed or out-of-memory images once at this factor")
+    parser.add_argument('--max-tasks-per-worker', type=int, default=None,
+                        help="Replace each worker after this many images")
+    parser.add_argument('--dedup-distance', type=int, default=None,
+                        help="Score one image per group of near-duplicates within this hash distance")
+    parser.add_argument('--db', default=DEFAULT_STORE_PATH, help="Results database")
+    args = parser.parse_args()
+
+    with ResultsStore(args.db) as store:
+        runner = BatchRunner(args.detector, args.timeout, args.workers, args.gsd,
+                             retry_downsample=args.retry_downsample,
+                             max_tasks_per_worker=args.max_tasks_per_worker, store=store,
+                             dedup_distance=args.dedup_distance)
+        start = time.perf_counter()
+        results = runner.run(args.images)
+        elapsed = time.perf_counter() - start
+
+    counts = {}
+    for result in results:
+        counts[result['status']] = counts.get(result['status'], 0) + 1
+    summary = ", ".join(f"{count} {status}" for status, count in sorted(counts.items()))
+    print(f"\n📊 {len(results)} images in {elapsed:.1f}s: {summary}")
+    print(f"💾 Results saved to: {args.db}")
+
+if __name__ == "__main__":
+    main()
@@ -6,22 +6,21 @@ from skimage.filters import gabor
 from scipy import ndimage
 import os
 
+from color_statistics import masked_color_statistics
+from image_loading import decode_image
+from ground_scale import (GroundScale, LINE_SEGMENT_M, PLOT_AREA_MIN_M2,
+                          LEGACY_RECT_DENSITY_UNIT_M2, THRESHOLD_BLOCK_M)
+
 class CemeteryDetector:
-    def __init__(self):
+    def __init__(self, gsd=None, downsample=1):
         self.features = {}
+        # Ground sample distance (meters/pixel) and processing downsample factor
+        self.scale = GroundScale(gsd, downsample)
         
     def load_image(self, image_path):
         """Load and preprocess the image"""
-        img = cv2.imread(image_path)
-        if img is None:
-            raise ValueError(f"Could not load image: {image_path}")
-        
-        # Convert to RGB for display
-        img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        # Convert to grayscale for analysis
-        img_gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        
-        return img_rgb, img_gray
+        # Decode at the processing resolution, RGB for display and grayscale for analysis
+        return decode_image(image_path, self.scale.downsample)
     
     def detect_regular_patterns(self, img_gray):
         """Detect regular grid patterns typical of cemeteries"""
@@ -32,8 +31,9 @@ class CemeteryDetector:
         edges = cv2.Canny(blurred, 50, 150)
         
         # Detect horizontal and vertical lines using morphological operations
-        horizontal_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (25, 1))
-        vertical_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (1, 25))
+        line_length = self.scale.pixels(LINE_SEGMENT_M)
+        horizontal_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (line_length, 1))
+        vertical_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (1, line_length))
         
         horizontal_lines = cv2.morphologyEx(edges, cv2.MORPH_OPEN, horizontal_kernel)
         vertical_lines = cv2.morphologyEx(edges, cv2.MORPH_OPEN, vertical_kernel)
@@ -88,14 +88,16 @@ class CemeteryDetector:
     def detect_rectangular_structures(self, img_gray):
         """Detect rectangular structures typical of cemetery plots"""
         # Apply adaptive threshold
+        block_size = self.scale.odd_pixels(THRESHOLD_BLOCK_M)
         thresh = cv2.adaptiveThreshold(img_gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-                                     cv2.THRESH_BINARY, 11, 2)
+                                     cv2.THRESH_BINARY, block_size, 2)
         
         # Find contours
         contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
         
         rectangular_count = 0
         total_area = 0
+        min_area = self.scale.area_pixels(PLOT_AREA_MIN_M2)
         
         for contour in contours:
             # Approximate contour to polygon
@@ -105,41 +107,39 @@ class CemeteryDetector:
             # Check if it's roughly rectangular (4 sides)
             if len(approx) == 4:
                 area = cv2.contourArea(contour)
-                if area > 100:  # Filter out very small rectangles
+                if area > min_area:  # Filter out very small rectangles
                     rectangular_count += 1
                     total_area += area
         
         # Calculate rectangular density
         image_area = img_gray.shape[0] * img_gray.shape[1]
-        rectangular_density = rectangular_count / (image_area / 10000)  # per 100x100 pixels
+        density_unit = self.scale.area_pixels(LEGACY_RECT_DENSITY_UNIT_M2)
+        rectangular_density = rectangular_count / (image_area / density_unit)  # per 100 m² (100x100 pixels)
         
         return rectangular_count, rectangular_density
     
     def analyze_color_patterns(self, img_rgb):
         """Analyze color distribution patterns"""
-        # Convert to HSV for better color analysis
-        hsv = cv2.cvtColor(img_rgb, cv2.COLOR_RGB2HSV)
-        
-        # Focus on vegetation (green areas)
-        lower_green = np.array([35, 40, 40])
-        upper_green = np.array([85, 255, 255])
-        green_mask = cv2.inRange(hsv, lower_green, upper_green)
+        # Green mask, green fraction and green pixel mean/std in one masked pass
+        stats = masked_color_statistics(img_rgb)
         
         # Calculate green vegetation percentage
-        green_percentage = np.sum(green_mask > 0) / (img_rgb.shape[0] * img_rgb.shape[1])
+        green_percentage = stats['green_fraction']
         
         # Analyze color uniformity in green regions
-        if np.sum(green_mask) > 0:
-            green_pixels = img_rgb[green_mask > 0]
-            color_std = np.mean(np.std(green_pixels, axis=0))
+        if stats['green_count'] > 0:
+            color_std = np.mean(stats['std'])
             color_uniformity = 1.0 / (1.0 + color_std)
         else:
             color_uniformity = 0
         
         return green_percentage, color_uniformity
     
-    def calculate_cemetery_score(self, image_path):
-        """Calculate overall cemetery likelihood score"""
+    def calculate_cemetery_score(self, image_path, raise_errors=False):
+        """Calculate overall cemetery likelihood score.
+        
+        Errors are printed and give (0, {}, None) unless raise_errors is set.
+        """
         try:
             # Load image
             img_rgb, img_gray = self.load_image(image_path)
@@ -174,6 +174,8 @@ class CemeteryDetector:
             return cemetery_score, features, img_rgb
             
         except Exception as e:
+            if raise_errors:
+                raise
             print(f"Error processing {image_path}: {e}")
             return 0, {}, None
     
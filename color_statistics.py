@@ -0,0 +1,115 @@
+"""
+Single-pass vegetation color statistics.
+
+The green mask is built once from a precomputed HSV range. Green fraction
+and per-channel mean/std come from one masked cv2.meanStdDev pass, so green
+pixels are never copied out of the image. For tiled workflows,
+window_color_statistics derives the same statistics for every window of a
+grid from masked running sums, one band of window rows at a time.
+"""
+
+import cv2
+import numpy as np
+
+# HSV range treated as vegetation (OpenCV hue scale 0-179)
+GREEN_HSV_LOWER = np.array([35, 40, 40], dtype=np.uint8)
+GREEN_HSV_UPPER = np.array([85, 255, 255], dtype=np.uint8)
+
+def green_mask(img_rgb, color_order='rgb'):
+    """255 where a pixel falls in the vegetation HSV range, 0 elsewhere"""
+    code = cv2.COLOR_RGB2HSV if color_order == 'rgb' else cv2.COLOR_BGR2HSV
+    hsv = cv2.cvtColor(img_rgb, code)
+    return cv2.inRange(hsv, GREEN_HSV_LOWER, GREEN_HSV_UPPER)
+
+def masked_color_statistics(img_rgb, color_order='rgb'):
+    """Green pixel count and fraction plus per-channel mean/std of green pixels.
+
+    The std is the population std (ddof=0), matching np.std. Mean and std
+    are zero when there are no green pixels. Channels come back in the same
+    order as the input image.
+    """
+    mask = green_mask(img_rgb, color_order)
+    green_count = cv2.countNonZero(mask)
+
+    if green_count > 0:
+        mean, std = cv2.meanStdDev(img_rgb, mask=mask)
+        mean, std = mean.ravel(), std.ravel()
+    else:
+        mean = np.zeros(3)
+        std = np.zeros(3)
+
+    return {
+        'green_count': green_count,
+        'green_fraction': green_count / (img_rgb.shape[0] * img_rgb.shape[1]),
+        'mean': mean,
+        'std': std
+    }
+
+# Pixels per column chunk when accumulating a band of window rows
+_CHUNK_PIXELS = 1 << 20
+
+def _column_totals(band, mask):
+    """Green count and per-channel green sums and square sums of every column
+    of a band, accumulated under the mask in column chunks"""
+    width = band.shape[1]
+    counts = np.count_nonzero(mask, axis=0)
+    sums = np.zeros((3, width))
+    squares = np.zeros((3, width))
+    chunk = max(_CHUNK_PIXELS // max(band.shape[0], 1), 1)
+    for x0 in range(0, width, chunk):
+        columns = slice(x0, x0 + chunk)
+        chunk_mask = mask[:, columns]
+        for channel in range(3):
+            values = band[:, columns, channel]
+            sums[channel, columns] = np.sum(values, axis=0, dtype=np.float64, where=chunk_mask)
+            squares[channel, columns] = np.sum(np.square(values, dtype=np.uint16), axis=0,
+                                               dtype=np.float64, where=chunk_mask)
+    return counts, sums, squares
+
+def _window_sums(column_values, x0s, x1s):
+    """Sums over column ranges x0:x1 from a running (integral) sum of columns"""
+    running = np.concatenate([np.zeros(column_values.shape[:-1] + (1,)),
+                              np.cumsum(column_values, axis=-1, dtype=np.float64)], axis=-1)
+    return running[..., x1s] - running[..., x0s]
+
+def window_color_statistics(img_rgb, window, step=None, color_order='rgb', partial=False):
+    """Per-window vegetation statistics from running sums.
+
+    Returns green count and fraction (rows x cols) and per-channel mean and
+    std of the green pixels in each window (rows x cols x 3).
+    Windows with no green pixels get zero mean and std. With step=None
+    windows tile the image without overlap. Partial windows at the right and
+    bottom edges are skipped, or cut short with partial=True (the tile_grid
+    layout).
+
+    Each band of window rows is masked once; green sums are accumulated per
+    column under the mask, so no masked copy of the image is made, and an
+    integral along the band gives every window in it.
+    """
+    step = step or window
+    height, width = img_rgb.shape[:2]
+    y0s = np.arange(0, height if partial else height - window + 1, step)
+    x0s = np.arange(0, width if partial else width - window + 1, step)
+    x1s = np.minimum(x0s + window, width)
+    areas = np.outer(np.minimum(y0s + window, height) - y0s, x1s - x0s)
+
+    counts = np.zeros((len(y0s), len(x0s)), dtype=np.int64)
+    sums = np.zeros((len(y0s), len(x0s), 3))
+    squares = np.zeros((len(y0s), len(x0s), 3))
+    for row, y0 in enumerate(y0s):
+        band = img_rgb[y0:y0 + window]
+        column_counts, column_sums, column_squares = _column_totals(band, green_mask(band, color_order) > 0)
+        counts[row] = np.rint(_window_sums(column_counts, x0s, x1s)).astype(np.int64)
+        sums[row] = _window_sums(column_sums, x0s, x1s).T
+        squares[row] = _window_sums(column_squares, x0s, x1s).T
+
+    safe_counts = np.maximum(counts, 1)[:, :, None]
+    mean = sums / safe_counts
+    variance = np.maximum(squares / safe_counts - mean * mean, 0)
+
+    return {
+        'green_count': counts,
+        'green_fraction': counts / np.maximum(areas, 1),
+        'mean': mean,
+        'std': np.sqrt(variance)
+    }
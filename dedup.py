@@ -0,0 +1,206 @@
+"""
+Perceptual-hash deduplication of images and tiles.
+
+Mosaics and overlapping scrapes repeat the same ground many times, and
+image folders collect copies under different names. Each image or tile gets
+a 64-bit DCT perceptual hash (pHash): the signs of its lowest 8x8 cosine
+frequencies against their median, computed on a 32x32 thumbnail. The hash
+survives recompression, resampling and small brightness changes.
+
+Near-duplicates are hashes within a small Hamming distance. A multi-index
+lookup finds them without comparing every pair. The 64 bits are split into
+max_distance + 1 blocks, and two hashes that close must agree exactly on at
+least one block (pigeonhole), so only hashes sharing a block value are
+compared.
+
+A 32x32 thumbnail cannot see what the detector scores: grid lines or plot
+outlines a few pixels wide leave the hash unchanged. Every hash match is
+therefore confirmed with a detail check, Canny edge density (the detector's
+thresholds) in an 8x8 grid of cells at full resolution, before two items
+count as duplicates. Recompressed copies pass it; a field with and without
+grid lines does not, and neither do copies at another resolution, whose
+features differ anyway. Detail signatures are only computed for items that
+have a hash match.
+
+Each item is compared with the group representatives found so far and
+joins the first confirmed one, so a chain of small differences never joins
+items that are far apart. Only the representative needs scoring; its
+result stands for its group.
+
+Usage:
+    python dedup.py images/*.png --max-distance 6
+"""
+
+import argparse
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from image_loading import read_covering, read_image
+from scene_tiling import tile_grid
+
+HASH_BITS = 64
+
+# Hamming distance up to which two hashes count as the same content
+DEFAULT_MAX_DISTANCE = 6
+
+# Cells per side of the detail signature, and the largest difference in a
+# cell's edge density two duplicates may have (recompression stays below 0.04
+# on the sample images; added grid lines or plot outlines exceed 0.09)
+DETAIL_CELLS = 8
+DEFAULT_DETAIL_TOLERANCE = 0.05
+
+def perceptual_hash(img_gray):
+    """64-bit DCT perceptual hash of a grayscale image, as a Python int"""
+    small = cv2.resize(img_gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:8, :8].ravel()
+    # The DC term only encodes brightness, so it is left out of the median
+    bits = low > np.median(low[1:])
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+def image_hash(image_path):
+    """Perceptual hash of an image file, decoded at a reduced resolution"""
+    img_gray, _ = read_covering(image_path, 32, grayscale=True)
+    return perceptual_hash(img_gray)
+
+def detail_signature(img_gray, cells=DETAIL_CELLS):
+    """(shape, cells x cells Canny edge density) of a grayscale image at full resolution"""
+    edges = cv2.Canny(img_gray, 50, 150).astype(np.float32) / 255.0
+    return img_gray.shape, cv2.resize(edges, (cells, cells), interpolation=cv2.INTER_AREA)
+
+def details_match(a, b, tolerance=DEFAULT_DETAIL_TOLERANCE):
+    """Whether two detail signatures have the same shape and close edge densities"""
+    return a[0] == b[0] and float(np.max(np.abs(a[1] - b[1]))) <= tolerance
+
+def tile_hashes(img_gray, tile_size):
+    """{(row, col): hash} for every tile of a scene"""
+    return {(tile.row, tile.col): perceptual_hash(img_gray[tile.y0:tile.y1, tile.x0:tile.x1])
+            for tile in tile_grid(img_gray.shape[0], img_gray.shape[1], tile_size)}
+
+class HammingIndex:
+    """Multi-index lookup of hashes within max_distance bits of each other"""
+
+    def __init__(self, max_distance=DEFAULT_MAX_DISTANCE, bits=HASH_BITS):
+        blocks = max_distance + 1
+        if blocks > bits:
+            raise ValueError(f"max_distance must be below {bits}, got {max_distance}")
+        self.max_distance = max_distance
+        # Bit ranges of the blocks, as even as possible
+        edges = np.linspace(0, bits, blocks + 1).round().astype(int)
+        self.blocks = [(int(lo), (1 << int(hi - lo)) - 1) for lo, hi in zip(edges[:-1], edges[1:])]
+        self.tables = [{} for _ in self.blocks]
+        self.hashes = []
+
+    def _keys(self, value):
+        return [(value >> shift) & mask for shift, mask in self.blocks]
+
+    def query(self, value):
+        """Ids of indexed hashes within max_distance of value"""
+        matches = set()
+        for table, key in zip(self.tables, self._keys(value)):
+            for item in table.get(key, ()):
+                if item not in matches and bin(self.hashes[item] ^ value).count('1') <= self.max_distance:
+                    matches.add(item)
+        return matches
+
+    def add(self, value):
+        """Index a hash and return its id"""
+        item = len(self.hashes)
+        self.hashes.append(value)
+        for table, key in zip(self.tables, self._keys(value)):
+            table.setdefault(key, []).append(item)
+        return item
+
+def duplicate_groups(hashes, max_distance=DEFAULT_MAX_DISTANCE, confirm=None):
+    """Representative index for every hash.
+
+    hashes is a sequence of ints, or None for items that could not be hashed
+    (those stay on their own). Each item joins the earliest representative
+    within max_distance for which confirm(representative, item) holds, or
+    becomes a representative itself. Members are only ever compared with
+    representatives, never joined transitively.
+    """
+    representatives = list(range(len(hashes)))
+    index = HammingIndex(max_distance)
+    ids = []
+    for position, value in enumerate(hashes):
+        if value is None:
+            continue
+        for representative in sorted(ids[item] for item in index.query(value)):
+            if confirm is None or confirm(representative, position):
+                representatives[position] = representative
+                break
+        else:
+            index.add(value)
+            ids.append(position)
+    return representatives
+
+def _detail_check(signature, tolerance):
+    """confirm function for duplicate_groups from a per-item signature
+    function (None when unreadable); signatures are computed once, on demand"""
+    signatures = {}
+
+    def confirm(a, b):
+        for item in (a, b):
+            if item not in signatures:
+                signatures[item] = signature(item)
+        return (signatures[a] is not None and signatures[b] is not None
+                and details_match(signatures[a], signatures[b], tolerance))
+    return confirm
+
+def tile_duplicate_groups(img_gray, tiles, max_distance=DEFAULT_MAX_DISTANCE,
+                          detail_tolerance=DEFAULT_DETAIL_TOLERANCE):
+    """Representative index for every tile of a scene (see duplicate_groups)"""
+    hashes = [perceptual_hash(img_gray[tile.y0:tile.y1, tile.x0:tile.x1]) for tile in tiles]
+
+    def signature(item):
+        tile = tiles[item]
+        return detail_signature(img_gray[tile.y0:tile.y1, tile.x0:tile.x1])
+
+    return duplicate_groups(hashes, max_distance, _detail_check(signature, detail_tolerance))
+
+def image_duplicate_groups(image_paths, max_distance=DEFAULT_MAX_DISTANCE, max_workers=None,
+                           detail_tolerance=DEFAULT_DETAIL_TOLERANCE):
+    """Representative index for every image path (see duplicate_groups).
+
+    Hashing runs on a thread pool; unreadable images are their own group.
+    Detail signatures decode only the images that have a hash match.
+    """
+    def safe_hash(path):
+        try:
+            return image_hash(path)
+        except Exception:
+            return None
+
+    def signature(item):
+        try:
+            return detail_signature(read_image(image_paths[item], grayscale=True))
+        except Exception:
+            return None
+
+    with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count() or 1) as executor:
+        hashes = list(executor.map(safe_hash, image_paths))
+    return duplicate_groups(hashes, max_distance, _detail_check(signature, detail_tolerance))
+
+def main():
+    parser = argparse.ArgumentParser(description="Find near-duplicate images with perceptual hashes")
+    parser.add_argument('images', nargs='+', help="Images to check")
+    parser.add_argument('--max-distance', type=int, default=DEFAULT_MAX_DISTANCE,
+                        help="Hamming distance up to which images count as duplicates")
+    args = parser.parse_args()
+
+    representatives = image_duplicate_groups(args.images, args.max_distance)
+    groups = {}
+    for path, representative in zip(args.images, representatives):
+        groups.setdefault(representative, []).append(path)
+
+    duplicates = {rep: paths for rep, paths in groups.items() if len(paths) > 1}
+    print(f"🔎 {len(args.images)} images, {len(groups)} distinct")
+    for representative, paths in duplicates.items():
+        print(f"   • {os.path.basename(args.images[representative])}: "
+              + ", ".join(os.path.basename(path) for path in paths[1:]))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+import cv2
+import numpy as np
+import os
+import time
+
+from cemetery_detector import CemeteryDetector
+from simple_cemetery_detector import SimpleCemeteryDetector
+from final_cemetery_detector import RobustCemeteryDetector
+from color_statistics import masked_color_statistics
+from ground_scale import (PLOT_AREA_MIN_M2, PLOT_AREA_MAX_M2, PLOT_EXTENT_MAX_M, RECT_DENSITY_UNIT_M2,
+                          LEGACY_RECT_DENSITY_UNIT_M2, THRESHOLD_BLOCK_M)
+
+class EnsembleCemeteryDetector:
+    """Run CemeteryDetector, SimpleCemeteryDetector and RobustCemeteryDetector
+    in a single pass over each image.
+
+    The image is loaded once and the stages the three detectors have in common
+    (grid patterns, local variance, rectangle contours and the green mask) are
+    computed once. Only the detector-specific extractors (LBP, Gabor, FFT and
+    Hough) run separately.
+    """
+
+    def __init__(self, gsd=None, downsample=1):
+        self.features = {}
+        self.cemetery = CemeteryDetector(gsd, downsample)
+        self.simple = SimpleCemeteryDetector(gsd, downsample)
+        self.robust = RobustCemeteryDetector(gsd, downsample)
+        self.scale = self.robust.scale
+
+    def load_image(self, image_path):
+        """Load and preprocess the image once for all three detectors"""
+        return self.robust.load_image(image_path)
+
+    def detect_regular_patterns(self, img_gray):
+        """Shared grid pattern stage, returning both score normalizations"""
+        # The robust detector's map is identical to the other two, only the
+        # score differs by the 255 normalization
+        grid_pattern, _ = self.robust.detect_regular_patterns(img_gray)
+        grid_sum = np.sum(grid_pattern)
+        image_area = img_gray.shape[0] * img_gray.shape[1]
+
+        legacy_score = grid_sum / image_area
+        robust_score = grid_sum / (image_area * 255.0)
+
+        return grid_pattern, legacy_score, robust_score
+
+    def analyze_texture_variance(self, img_gray):
+        """Shared local variance map used by the simple and robust detectors"""
+        variance_map, _ = self.robust.analyze_texture_uniformity(img_gray)
+        avg_variance = np.mean(variance_map)
+
+        simple_uniformity = 1.0 / (1.0 + avg_variance / 100.0)
+        robust_uniformity = 1.0 / (1.0 + avg_variance / 1000.0)
+
+        return variance_map, simple_uniformity, robust_uniformity
+
+    def detect_rectangular_structures(self, img_gray):
+        """Shared contour pass, counted with both the legacy and robust filters"""
+        block_size = self.scale.odd_pixels(THRESHOLD_BLOCK_M)
+        thresh = cv2.adaptiveThreshold(img_gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                                     cv2.THRESH_BINARY, block_size, 2)
+        contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+        legacy_count = 0
+        robust_count = 0
+        min_area = self.scale.area_pixels(PLOT_AREA_MIN_M2)
+        max_area = self.scale.area_pixels(PLOT_AREA_MAX_M2)
+        max_extent = self.scale.pixels(PLOT_EXTENT_MAX_M)
+
+        for contour in contours:
+            epsilon = 0.02 * cv2.arcLength(contour, True)
+            approx = cv2.approxPolyDP(contour, epsilon, True)
+
+            if len(approx) == 4:
+                area = cv2.contourArea(contour)
+                if area > min_area:
+                    legacy_count += 1
+                    if area < max_area and max(cv2.boundingRect(contour)[2:]) <= max_extent:
+                        robust_count += 1
+
+        image_area = img_gray.shape[0] * img_gray.shape[1]
+        legacy_density = legacy_count / (image_area / self.scale.area_pixels(LEGACY_RECT_DENSITY_UNIT_M2))
+        robust_density = min(robust_count / (image_area / self.scale.area_pixels(RECT_DENSITY_UNIT_M2)), 1.0)
+
+        return legacy_density, robust_density
+
+    def analyze_color_patterns(self, img_rgb):
+        """Shared green mask, with both color uniformity normalizations"""
+        stats = masked_color_statistics(img_rgb)
+        green_count = stats['green_count']
+        green_percentage = stats['green_fraction']
+
+        legacy_uniformity = 0
+        robust_uniformity = 0
+        if green_count > 0:
+            color_std = np.mean(stats['std'])
+            legacy_uniformity = 1.0 / (1.0 + color_std)
+            # Same threshold as np.sum(green_mask) > 1000 in the robust detector
+            if green_count * 255 > 1000:
+                robust_uniformity = 1.0 / (1.0 + color_std / 50.0)
+
+        return green_percentage, legacy_uniformity, robust_uniformity
+
+    def calculate_ensemble_scores(self, image_path):
+        """Calculate the three legacy cemetery scores and a combined score"""
+        try:
+            # Load image once
+            img_rgb, img_gray = self.load_image(image_path)
+
+            # Shared stages
+            grid_pattern, legacy_regularity, robust_regularity = self.detect_regular_patterns(img_gray)
+            variance_map, simple_uniformity, robust_uniformity = self.analyze_texture_variance(img_gray)
+            legacy_rect_density, robust_rect_density = self.detect_rectangular_structures(img_gray)
+            green_pct, legacy_color_uniformity, robust_color_uniformity = self.analyze_color_patterns(img_rgb)
+
+            # Detector-specific stages
+            lbp, lbp_uniformity = self.cemetery.analyze_texture_patterns(img_gray)
+            gabor_responses, pattern_consistency = self.cemetery.detect_gabor_features(img_gray)
+            freq_spectrum, pattern_regularity = self.simple.detect_periodic_patterns(img_gray)
+            line_regularity = self.robust.analyze_line_patterns(img_gray)
+
+            features = {
+                'cemetery': {
+                    'regularity_score': legacy_regularity,
+                    'texture_uniformity': lbp_uniformity,
+                    'pattern_consistency': pattern_consistency,
+                    'rectangular_density': legacy_rect_density,
+                    'green_percentage': green_pct,
+                    'color_uniformity': legacy_color_uniformity
+                },
+                'simple': {
+                    'regularity_score': legacy_regularity,
+                    'texture_uniformity': simple_uniformity,
+                    'pattern_regularity': pattern_regularity,
+                    'rectangular_density': legacy_rect_density,
+                    'green_percentage': green_pct,
+                    'color_uniformity': legacy_color_uniformity
+                },
+                'robust': {
+                    'regularity_score': robust_regularity,
+                    'texture_uniformity': robust_uniformity,
+                    'line_regularity': line_regularity,
+                    'rectangular_density': robust_rect_density,
+                    'green_percentage': green_pct,
+                    'color_uniformity': robust_color_uniformity
+                }
+            }
+
+            # Same weightings as each detector's calculate_cemetery_score
+            scores = {
+                'cemetery': (
+                    legacy_regularity * 0.25 +
+                    lbp_uniformity * 0.20 +
+                    pattern_consistency * 0.20 +
+                    min(legacy_rect_density, 1.0) * 0.15 +
+                    green_pct * 0.10 +
+                    legacy_color_uniformity * 0.10
+                ),
+                'simple': (
+                    legacy_regularity * 0.25 +
+                    simple_uniformity * 0.20 +
+                    pattern_regularity * 0.20 +
+                    min(legacy_rect_density, 1.0) * 0.15 +
+                    green_pct * 0.10 +
+                    legacy_color_uniformity * 0.10
+                ),
+                'robust': (
+                    robust_regularity * 0.25 +
+                    robust_uniformity * 0.20 +
+                    line_regularity * 0.20 +
+                    robust_rect_density * 0.15 +
+                    green_pct * 0.10 +
+                    robust_color_uniformity * 0.10
+                )
+            }
+
+            # Combined score is the unweighted mean of the three detectors
+            scores['combined'] = (scores['cemetery'] + scores['simple'] + scores['robust']) / 3.0
+
+            return scores, features, img_rgb
+
+        except Exception as e:
+            print(f"Error processing {image_path}: {e}")
+            return {}, {}, None
+
+def compare_detectors(image_paths, store=None):
+    """Score every image with all three detectors and print them side by side.
+
+    If a ResultsStore is given, each detector's score and features are saved
+    under the names 'cemetery', 'simple' and 'robust'.
+    """
+    detector = EnsembleCemeteryDetector()
+    results = {}
+
+    print("🔍 Running ensemble cemetery detection...\n")
+
+    start = time.perf_counter()
+    for image_path in image_paths:
+        print(f"📸 Analyzing: {os.path.basename(image_path)}")
+        scores, features, _ = detector.calculate_ensemble_scores(image_path)
+        if scores:
+            results[image_path] = (scores, features)
+            if store is not None:
+                for name, detector_features in features.items():
+                    store.save_result(image_path, name, scores[name], detector_features, commit=False)
+                store.commit()
+    elapsed = time.perf_counter() - start
+
+    print("\n" + "="*72)
+    print("🏛️  ENSEMBLE DETECTION RESULTS")
+    print("="*72)
+    print(f"{'Image':<30}{'Cemetery':>10}{'Simple':>10}{'Robust':>10}{'Combined':>12}")
+    print("-"*72)
+
+    for image_path, (scores, _) in results.items():
+        print(f"{os.path.basename(image_path)[:29]:<30}"
+              f"{scores['cemetery']:>10.4f}{scores['simple']:>10.4f}"
+              f"{scores['robust']:>10.4f}{scores['combined']:>12.4f}")
+
+    print("="*72)
+    print(f"⏱️  Processed {len(results)} image(s) in {elapsed:.2f}s")
+
+    return results
+
+if __name__ == "__main__":
+    image_files = []
+    for file in os.listdir("."):
+        if file.lower().endswith(('.png', '.jpg', '.jpeg', '.tiff', '.bmp')):
+            if not file.startswith(('cemetery_analysis_', 'analysis_')):  # Skip generated plots
+                image_files.append(file)
+
+    if image_files:
+        compare_detectors(sorted(image_files))
+    else:
+        print("❌ No images found in the current directory")
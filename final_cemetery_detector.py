@@ -2,35 +2,103 @@ import cv2
 import numpy as np
 import matplotlib.pyplot as plt
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from approximate_stats import SampledStatistics, DECISION_THRESHOLDS
+from color_statistics import masked_color_statistics
+from image_loading import decode_image
+from image_geometry import rotate_crop
+from orientation import grid_angle
+from pitch_estimation import PitchEstimator
+from run_length import RunLengthEngine
+from stage_scheduler import StageScheduler
+from texture_engine import TextureEngine, texture_statistics
+from ground_scale import (GroundScale, LINE_SEGMENT_M, PLOT_AREA_MIN_M2, PLOT_AREA_MAX_M2, PLOT_EXTENT_MAX_M,
+                          RECT_DENSITY_UNIT_M2, HOUGH_MIN_LINE_M, VARIANCE_WINDOW_M,
+                          THRESHOLD_BLOCK_M)
+from tiled_rectangles import detect_rectangles_tiled, rectangle_halo
 
 class RobustCemeteryDetector:
-    def __init__(self):
+    # Intermediate maps that can be persisted to a MapStore, stored as <prefix>_<name>
+    MAP_PREFIX = 'robust'
+    PERSISTABLE_MAPS = ('grid_pattern', 'variance_map', 'edges')
+    
+    def __init__(self, gsd=None, downsample=1, rect_tile_size=None, map_store=None,
+                 persist_maps=PERSISTABLE_MAPS, color_features=True, pyramid_cache=None,
+                 align_grid=False, texture_windows=None, grid_lengths=None, estimate_pitch=False,
+                 stage_workers=None, sample_fraction=None):
         self.features = {}
+        # Ground sample distance (meters/pixel) and processing downsample factor
+        self.scale = GroundScale(gsd, downsample)
+        # Tile size for the parallel seam-aware rectangle search (None = whole image)
+        self.rect_tile_size = rect_tile_size
+        # Optional MapStore that keeps the chosen intermediate maps after scoring
+        self.map_store = map_store
+        self.persist_maps = persist_maps
+        # Without color features only grayscale is kept after decoding and the
+        # vegetation features contribute nothing to the score
+        self.color_features = color_features
+        # Optional PyramidCache; cached levels are read instead of decoding the source
+        self.pyramid_cache = pyramid_cache
+        # Estimate the dominant grid orientation per image or tile and run grid
+        # and line analysis in that frame, so rotated cemeteries still score
+        self.align_grid = align_grid
+        # Extra texture window sizes in meters (e.g. plot and section scale),
+        # reported as texture_uniformity_<size>m features
+        self.texture_windows = tuple(texture_windows or ())
+        # Extra grid segment lengths in meters, reported from one run-length
+        # pass as line_coverage_<length>m plus row/column periodicity
+        self.grid_lengths = tuple(grid_lengths or ())
+        # Plot-row spacing features from the grid edge map (in the grid frame
+        # when align_grid is on)
+        self.pitch_estimator = (PitchEstimator(gsd, downsample, align_grid=False)
+                                if estimate_pitch else None)
+        # Threads for running independent feature stages concurrently (None = serial)
+        self.stage_workers = stage_workers
+        self._executor = None
+        # Per-stage seconds of the most recent score_image_array call
+        self.last_timings = {}
+        # Estimate texture and color statistics from this share of pixels
+        # (None = every pixel); an exact pass replaces the estimates whenever
+        # the score interval straddles a decision threshold
+        self.sampled_statistics = (SampledStatistics(sample_fraction,
+                                                     variance_window=self.scale.odd_pixels(VARIANCE_WINDOW_M))
+                                   if sample_fraction else None)
+        # (lower, upper) score bounds of the most recent call; equal unless sampled
+        self.last_interval = None
         
-    def load_image(self, image_path):
-        """Load and preprocess the image"""
-        img = cv2.imread(image_path)
-        if img is None:
-            raise ValueError(f"Could not load image: {image_path}")
+    def load_image(self, image_path, color=True, window=None):
+        """Load and preprocess the image.
         
-        # Convert to RGB for display
-        img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        # Convert to grayscale for analysis
-        img_gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        With color=False only the grayscale image is kept (identical to
+        a color load's) and img_rgb is None. window (y0, x0, y1, x1) in processing pixels loads
+        only that part.
+        """
+        # Overview levels from the pyramid cache skip the full decode
+        if self.pyramid_cache is not None and self.scale.downsample in self.pyramid_cache.levels:
+            return self.pyramid_cache.read_level(image_path, self.scale.downsample, window, color)
         
-        return img_rgb, img_gray
+        # Decode at the processing resolution, RGB for display and grayscale for analysis
+        return decode_image(image_path, self.scale.downsample, color, window)
     
-    def detect_regular_patterns(self, img_gray):
-        """Detect regular grid patterns typical of cemeteries"""
+    def grid_edges(self, img_gray):
+        """Edge map the grid analysis works on"""
         # Apply Gaussian blur to reduce noise
         blurred = cv2.GaussianBlur(img_gray, (5, 5), 0)
         
         # Edge detection
-        edges = cv2.Canny(blurred, 50, 150)
+        return cv2.Canny(blurred, 50, 150)
+    
+    def detect_regular_patterns(self, img_gray, edges=None):
+        """Detect regular grid patterns typical of cemeteries"""
+        if edges is None:
+            edges = self.grid_edges(img_gray)
         
         # Detect horizontal and vertical lines
-        horizontal_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (25, 1))
-        vertical_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (1, 25))
+        line_length = self.scale.pixels(LINE_SEGMENT_M)
+        horizontal_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (line_length, 1))
+        vertical_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (1, line_length))
         
         horizontal_lines = cv2.morphologyEx(edges, cv2.MORPH_OPEN, horizontal_kernel)
         vertical_lines = cv2.morphologyEx(edges, cv2.MORPH_OPEN, vertical_kernel)
@@ -43,10 +111,18 @@ class RobustCemeteryDetector:
         
         return grid_pattern, regularity_score
     
-    def analyze_texture_uniformity(self, img_gray):
-        """Analyze texture uniformity using local standard deviation"""
+    def analyze_texture_uniformity(self, img_gray, engine=None):
+        """Analyze texture uniformity using local standard deviation.
+        
+        A TextureEngine built for the image replaces the two convolutions.
+        """
+        kernel_size = self.scale.odd_pixels(VARIANCE_WINDOW_M)
+        if engine is not None:
+            _, local_variance = engine.window_stats(kernel_size)
+            avg_variance = np.mean(local_variance)
+            return local_variance, 1.0 / (1.0 + avg_variance / 1000.0)
+        
         # Calculate local standard deviation
-        kernel_size = 9
         kernel = np.ones((kernel_size, kernel_size), np.float32) / (kernel_size * kernel_size)
         
         # Convert to float for calculations
@@ -67,63 +143,88 @@ class RobustCemeteryDetector:
     
     def detect_rectangular_structures(self, img_gray):
         """Detect rectangular structures typical of cemetery plots"""
-        # Apply adaptive threshold
-        thresh = cv2.adaptiveThreshold(img_gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-                                     cv2.THRESH_BINARY, 11, 2)
+        block_size = self.scale.odd_pixels(THRESHOLD_BLOCK_M)
+        min_area = self.scale.area_pixels(PLOT_AREA_MIN_M2)
+        max_area = self.scale.area_pixels(PLOT_AREA_MAX_M2)
+        max_extent = self.scale.pixels(PLOT_EXTENT_MAX_M)
         
-        # Find contours
-        contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        
-        rectangular_count = 0
-        
-        for contour in contours:
-            # Approximate contour to polygon
-            epsilon = 0.02 * cv2.arcLength(contour, True)
-            approx = cv2.approxPolyDP(contour, epsilon, True)
+        if self.rect_tile_size and max(img_gray.shape) > self.rect_tile_size:
+            # Threshold and contours per tile in parallel, halo wide enough for the largest plot
+            halo = rectangle_halo(max_extent, block_size)
+            rectangles = detect_rectangles_tiled(img_gray, self.rect_tile_size, halo, block_size,
+                                                 min_area, max_area, max_extent)
+            rectangular_count = len(rectangles)
+        else:
+            # Apply adaptive threshold
+            thresh = cv2.adaptiveThreshold(img_gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
+                                         cv2.THRESH_BINARY, block_size, 2)
+            
+            # Find contours
+            contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
             
-            # Check if it's roughly rectangular (4 sides) and has reasonable area
-            if len(approx) == 4:
-                area = cv2.contourArea(contour)
-                if 100 < area < 10000:  # Filter reasonable sizes
-                    rectangular_count += 1
+            rectangular_count = 0
+            
+            for contour in contours:
+                # Approximate contour to polygon
+                epsilon = 0.02 * cv2.arcLength(contour, True)
+                approx = cv2.approxPolyDP(contour, epsilon, True)
+                
+                # Check if it's roughly rectangular (4 sides) and has reasonable area
+                if len(approx) == 4:
+                    area = cv2.contourArea(contour)
+                    # Filter reasonable sizes; plots are compact, so long
+                    # slivers along the image frame do not count
+                    if min_area < area < max_area and max(cv2.boundingRect(contour)[2:]) <= max_extent:
+                        rectangular_count += 1
         
         # Calculate rectangular density per unit area
         image_area = img_gray.shape[0] * img_gray.shape[1]
-        rectangular_density = rectangular_count / (image_area / 100000.0)  # per 100k pixels
+        density_unit = self.scale.area_pixels(RECT_DENSITY_UNIT_M2)
+        rectangular_density = rectangular_count / (image_area / density_unit)  # per 1000 m² (100k pixels)
         
         return rectangular_count, min(rectangular_density, 1.0)
     
-    def analyze_color_patterns(self, img_rgb):
-        """Analyze color distribution patterns"""
-        # Convert to HSV for better color analysis
-        hsv = cv2.cvtColor(img_rgb, cv2.COLOR_RGB2HSV)
+    def analyze_color_patterns(self, img_rgb, stats=None):
+        """Analyze color distribution patterns.
         
-        # Focus on vegetation (green areas)
-        lower_green = np.array([35, 40, 40])
-        upper_green = np.array([85, 255, 255])
-        green_mask = cv2.inRange(hsv, lower_green, upper_green)
+        stats with 'green_count', 'green_fraction' and 'std' (e.g. one window
+        of window_color_statistics) replace the masked pass over img_rgb.
+        """
+        # Green mask, green fraction and green pixel mean/std in one masked pass
+        if stats is None:
+            stats = masked_color_statistics(img_rgb)
         
         # Calculate green vegetation percentage
-        green_percentage = np.sum(green_mask > 0) / (img_rgb.shape[0] * img_rgb.shape[1])
+        green_percentage = stats['green_fraction']
         
         # Analyze color uniformity in green regions
-        if np.sum(green_mask) > 1000:  # Enough green pixels
-            green_pixels = img_rgb[green_mask > 0]
-            color_std = np.mean(np.std(green_pixels.astype(np.float32), axis=0))
+        if stats['green_count'] * 255 > 1000:  # Enough green pixels (mask sum > 1000)
+            color_std = np.mean(stats['std'])
             color_uniformity = 1.0 / (1.0 + color_std / 50.0)
         else:
             color_uniformity = 0
         
         return green_percentage, color_uniformity
     
-    def analyze_line_patterns(self, img_gray):
-        """Analyze line patterns using Hough Transform"""
+    def analyze_line_patterns(self, img_gray, edges=None, angle=0.0):
+        """Analyze line patterns using Hough Transform.
+        
+        angle (degrees) is the grid orientation; line angles are measured
+        relative to it.
+        """
         # Edge detection
-        edges = cv2.Canny(img_gray, 50, 150)
+        if edges is None:
+            edges = cv2.Canny(img_gray, 50, 150)
         
         # Detect lines using Hough Transform
-        lines = cv2.HoughLines(edges, 1, np.pi/180, threshold=100)
+        # Accumulator threshold is the minimum line length in pixels
+        hough_threshold = self.scale.pixels(HOUGH_MIN_LINE_M)
+        lines = cv2.HoughLines(edges, 1, np.pi/180, threshold=hough_threshold)
         
+        return self.line_regularity(lines, angle)
+    
+    def line_regularity(self, lines, angle=0.0):
+        """Balance and density of Hough lines given as cv2.HoughLines output"""
         if lines is not None:
             # Count horizontal and vertical lines
             horizontal_lines = 0
@@ -131,13 +232,13 @@ class RobustCemeteryDetector:
             
             for line in lines:
                 rho, theta = line[0]
-                angle = theta * 180 / np.pi
+                line_angle = (theta * 180 / np.pi - angle) % 180
                 
                 # Check if line is horizontal (around 0° or 180°)
-                if (angle < 10) or (angle > 170):
+                if (line_angle < 10) or (line_angle > 170):
                     horizontal_lines += 1
                 # Check if line is vertical (around 90°)
-                elif 80 < angle < 100:
+                elif 80 < line_angle < 100:
                     vertical_lines += 1
             
             # Calculate line regularity (balance of horizontal and vertical)
@@ -153,53 +254,256 @@ class RobustCemeteryDetector:
             
         return line_regularity
     
-    def calculate_cemetery_score(self, image_path):
-        """Calculate overall cemetery likelihood score"""
+    def calculate_cemetery_score(self, image_path, raise_errors=False):
+        """Calculate overall cemetery likelihood score.
+        
+        Errors are printed and give (0, {}, None) unless raise_errors is set.
+        """
         try:
             # Load image
-            img_rgb, img_gray = self.load_image(image_path)
-            
-            # Extract features
-            grid_pattern, regularity_score = self.detect_regular_patterns(img_gray)
-            variance_map, uniformity = self.analyze_texture_uniformity(img_gray)
-            rect_count, rect_density = self.detect_rectangular_structures(img_gray)
-            green_pct, color_uniformity = self.analyze_color_patterns(img_rgb)
-            line_regularity = self.analyze_line_patterns(img_gray)
+            img_rgb, img_gray = self.load_image(image_path, self.color_features)
             
-            # Store features for analysis
-            features = {
-                'regularity_score': regularity_score,
-                'texture_uniformity': uniformity,
-                'line_regularity': line_regularity,
-                'rectangular_density': rect_density,
-                'green_percentage': green_pct,
-                'color_uniformity': color_uniformity
-            }
-            
-            # Calculate weighted cemetery score
-            cemetery_score = (
-                regularity_score * 0.25 +           # Regular grid patterns
-                uniformity * 0.20 +                 # Texture uniformity
-                line_regularity * 0.20 +            # Line pattern regularity
-                rect_density * 0.15 +               # Rectangular structures
-                green_pct * 0.10 +                  # Vegetation presence
-                color_uniformity * 0.10             # Color uniformity
-            )
+            maps = {} if self.map_store is not None else None
+            cemetery_score, features = self.score_image_array(img_rgb, img_gray, maps)
+            if maps:
+                self.map_store.save_maps(image_path, self.MAP_PREFIX, maps, self.persist_maps,
+                                         self.map_settings(), features)
             
             return cemetery_score, features, img_rgb
             
         except Exception as e:
+            if raise_errors:
+                raise
             print(f"Error processing {image_path}: {e}")
             return 0, {}, None
     
-    def visualize_analysis(self, image_path, save_plots=True):
-        """Visualize the analysis results"""
+    def score_image_array(self, img_rgb, img_gray, maps=None):
+        """Calculate the cemetery score for an already loaded image or tile.
+        
+        If a maps dict is given, the intermediate maps are added to it.
+        img_rgb may be None when color features are off. Per-stage timings
+        are kept in last_timings.
+        """
+        texture_stage = (lambda done: self._texture_stage(img_gray, maps is not None), ())
+        color_stage = (lambda done: self.analyze_color_patterns(img_rgb)
+                       if self.color_features and img_rgb is not None else (0.0, 0.0), ())
+        
+        # Sampled estimates replace the full texture and color passes, unless
+        # maps or extra texture windows need every pixel
+        sampled = (self.sampled_statistics is not None and maps is None and not self.texture_windows
+                   and img_rgb is not None)
+        stages = {}
+        if sampled:
+            stages['sampled'] = (lambda done: self.sampled_statistics.estimate(img_rgb, img_gray), ())
+            texture_stage = (lambda done: (None, self._sampled_features(done['sampled'], img_gray.size)
+                                           ['texture_uniformity'], {}), ('sampled',))
+            color_stage = (lambda done: tuple(self._sampled_features(done['sampled'], img_gray.size)[name]
+                                              for name in ('green_percentage', 'color_uniformity')),
+                           ('sampled',))
+        
+        # Feature stages and the stages whose results they use
+        stages.update({
+            'orientation': (lambda done: grid_angle(img_gray) if self.align_grid else 0.0, ()),
+            'grid': (lambda done: self._grid_stage(img_gray, done['orientation']), ('orientation',)),
+            'texture': texture_stage,
+            'rectangles': (lambda done: self.detect_rectangular_structures(img_gray), ()),
+            'color': color_stage,
+            'lines': (lambda done: self._line_stage(img_gray, done['orientation']), ('orientation',))
+        })
+        if self.grid_lengths:
+            stages['runs'] = (lambda done: self._run_length_stage(done['grid']['edges']), ('grid',))
+        if self.pitch_estimator is not None:
+            stages['pitch'] = (lambda done: self.pitch_estimator.features(done['grid']['input'],
+                                                                         done['grid']['edges']), ('grid',))
+        
+        # Extract features
+        start = time.perf_counter()
+        results, timings = StageScheduler(self._stage_executor()).run(stages)
+        timings['total'] = time.perf_counter() - start
+        self.last_timings = timings
+        
+        angle = results['orientation']
+        grid_pattern, regularity_score = results['grid']['pattern'], results['grid']['score']
+        variance_map, uniformity, texture_stats = results['texture']
+        rect_count, rect_density = results['rectangles']
+        green_pct, color_uniformity = results['color']
+        edges, line_regularity = results['lines']
+        
+        if maps is not None:
+            maps.update(grid_pattern=grid_pattern, variance_map=variance_map, edges=edges)
+        
+        # Store features for analysis
+        features = {
+            'regularity_score': regularity_score,
+            'texture_uniformity': uniformity,
+            'line_regularity': line_regularity,
+            'rectangular_density': rect_density,
+            'green_percentage': green_pct,
+            'color_uniformity': color_uniformity
+        }
+        if self.align_grid:
+            features['grid_orientation'] = angle
+        features.update(results.get('runs', {}))
+        features.update(results.get('pitch', {}))
+        for meters in self.texture_windows:
+            stats = texture_stats[self.scale.odd_pixels(meters)]
+            features[f'texture_uniformity_{meters:g}m'] = 1.0 / (1.0 + stats['mean_variance'] / 1000.0)
+            if maps is not None:
+                maps[f'variance_map_{meters:g}m'] = stats['variance_map']
+        
+        cemetery_score = self.weighted_score(features)
+        self.last_interval = (cemetery_score, cemetery_score)
+        
+        if sampled and not all(estimate.exact for estimate in results['sampled'].values()):
+            lower = self.weighted_score(dict(features, **self._sampled_features(results['sampled'],
+                                                                                img_gray.size, -1)))
+            upper = self.weighted_score(dict(features, **self._sampled_features(results['sampled'],
+                                                                                img_gray.size, 1)))
+            self.last_interval = (lower, upper)
+            
+            # Measure every pixel when the estimate could flip the verdict
+            if any(lower < threshold < upper for threshold in DECISION_THRESHOLDS):
+                start = time.perf_counter()
+                _, features['texture_uniformity'] = self.analyze_texture_uniformity(img_gray)
+                if self.color_features:
+                    features['green_percentage'], features['color_uniformity'] = self.analyze_color_patterns(img_rgb)
+                timings['exact_fallback'] = time.perf_counter() - start
+                cemetery_score = self.weighted_score(features)
+                self.last_interval = (cemetery_score, cemetery_score)
+        
+        return cemetery_score, features
+    
+    def weighted_score(self, features):
+        """Weighted cemetery score of the six base features"""
+        return (
+            features['regularity_score'] * 0.25 +       # Regular grid patterns
+            features['texture_uniformity'] * 0.20 +     # Texture uniformity
+            features['line_regularity'] * 0.20 +        # Line pattern regularity
+            features['rectangular_density'] * 0.15 +    # Rectangular structures
+            features['green_percentage'] * 0.10 +       # Vegetation presence
+            features['color_uniformity'] * 0.10         # Color uniformity
+        )
+    
+    def orientation_features(self, img_gray):
+        """The score features that change when an image is rotated or
+        flipped (grid and line regularity), for rescoring transformed copies"""
+        angle = grid_angle(img_gray) if self.align_grid else 0.0
+        _, line_regularity = self._line_stage(img_gray, angle)
+        return {'regularity_score': self._grid_stage(img_gray, angle)['score'],
+                'line_regularity': line_regularity}
+    
+    def _sampled_features(self, estimates, pixels, side=0):
+        """Texture and color features from sampled statistics.
+        
+        side 0 uses the estimates; -1 / 1 take the end of each interval that
+        lowers / raises the score.
+        """
+        def pick(estimate, raises_score):
+            if side == 0:
+                return estimate.value
+            return estimate.upper if (side > 0) == raises_score else estimate.lower
+        
+        green = estimates['green_percentage']
+        features = {
+            'texture_uniformity': 1.0 / (1.0 + pick(estimates['mean_variance'], False) / 1000.0),
+            'green_percentage': 0.0,
+            'color_uniformity': 0.0
+        }
+        if self.color_features:
+            features['green_percentage'] = pick(green, True)
+            # Same minimum green mask sum as analyze_color_patterns
+            if green.value * pixels * 255 > 1000:
+                features['color_uniformity'] = 1.0 / (1.0 + pick(estimates['color_std'], False) / 50.0)
+        return features
+    
+    def _stage_executor(self):
+        """Shared thread pool for concurrent stages, or None to run them serially"""
+        if not self.stage_workers:
+            return None
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.stage_workers)
+        return self._executor
+    
+    def _grid_stage(self, img_gray, angle):
+        # Grid analysis on the largest crop rotated into the grid's frame
+        # (grid_pattern is then in that frame); Hough lines are measured
+        # relative to the grid angle instead
+        grid_input = rotate_crop(img_gray, angle) if angle else img_gray
+        grid_edges = self.grid_edges(grid_input)
+        grid_pattern, regularity_score = self.detect_regular_patterns(grid_input, grid_edges)
+        return {'input': grid_input, 'edges': grid_edges, 'pattern': grid_pattern, 'score': regularity_score}
+    
+    def _texture_stage(self, img_gray, keep_maps):
+        if not self.texture_windows:
+            variance_map, uniformity = self.analyze_texture_uniformity(img_gray)
+            return variance_map, uniformity, {}
+        
+        # One pair of integral images serves every texture window
+        windows = sorted({self.scale.odd_pixels(meters) for meters in self.texture_windows})
+        engine = TextureEngine(img_gray, max(windows + [self.scale.odd_pixels(VARIANCE_WINDOW_M)]))
+        variance_map, uniformity = self.analyze_texture_uniformity(img_gray, engine)
+        return variance_map, uniformity, texture_statistics(img_gray, windows, keep_maps, engine)
+    
+    def _line_stage(self, img_gray, angle):
+        edges = cv2.Canny(img_gray, 50, 150)
+        return edges, self.analyze_line_patterns(img_gray, edges, angle)
+    
+    def _run_length_stage(self, grid_edges):
+        runs = RunLengthEngine(grid_edges)
+        lengths = {meters: self.scale.odd_pixels(meters) for meters in self.grid_lengths}
+        coverage = runs.coverage(set(lengths.values()))
+        features = {f'line_coverage_{meters:g}m': coverage[length] for meters, length in lengths.items()}
+        (_, row_strength), (_, column_strength) = runs.periodicity(self.scale.odd_pixels(LINE_SEGMENT_M))
+        features['row_periodicity'] = row_strength
+        features['column_periodicity'] = column_strength
+        return features
+    
+    def map_settings(self):
+        """Settings the persisted maps and features depend on, part of their map store key"""
+        return {'detector': self.MAP_PREFIX, 'gsd': self.scale.source_gsd,
+                'downsample': self.scale.downsample, 'align_grid': self.align_grid,
+                'color_features': self.color_features, 'texture_windows': list(self.texture_windows),
+                'grid_lengths': list(self.grid_lengths), 'estimate_pitch': self.pitch_estimator is not None}
+    
+    def visualize_analysis(self, image_path, save_plots=True, results=None):
+        """Visualize the analysis results.
+        
+        results is the (score, features, maps) of a pass that already ran.
+        Without it, maps and features persisted for the current file contents
+        and settings are used, and only if there are none is the image
+        analyzed, once.
+        """
         try:
             img_rgb, img_gray = self.load_image(image_path)
             
-            # Get analysis results
-            grid_pattern, regularity_score = self.detect_regular_patterns(img_gray)
-            variance_map, uniformity = self.analyze_texture_uniformity(img_gray)
+            # Get analysis results without rerunning the pipeline when possible
+            if results is not None:
+                score, features, maps = results
+                maps = maps or {}
+            elif self.map_store is not None:
+                maps, features = self.map_store.load_maps(image_path, self.MAP_PREFIX, self.persist_maps,
+                                                          self.map_settings())
+            else:
+                maps, features = {}, None
+            if features is None:
+                maps = {}
+                score, features = self.score_image_array(img_rgb, img_gray, maps)
+                if self.map_store is not None:
+                    self.map_store.save_maps(image_path, self.MAP_PREFIX, maps, self.persist_maps,
+                                             self.map_settings(), features)
+            elif results is None:
+                score = self.weighted_score(features)
+            
+            regularity_score = features['regularity_score']
+            uniformity = features['texture_uniformity']
+            if 'grid_pattern' in maps:
+                grid_pattern = maps['grid_pattern']
+            else:
+                grid_pattern, _ = self.detect_regular_patterns(img_gray)
+            if 'variance_map' in maps:
+                variance_map = maps['variance_map']
+            else:
+                variance_map, _ = self.analyze_texture_uniformity(img_gray)
             
             # Create visualization
             fig, axes = plt.subplots(2, 3, figsize=(15, 10))
@@ -226,13 +530,12 @@ class RobustCemeteryDetector:
             axes[1, 0].axis('off')
             
             # Edge detection
-            edges = cv2.Canny(img_gray, 50, 150)
+            edges = maps['edges'] if 'edges' in maps else cv2.Canny(img_gray, 50, 150)
             axes[1, 1].imshow(edges, cmap='gray')
             axes[1, 1].set_title('Edge Detection')
             axes[1, 1].axis('off')
             
             # Feature summary
-            score, features, _ = self.calculate_cemetery_score(image_path)
             feature_text = f"""Cemetery Score: {score:.4f}
             
 Key Features:
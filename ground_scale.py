@@ -0,0 +1,74 @@
+"""
+Ground sample distance (GSD) handling for the cemetery detectors.
+
+The extractor constants were tuned on imagery of roughly 0.1 m/pixel. Here
+they are expressed in meters, and GroundScale converts them to pixels for
+the actual resolution being processed. At the reference GSD every parameter
+comes out as the original pixel value, so default scores are unchanged.
+"""
+
+import cv2
+
+# Ground sample distance (meters/pixel) the original pixel constants assume
+REFERENCE_GSD = 0.1
+
+# Physical parameters (pixel values at the reference GSD in comments)
+LINE_SEGMENT_M = 2.5              # 25 px grid line morphology kernels
+PLOT_AREA_MIN_M2 = 1.0            # 100 px² smallest rectangular plot
+PLOT_AREA_MAX_M2 = 100.0          # 10000 px² largest rectangular plot
+PLOT_EXTENT_MAX_M = 20.0          # 200 px longest bounding box side of a plot
+RECT_DENSITY_UNIT_M2 = 1000.0     # 100000 px² robust density unit
+LEGACY_RECT_DENSITY_UNIT_M2 = 100.0   # 10000 px² legacy density unit
+HOUGH_MIN_LINE_M = 10.0           # Hough accumulator threshold of 100 votes
+VARIANCE_WINDOW_M = 0.9           # 9x9 local variance window
+THRESHOLD_BLOCK_M = 1.1           # 11 px adaptive threshold block
+
+# Narrowest structure that must stay resolvable when downsampling
+PLOT_WIDTH_M = 1.0
+
+class GroundScale:
+    """Convert physical detector parameters to pixels.
+
+    gsd is the source imagery resolution in meters/pixel (None assumes the
+    reference GSD). downsample is the factor the image is shrunk by before
+    processing, so the effective resolution is gsd * downsample.
+    """
+
+    def __init__(self, gsd=None, downsample=1):
+        if gsd is not None and gsd <= 0:
+            raise ValueError(f"Ground sample distance must be positive, got {gsd}")
+        if downsample < 1:
+            raise ValueError(f"Downsample factor must be at least 1, got {downsample}")
+
+        self.source_gsd = REFERENCE_GSD if gsd is None else gsd
+        self.downsample = downsample
+        self.gsd = self.source_gsd * downsample
+
+    def pixels(self, meters, minimum=1):
+        """Length in meters as a whole number of pixels"""
+        return max(int(round(meters / self.gsd)), minimum)
+
+    def odd_pixels(self, meters, minimum=3):
+        """Length in meters as an odd pixel count, for centered windows"""
+        size = max(int(round(meters / self.gsd)), minimum)
+        return size if size % 2 == 1 else size + 1
+
+    def area_pixels(self, square_meters):
+        """Area in square meters as square pixels"""
+        return square_meters / self.gsd / self.gsd
+
+    def resize(self, img):
+        """Shrink an image by the downsample factor"""
+        if self.downsample == 1:
+            return img
+        return cv2.resize(img, None, fx=1.0 / self.downsample, fy=1.0 / self.downsample,
+                          interpolation=cv2.INTER_AREA)
+
+def coarsest_downsample(gsd=None, min_feature_m=PLOT_WIDTH_M, min_pixels=2, max_factor=8):
+    """Largest power-of-two downsample that keeps min_feature_m at least
+    min_pixels wide"""
+    source_gsd = REFERENCE_GSD if gsd is None else gsd
+    factor = 1
+    while factor * 2 <= max_factor and min_feature_m / (source_gsd * factor * 2) >= min_pixels:
+        factor *= 2
+    return factor
@@ -0,0 +1,308 @@
+"""
+Halo-tiled parallel analysis of one huge scene.
+
+SharedSceneExecutor scores every tile on its own. This executor instead
+splits the scene into tiles whose windows overlap by a halo as wide as the
+largest kernel support, runs the robust detector's feature extractors on
+every window in a process pool, and merges the per-tile outputs into one
+scene-level score. That score uses the same definitions as scoring the whole
+image at once:
+
+- grid regularity: sum of the grid pattern over each tile core, divided by
+  the scene area (the line openings only need a halo of one segment length)
+- texture uniformity: sum of the local variance over each core
+- color: green pixel count, channel sums and channel square sums per core
+- lines: each core votes into a partial Hough accumulator in scene
+  coordinates; the partials add up to the whole-image accumulator, which is
+  then peak-picked exactly like cv2.HoughLines
+- rectangles: each tile keeps the rectangles whose centroid it owns, and dark
+  regions are joined across seams with union-find as in tiled_rectangles
+
+The only remaining differences come from Canny hysteresis chains longer than
+the halo and float summation order. The same tile outputs also give
+per-tile feature and score rasters for the scene.
+
+Usage:
+    python halo_executor.py scene.png --tile-size 2048 --workers 8
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from color_statistics import masked_color_statistics
+from final_cemetery_detector import RobustCemeteryDetector
+from ground_scale import (LINE_SEGMENT_M, PLOT_AREA_MIN_M2, PLOT_AREA_MAX_M2, PLOT_EXTENT_MAX_M,
+                          RECT_DENSITY_UNIT_M2, HOUGH_MIN_LINE_M, VARIANCE_WINDOW_M, THRESHOLD_BLOCK_M)
+from hough_accumulator import HoughGeometry
+from memory_budget import measure_peak_rss, reset_peak_rss, process_peak_rss, format_bytes
+from parallel_executor import FEATURE_NAMES, share_decoded, _share_array, _release
+from scene_tiling import tile_grid, tile_grid_shape
+from tiled_rectangles import (_DarkRegions, _dark_edges, _join_dark_regions, _tile_candidates,
+                              rectangle_halo)
+
+# Blur, Sobel and non-maximum suppression reach of the Canny edge maps
+CANNY_SUPPORT = 8
+
+# Per-process state set up by _attach_scene
+_worker = {}
+
+def required_halo(scale):
+    """Halo (pixels) covering every kernel of the robust detector at a scale"""
+    return max(rectangle_halo(scale.pixels(PLOT_EXTENT_MAX_M),
+                              scale.odd_pixels(THRESHOLD_BLOCK_M)),      # widest rectangle
+               scale.pixels(LINE_SEGMENT_M) + CANNY_SUPPORT,             # grid line openings
+               scale.odd_pixels(VARIANCE_WINDOW_M) // 2 + 1,             # local variance
+               scale.odd_pixels(THRESHOLD_BLOCK_M))                      # adaptive threshold
+
+def _attach_scene(rgb_name, gray_name, shape, gsd, downsample, tile_size, halo):
+    """Worker initializer: map the shared scene and build the extractors"""
+    reset_peak_rss()
+    rgb_block = shared_memory.SharedMemory(name=rgb_name)
+    gray_block = shared_memory.SharedMemory(name=gray_name)
+    _worker['blocks'] = (rgb_block, gray_block)  # keep the mappings alive
+    _worker['rgb'] = np.ndarray(shape + (3,), dtype=np.uint8, buffer=rgb_block.buf)
+    _worker['gray'] = np.ndarray(shape, dtype=np.uint8, buffer=gray_block.buf)
+    _worker['halo'] = halo
+
+    detector = RobustCemeteryDetector(gsd, downsample)
+    _worker['detector'] = detector
+    _worker['geometry'] = HoughGeometry(*shape)
+    _worker['block_size'] = detector.scale.odd_pixels(THRESHOLD_BLOCK_M)
+    _worker['regions'] = _DarkRegions(_worker['gray'], list(tile_grid(shape[0], shape[1], tile_size)),
+                                      tile_size, _worker['block_size'])
+
+def _analyze_tile(tile):
+    """Worker task: mergeable feature outputs for one tile core"""
+    gray, halo, detector = _worker['gray'], _worker['halo'], _worker['detector']
+    height, width = gray.shape
+    wy0, wx0 = max(tile.y0 - halo, 0), max(tile.x0 - halo, 0)
+    wy1, wx1 = min(tile.y1 + halo, height), min(tile.x1 + halo, width)
+    window = gray[wy0:wy1, wx0:wx1]
+    core = (slice(tile.y0 - wy0, tile.y1 - wy0), slice(tile.x0 - wx0, tile.x1 - wx0))
+
+    grid_pattern, _ = detector.detect_regular_patterns(window)
+    local_variance, _ = detector.analyze_texture_uniformity(window)
+    stats = masked_color_statistics(_worker['rgb'][tile.y0:tile.y1, tile.x0:tile.x1])
+    line_edges = cv2.Canny(window, 50, 150)[core]
+
+    # Dark region labels along the core edges, and candidate rectangles with
+    # the dark label their outside test depends on
+    block_size = _worker['block_size']
+    dark_count, dark_edges = _dark_edges(gray, tile, block_size)
+    candidates = []
+    for rect, probe in _tile_candidates(gray, tile, max(halo, block_size), block_size,
+                                        detector.scale.area_pixels(PLOT_AREA_MIN_M2),
+                                        detector.scale.area_pixels(PLOT_AREA_MAX_M2),
+                                        detector.scale.pixels(PLOT_EXTENT_MAX_M)):
+        candidates.append((rect, None if probe is None else _worker['regions'].label_at(*probe)))
+
+    count = stats['green_count']
+    return {
+        'tile': tile,
+        'grid_sum': int(np.sum(grid_pattern[core], dtype=np.int64)),
+        'variance_sum': float(np.sum(local_variance[core], dtype=np.float64)),
+        'green_count': count,
+        'green_sums': stats['mean'] * count,
+        'green_squares': (stats['std'] ** 2 + stats['mean'] ** 2) * count,
+        'hough': _worker['geometry'].partial(line_edges, tile.x0, tile.y0),
+        'dark_count': dark_count,
+        'dark_edges': dark_edges,
+        'candidates': candidates,
+        'peak_rss': process_peak_rss()
+    }
+
+class HaloSceneExecutor:
+    """Scene-level robust score of one huge image from halo-padded tiles"""
+
+    def __init__(self, tile_size=2048, max_workers=None, gsd=None, downsample=1, halo=None):
+        self.tile_size = tile_size
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.gsd = gsd
+        self.downsample = downsample
+        self.detector = RobustCemeteryDetector(gsd, downsample)
+        self.halo = halo if halo is not None else required_halo(self.detector.scale)
+        # Timing and measured peak RSS of the most recent run
+        self.last_run = {}
+
+    def score_scene(self, image_path):
+        """Score a scene. Returns (score, features, rasters), see score_arrays.
+
+        The scene is decoded straight into shared memory, so the main process
+        holds a single copy of it while the workers run.
+        """
+        start = time.perf_counter()
+        run_only = reset_peak_rss()
+        blocks, shape = share_decoded(self.detector, image_path)
+        return self._score_shared(blocks, shape, start, run_only)
+
+    def score_arrays(self, img_rgb, img_gray):
+        """Score an already decoded scene.
+
+        Returns (score, features, rasters): the scene score and its six
+        features, and rows x cols float32 rasters of the same features and
+        the score per tile core. The caller's arrays stay alive next to
+        their shared copies; use score_scene to hold only one copy.
+        """
+        start = time.perf_counter()
+        run_only = reset_peak_rss()
+        rgb_block = _share_array(img_rgb)
+        try:
+            gray_block = _share_array(img_gray)
+        except BaseException:
+            _release((rgb_block,))
+            raise
+        return self._score_shared((rgb_block, gray_block), img_gray.shape, start, run_only)
+
+    def _score_shared(self, blocks, shape, start, run_only):
+        """Score the scene in the shared blocks, then release them"""
+        rgb_block, gray_block = blocks
+        height, width = shape
+        tiles = list(tile_grid(height, width, self.tile_size))
+        worker_peaks = []
+
+        def outputs(executor):
+            for output in executor.map(_analyze_tile, tiles):
+                worker_peaks.append(output['peak_rss'])
+                yield output
+
+        try:
+            with ProcessPoolExecutor(max_workers=self.max_workers, initializer=_attach_scene,
+                                     initargs=(rgb_block.name, gray_block.name, (height, width),
+                                               self.gsd, self.downsample, self.tile_size,
+                                               self.halo)) as executor:
+                score, features, rasters = self._merge(outputs(executor), (height, width))
+        finally:
+            _release(blocks)
+
+        self.last_run = {
+            'tiles': len(tiles),
+            'halo': self.halo,
+            'elapsed': time.perf_counter() - start,
+            'peak_rss': measure_peak_rss(worker_peaks, run_only)
+        }
+        return score, features, rasters
+
+    def _merge(self, outputs, shape):
+        """Fold tile outputs, as they arrive, into scene and tile features"""
+        height, width = shape
+        scale = self.detector.scale
+        hough_threshold = scale.pixels(HOUGH_MIN_LINE_M)
+        geometry = HoughGeometry(height, width)
+        accumulator = geometry.empty()
+
+        grid_shape = tile_grid_shape(height, width, self.tile_size)
+        rasters = {name: np.zeros(grid_shape, dtype=np.float32) for name in FEATURE_NAMES + ('score',)}
+        totals = {'grid_sum': 0, 'variance_sum': 0.0, 'green_count': 0,
+                  'green_sums': np.zeros(3), 'green_squares': np.zeros(3)}
+        tiles, dark_counts, dark_edges, candidates = [], {}, {}, {}
+
+        for output in outputs:
+            tile = output['tile']
+            key = (tile.row, tile.col)
+            tiles.append(tile)
+            for name in totals:
+                totals[name] = totals[name] + output[name]
+            geometry.add(accumulator, *output['hough'])
+            dark_counts[key] = output['dark_count']
+            dark_edges[key] = output['dark_edges']
+            candidates[key] = output['candidates']
+
+            # Tile features; lines from the tile's own votes, rectangles below
+            tile_area = (tile.y1 - tile.y0) * (tile.x1 - tile.x0)
+            rho_start, votes = output['hough']
+            tile_lines = None if votes is None else geometry.peaks(votes, hough_threshold)
+            for name, value in self._features(output, tile_area, tile_lines, 0).items():
+                rasters[name][key] = value
+
+        # Rectangles whose surrounding dark region reaches the scene border
+        offsets, outside = _join_dark_regions(tiles, grid_shape, dark_counts, dark_edges)
+        density_unit = scale.area_pixels(RECT_DENSITY_UNIT_M2)
+        rect_count = 0
+        seen = set()
+        for tile in tiles:
+            owned = 0
+            for rect, probe in candidates[tile.row, tile.col]:
+                if probe is not None:
+                    probe_key, label = probe
+                    if not label or not outside[offsets[probe_key] + label]:
+                        continue
+                if rect[2:] not in seen:  # same area and bounding box means the same contour
+                    seen.add(rect[2:])
+                    owned += 1
+            rect_count += owned
+            tile_area = (tile.y1 - tile.y0) * (tile.x1 - tile.x0)
+            rasters['rectangular_density'][tile.row, tile.col] = min(owned / (tile_area / density_unit), 1.0)
+
+        features = self._features(totals, height * width, geometry.peaks(accumulator, hough_threshold),
+                                  rect_count)
+        score = float(self.detector.weighted_score(features))
+        rasters['score'] = self.detector.weighted_score(rasters).astype(np.float32)
+        return score, features, rasters
+
+    def _features(self, totals, area, lines, rect_count):
+        """The six robust features from summed tile outputs over an area"""
+        detector = self.detector
+        count = totals['green_count']
+        if count * 255 > 1000:  # same minimum green mask sum as analyze_color_patterns
+            mean = totals['green_sums'] / count
+            std = np.sqrt(np.maximum(totals['green_squares'] / count - mean * mean, 0))
+            color_uniformity = 1.0 / (1.0 + np.mean(std) / 50.0)
+        else:
+            color_uniformity = 0
+
+        if lines is not None:
+            rho, theta = lines
+            lines = np.stack([rho, theta], axis=1)[:, None] if rho.size else None
+
+        density_unit = detector.scale.area_pixels(RECT_DENSITY_UNIT_M2)
+        return {
+            'regularity_score': totals['grid_sum'] / (area * 255.0),
+            'texture_uniformity': 1.0 / (1.0 + totals['variance_sum'] / area / 1000.0),
+            'line_regularity': detector.line_regularity(lines),
+            'rectangular_density': min(rect_count / (area / density_unit), 1.0),
+            'green_percentage': count / area,
+            'color_uniformity': color_uniformity
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description="Score one huge scene from halo-padded tiles in parallel")
+    parser.add_argument('image', help="Scene to analyze")
+    parser.add_argument('--tile-size', type=int, default=2048)
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument('--gsd', type=float, default=None, help="Ground sample distance in meters/pixel")
+    parser.add_argument('--halo', type=int, default=None, help="Tile overlap in pixels (default: largest kernel)")
+    parser.add_argument('--output', default=None, help="Where to save the per-tile rasters (.npz)")
+    parser.add_argument('--compare', action='store_true', help="Also score the whole image in one pass")
+    args = parser.parse_args()
+
+    executor = HaloSceneExecutor(tile_size=args.tile_size, max_workers=args.workers, gsd=args.gsd,
+                                 halo=args.halo)
+    score, features, rasters = executor.score_scene(args.image)
+
+    output = args.output or f"halo_rasters_{os.path.splitext(os.path.basename(args.image))[0]}.npz"
+    np.savez(output, **rasters)
+
+    run = executor.last_run
+    print(f"🔍 {os.path.basename(args.image)}: score {score:.4f} from {run['tiles']} tiles "
+          f"(halo {run['halo']}px) in {run['elapsed']:.2f}s")
+    for name in FEATURE_NAMES:
+        print(f"   • {name}: {features[name]:.4f}")
+    if run['peak_rss'] is not None:
+        scope = "" if run['peak_rss']['run_only'] else " (main: process lifetime)"
+        print(f"📏 Measured peak RSS{scope}: {format_bytes(run['peak_rss']['self'])} (main), "
+              f"{format_bytes(run['peak_rss']['children'])} (largest worker)")
+    print(f"✅ Per-tile rasters saved as: {output}")
+
+    if args.compare:
+        start = time.perf_counter()
+        whole_score, _, _ = executor.detector.calculate_cemetery_score(args.image, raise_errors=True)
+        print(f"⚖️  Whole-image score {whole_score:.4f} in {time.perf_counter() - start:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Additive standard Hough accumulator for tiled line detection.
+
+cv2.HoughLines only returns the peaks of its accumulator. But the
+accumulator itself is a plain sum of one vote per edge pixel and angle, so
+accumulators for disjoint parts of an image add up to the accumulator of the
+whole image when every part votes in whole-image coordinates. This module
+mirrors OpenCV's HoughLinesStandard (1 px rho, float32 trig tables, lrint
+rounding, same peak test) so that per-tile partial accumulators can be
+merged and then peak-picked to give the whole-image lines.
+
+Each partial accumulator only spans the rho range its pixels reach, so it
+stays proportional to the tile, not the scene.
+
+Usage:
+    python hough_accumulator.py image.png --threshold 100
+"""
+
+import argparse
+import os
+
+import cv2
+import numpy as np
+
+# Edge pixels voted per chunk, bounding the size of the vote arrays
+VOTE_CHUNK = 1 << 15
+
+class HoughGeometry:
+    """Angle and rho quantization of cv2.HoughLines(edges, 1, theta) for an
+    image of the given size"""
+
+    def __init__(self, height, width, theta=np.pi / 180):
+        self.theta = theta
+        # Same angle count as OpenCV's computeNumangle for the range [0, pi)
+        numangle = int(np.floor(np.pi / theta)) + 1
+        if numangle > 1 and abs(np.pi - (numangle - 1) * theta) < theta / 2:
+            numangle -= 1
+        self.numangle = numangle
+        self.numrho = int(round((width + height) * 2 + 1))
+        # OpenCV steps the angle in float32, so later angles drift slightly
+        angles = np.zeros(numangle, dtype=np.float32)
+        for n in range(1, numangle):
+            angles[n] = angles[n - 1] + np.float32(theta)
+        self.sin = np.sin(angles.astype(np.float64)).astype(np.float32)
+        self.cos = np.cos(angles.astype(np.float64)).astype(np.float32)
+        # Reported angles are computed as min_theta + n * theta instead
+        self.angles = (np.arange(numangle) * np.float32(theta)).astype(np.float32)
+
+    def partial(self, edges, x0=0, y0=0):
+        """(rho_start, votes) for an edge map placed at (x0, y0) in the image.
+
+        votes is a numangle x span int32 array whose column 0 is the rho bin
+        rho_start. Returns (0, None) when there are no edge pixels.
+        """
+        ys, xs = np.nonzero(edges)
+        if xs.size == 0:
+            return 0, None
+        xs = (xs + x0).astype(np.float32)
+        ys = (ys + y0).astype(np.float32)
+
+        # Rho bins reachable from the bounding box of the edge pixels
+        corners_x = np.array([xs.min(), xs.max()], dtype=np.float32)
+        corners_y = np.array([ys.min(), ys.max()], dtype=np.float32)
+        extremes = (corners_x[:, None, None] * self.cos + corners_y[None, :, None] * self.sin).ravel()
+        offset = (self.numrho - 1) // 2
+        rho_start = int(np.rint(extremes.min())) + offset - 1
+        span = int(np.rint(extremes.max())) + offset + 2 - rho_start
+
+        votes = np.zeros(self.numangle * span, dtype=np.int64)
+        base = (np.arange(self.numangle) * span + offset - rho_start)[:, None]
+        for start in range(0, xs.size, VOTE_CHUNK):
+            chunk_x = xs[start:start + VOTE_CHUNK]
+            chunk_y = ys[start:start + VOTE_CHUNK]
+            # float32 products and sum, rounded half to even like cvRound
+            rho = np.rint(chunk_x * self.cos[:, None] + chunk_y * self.sin[:, None]).astype(np.int64)
+            votes += np.bincount((rho + base).ravel(), minlength=votes.size)
+        return rho_start, votes.reshape(self.numangle, span).astype(np.int32)
+
+    def empty(self):
+        """Zeroed whole-image accumulator (numangle x numrho)"""
+        return np.zeros((self.numangle, self.numrho), dtype=np.int32)
+
+    def add(self, accumulator, rho_start, votes):
+        """Add a partial accumulator into a whole-image one in place"""
+        if votes is None:
+            return
+        # Bins outside [0, numrho) never receive votes, only the padding does
+        lo, hi = max(rho_start, 0), min(rho_start + votes.shape[1], self.numrho)
+        accumulator[:, lo:hi] += votes[:, lo - rho_start:hi - rho_start]
+
+    def peaks(self, accumulator, threshold):
+        """(rho, theta) float32 arrays of the lines cv2.HoughLines reports,
+        strongest first"""
+        padded = np.pad(accumulator, 1)
+        center = padded[1:-1, 1:-1]
+        is_peak = ((center > threshold) &
+                   (center > padded[1:-1, :-2]) & (center >= padded[1:-1, 2:]) &
+                   (center > padded[:-2, 1:-1]) & (center >= padded[2:, 1:-1]))
+        angle_index, rho_index = np.nonzero(is_peak)
+
+        # Sorted by votes, ties in accumulator order, as OpenCV does
+        order = np.lexsort((angle_index * self.numrho + rho_index, -center[angle_index, rho_index]))
+        angle_index, rho_index = angle_index[order], rho_index[order]
+        rho = (rho_index - (self.numrho - 1) * 0.5).astype(np.float32)
+        return rho, self.angles[angle_index]
+
+def hough_lines(edges, threshold, theta=np.pi / 180):
+    """Whole-image lines as (rho, theta) arrays, from the additive accumulator"""
+    geometry = HoughGeometry(edges.shape[0], edges.shape[1], theta)
+    accumulator = geometry.empty()
+    geometry.add(accumulator, *geometry.partial(edges))
+    return geometry.peaks(accumulator, threshold)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the additive Hough accumulator with cv2.HoughLines")
+    parser.add_argument('image', help="Image to analyze")
+    parser.add_argument('--threshold', type=int, default=100, help="Accumulator threshold")
+    args = parser.parse_args()
+
+    img_gray = cv2.imread(args.image, cv2.IMREAD_GRAYSCALE)
+    if img_gray is None:
+        print(f"❌ Could not load image: {args.image}")
+        return
+
+    edges = cv2.Canny(img_gray, 50, 150)
+    rho, theta = hough_lines(edges, args.threshold)
+    lines = cv2.HoughLines(edges, 1, np.pi / 180, threshold=args.threshold)
+    reference = 0 if lines is None else len(lines)
+    print(f"📏 {os.path.basename(args.image)}: {rho.size} lines (cv2.HoughLines: {reference})")
+
+if __name__ == "__main__":
+    main()
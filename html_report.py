@@ -0,0 +1,219 @@
+"""
+Batch HTML report of stored detection results.
+
+Writes one static HTML page with a row per image. Score, status and feature
+columns sort when their header is clicked. Each row shows a small thumbnail
+that links to an overlay of the vegetation mask (green) and the grid-line
+pattern (red). Thumbnails and overlays are drawn with OpenCV in a process
+pool rather than with matplotlib. Each image is decoded once, at the
+coarsest codec reduction that still covers the overlay size. Asset names
+are keyed on the image path, gsd and sizes, and images whose thumbnails
+are newer than the image are skipped, so rebuilding a report only renders
+what changed.
+
+Scores come from the results store, e.g. as filled by batch_runner.py.
+
+Usage:
+    python batch_runner.py *.png
+    python html_report.py --output cemetery_report.html
+"""
+
+import argparse
+import hashlib
+import html
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from color_statistics import green_mask
+from final_cemetery_detector import RobustCemeteryDetector
+from image_loading import read_covering
+from results_store import ResultsStore, DEFAULT_STORE_PATH
+
+THUMBNAIL_SIZE = 160
+OVERLAY_SIZE = 640
+JPEG_QUALITY = 85
+
+# Sorts the table by the clicked column; numbers compare as numbers
+SORT_SCRIPT = """
+document.querySelectorAll('th').forEach(function (header, column) {
+  header.addEventListener('click', function () {
+    var body = header.closest('table').tBodies[0];
+    var ascending = header.dataset.order !== 'asc';
+    header.dataset.order = ascending ? 'asc' : 'desc';
+    var rows = Array.from(body.rows);
+    rows.sort(function (a, b) {
+      var x = a.cells[column].dataset.value, y = b.cells[column].dataset.value;
+      var nx = parseFloat(x), ny = parseFloat(y);
+      var order = (isNaN(nx) || isNaN(ny)) ? x.localeCompare(y) : nx - ny;
+      return ascending ? order : -order;
+    });
+    rows.forEach(function (row) { body.appendChild(row); });
+  });
+});
+"""
+
+STYLE = """
+body { font-family: sans-serif; margin: 2em; }
+table { border-collapse: collapse; }
+th { cursor: pointer; background: #eee; position: sticky; top: 0; }
+th, td { border: 1px solid #ccc; padding: 4px 8px; text-align: right; }
+td.name, td.status { text-align: left; }
+tr.high { background: #e6f4ea; } tr.medium { background: #fef7e0; }
+tr.failed { color: #999; }
+"""
+
+def _asset_stem(image_path, gsd, thumbnail_size, overlay_size):
+    """Stable, collision-free file stem for an image's report assets drawn
+    with these settings"""
+    key = f"{os.path.abspath(image_path)}|{gsd}|{thumbnail_size}|{overlay_size}"
+    digest = hashlib.blake2b(key.encode(), digest_size=8).hexdigest()
+    return f"{os.path.splitext(os.path.basename(image_path))[0]}_{digest}"
+
+def render_assets(image_path, asset_dir, gsd=None, thumbnail_size=THUMBNAIL_SIZE, overlay_size=OVERLAY_SIZE):
+    """Write an image's thumbnail and overlay JPEGs into asset_dir.
+
+    Returns (thumbnail file, overlay file) names relative to asset_dir.
+    Existing files for the same settings that are newer than the image are
+    kept.
+    """
+    stem = _asset_stem(image_path, gsd, thumbnail_size, overlay_size)
+    thumbnail_name, overlay_name = f"{stem}_thumb.jpg", f"{stem}_overlay.jpg"
+    thumbnail_path = os.path.join(asset_dir, thumbnail_name)
+    overlay_path = os.path.join(asset_dir, overlay_name)
+    if (os.path.exists(thumbnail_path) and os.path.exists(overlay_path)
+            and os.path.getmtime(thumbnail_path) >= os.path.getmtime(image_path)):
+        return thumbnail_name, overlay_name
+
+    img, factor = read_covering(image_path, overlay_size)
+    shrink = max(img.shape[:2]) / overlay_size
+    if shrink > 1:
+        img = cv2.resize(img, None, fx=1.0 / shrink, fy=1.0 / shrink, interpolation=cv2.INTER_AREA)
+    else:
+        shrink = 1.0
+
+    # Grid lines at the resolution drawn, with kernels kept at their ground size
+    detector = RobustCemeteryDetector(gsd, factor * shrink)
+    grid_pattern, _ = detector.detect_regular_patterns(cv2.cvtColor(img, cv2.COLOR_BGR2GRAY))
+
+    overlay = img.copy()
+    vegetation = green_mask(img, 'bgr') > 0
+    overlay[vegetation] = (0.6 * overlay[vegetation] + 0.4 * np.array([0, 200, 0])).astype(np.uint8)
+    overlay[grid_pattern > 0] = (0, 0, 255)
+    cv2.imwrite(overlay_path, overlay, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+
+    thumb_scale = thumbnail_size / max(img.shape[:2])
+    thumbnail = cv2.resize(img, None, fx=thumb_scale, fy=thumb_scale, interpolation=cv2.INTER_AREA)
+    cv2.imwrite(thumbnail_path, thumbnail, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+    return thumbnail_name, overlay_name
+
+def _render_task(task):
+    """Worker task: render one image's assets, reporting errors instead of raising"""
+    image_path, asset_dir, gsd = task
+    try:
+        return render_assets(image_path, asset_dir, gsd)
+    except Exception as e:
+        return None, str(e)
+
+def _row_class(result):
+    if result['status'] != 'ok' or result['score'] is None:
+        return 'failed'
+    if result['score'] >= 0.7:
+        return 'high'
+    if result['score'] >= 0.4:
+        return 'medium'
+    return 'low'
+
+def _cell(value, css_class=None, text=None):
+    attributes = f' class="{css_class}"' if css_class else ''
+    value = '' if value is None else value
+    text = html.escape(str(value) if text is None else text)
+    return f'<td{attributes} data-value="{html.escape(str(value))}">{text}</td>'
+
+def build_report(results, output_path, gsd=None, max_workers=None, title="Cemetery Detection Report"):
+    """Write the HTML report for result dicts with 'scene', 'score',
+    'features', 'status' and 'message' (as ResultsStore yields them).
+
+    Assets go into a '<report name>_files' directory next to the page.
+    Returns the number of images whose assets could not be rendered.
+    """
+    results = sorted(results, key=lambda result: -(result['score'] or 0))
+    asset_dir = os.path.splitext(output_path)[0] + "_files"
+    os.makedirs(asset_dir, exist_ok=True)
+
+    feature_names = []
+    for result in results:
+        for name in result['features']:
+            if name not in feature_names:
+                feature_names.append(name)
+
+    tasks = [(result['scene'], asset_dir, gsd) for result in results]
+    with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count() or 1) as executor:
+        chunksize = max(1, len(tasks) // ((max_workers or os.cpu_count() or 1) * 8))
+        assets = list(executor.map(_render_task, tasks, chunksize=chunksize))
+
+    asset_link = os.path.basename(asset_dir)
+    rows = []
+    failed = 0
+    for result, (thumbnail, overlay) in zip(results, assets):
+        if thumbnail is None:
+            failed += 1
+            preview = _cell('', text=f"no preview: {overlay}")
+        else:
+            preview = (f'<td data-value=""><a href="{html.escape(asset_link)}/{html.escape(overlay)}">'
+                       f'<img src="{html.escape(asset_link)}/{html.escape(thumbnail)}" loading="lazy"></a></td>')
+        score = result['score']
+        cells = [preview,
+                 _cell(os.path.basename(result['scene']), 'name'),
+                 _cell(score, text='' if score is None else f"{score:.4f}"),
+                 _cell(result['status'], 'status', result['status'] + (f": {result['message']}"
+                                                                       if result['message'] else ''))]
+        for name in feature_names:
+            value = result['features'].get(name)
+            cells.append(_cell(value, text='' if value is None else f"{value:.4f}"))
+        rows.append(f'<tr class="{_row_class(result)}">{"".join(cells)}</tr>')
+
+    headers = ['Preview', 'Image', 'Score', 'Status'] + [name.replace('_', ' ').title() for name in feature_names]
+    page = (f'<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>{html.escape(title)}</title>'
+            f'<style>{STYLE}</style></head><body>\n'
+            f'<h1>{html.escape(title)}</h1>\n'
+            f'<p>{len(results)} images, generated {time.strftime("%Y-%m-%d %H:%M")}. '
+            f'Click a column header to sort, a thumbnail for the overlay.</p>\n'
+            f'<table><thead><tr>{"".join(f"<th>{html.escape(h)}</th>" for h in headers)}</tr></thead>\n'
+            f'<tbody>\n' + "\n".join(rows) + '\n</tbody></table>\n'
+            f'<script>{SORT_SCRIPT}</script></body></html>\n')
+
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write(page)
+    return failed
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a static HTML report from stored results")
+    parser.add_argument('images', nargs='*', help="Only report these images (default: all stored)")
+    parser.add_argument('--db', default=DEFAULT_STORE_PATH, help="Results database")
+    parser.add_argument('--detector', choices=['robust', 'simple', 'cemetery'], default='robust')
+    parser.add_argument('--output', default="cemetery_report.html", help="HTML file to write")
+    parser.add_argument('--workers', type=int, default=None, help="Rendering processes (default: all cores)")
+    parser.add_argument('--gsd', type=float, default=None, help="Ground sample distance in meters/pixel")
+    args = parser.parse_args()
+
+    with ResultsStore(args.db) as store:
+        results = [result for result in store.iter_results(args.detector, status=None) if not result['tile']]
+    if args.images:
+        wanted = set(args.images)
+        results = [result for result in results if result['scene'] in wanted]
+    if not results:
+        print(f"❌ No stored {args.detector} results found in {args.db}")
+        return
+
+    start = time.perf_counter()
+    failed = build_report(results, args.output, args.gsd, args.workers)
+    print(f"📄 Report for {len(results)} images written to {args.output} in {time.perf_counter() - start:.1f}s")
+    if failed:
+        print(f"⚠️  {failed} image(s) could not be previewed")
+
+if __name__ == "__main__":
+    main()
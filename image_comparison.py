@@ -0,0 +1,177 @@
+"""
+N-way image comparison.
+
+Generalizes compare_images to any number of images. Every image is scored
+once, in parallel through BatchRunner. Results already in the ResultsStore
+are reused when the file's content hash still matches and they were scored
+at full resolution with the same gsd; rows from a reduced-resolution retry
+and rows a near-duplicate copied from another image are rescored. The ranking,
+pairwise score differences and the compare_images confidence metric for
+every pair come from one vectorized computation over the score vector.
+Plots are drawn from those results and never rescore an image.
+
+Usage:
+    python image_comparison.py img1.png img2.png img3.png --detector robust --plot
+"""
+
+import argparse
+import os
+
+import numpy as np
+import matplotlib.pyplot as plt
+
+from batch_runner import BatchRunner
+from ground_scale import GroundScale
+from pyramid_cache import file_content_hash
+from results_store import ResultsStore, DEFAULT_STORE_PATH
+
+# Score differences below this are too close to call, as in compare_images
+CLOSE_CALL_MARGIN = 0.05
+
+def pairwise_comparison(scores):
+    """Score difference and confidence for every pair of images.
+
+    difference[i, j] is scores[i] - scores[j]. confidence[i, j] is the
+    compare_images confidence (in percent) that image i beats image j, and
+    zero where i does not score higher. NaN scores (failed images) give NaN
+    entries.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    difference = scores[:, None] - scores[None, :]
+    confidence = np.where(difference > 0, difference / np.maximum(scores, 0.001)[:, None] * 100, 0.0)
+    confidence[np.isnan(difference)] = np.nan
+    return difference, confidence
+
+def compare_many(image_paths, detector_name='robust', store=None, max_workers=None,
+                 timeout=None, gsd=None):
+    """Score any number of images once and compare every pair.
+
+    Returns a dict with images, scores (NaN for failures), features,
+    status, ranking (indices of scored images, best first), difference and
+    confidence matrices, and reused (how many results came from the store).
+    """
+    image_paths = list(image_paths)
+    results = [None] * len(image_paths)
+
+    # Reuse stored full-resolution results for unchanged files at this gsd,
+    # scored from the file itself
+    if store is not None:
+        source_gsd = GroundScale(gsd).source_gsd
+        for index, path in enumerate(image_paths):
+            stored = store.get_result(path, detector_name)
+            if (stored is not None and stored['status'] == 'ok' and stored['content_hash']
+                    and stored['gsd'] == source_gsd and stored['downsample'] == 1
+                    and stored['duplicate_of'] is None
+                    and os.path.exists(path) and stored['content_hash'] == file_content_hash(path)):
+                results[index] = stored
+    reused = sum(result is not None for result in results)
+
+    missing = [index for index, result in enumerate(results) if result is None]
+    if missing:
+        runner = BatchRunner(detector_name, timeout, max_workers, gsd, store=store)
+        for index, result in zip(missing, runner.run([image_paths[index] for index in missing])):
+            results[index] = result
+
+    status = [result['status'] for result in results]
+    scores = np.array([result['score'] if result['status'] == 'ok' else np.nan for result in results])
+    difference, confidence = pairwise_comparison(scores)
+
+    scored = np.flatnonzero(~np.isnan(scores))
+    ranking = scored[np.argsort(-scores[scored], kind='stable')]
+
+    return {
+        'images': image_paths,
+        'scores': scores,
+        'features': [result['features'] for result in results],
+        'status': status,
+        'ranking': ranking,
+        'difference': difference,
+        'confidence': confidence,
+        'reused': reused
+    }
+
+def print_comparison(comparison):
+    """Ranking table and the verdict between neighbouring ranks"""
+    images, scores = comparison['images'], comparison['scores']
+
+    print("\n" + "="*60)
+    print("🏛️  CEMETERY DETECTION RANKING")
+    print("="*60)
+    for rank, index in enumerate(comparison['ranking'], 1):
+        score = scores[index]
+        status = "🏆" if score >= 0.7 else "⚠️" if score >= 0.4 else "❌"
+        print(f"   {rank}. {status} {os.path.basename(images[index])}: {score:.4f}")
+    for index, status in enumerate(comparison['status']):
+        if status != 'ok':
+            print(f"   ⛔ {os.path.basename(images[index])}: {status}")
+
+    ranking = comparison['ranking']
+    if len(ranking) > 1:
+        print("\n🔬 NEIGHBOURING RANKS")
+        for better, worse in zip(ranking[:-1], ranking[1:]):
+            difference = comparison['difference'][better, worse]
+            name_better = os.path.basename(images[better])
+            name_worse = os.path.basename(images[worse])
+            if difference < CLOSE_CALL_MARGIN:
+                print(f"   🤔 {name_better} vs {name_worse}: too close to call ({difference:.4f})")
+            else:
+                print(f"   📈 {name_better} over {name_worse}: "
+                      f"{comparison['confidence'][better, worse]:.1f}% confidence")
+
+    if comparison['reused']:
+        print(f"\n♻️  {comparison['reused']} result(s) reused from the results store")
+
+def plot_comparison(comparison, save_path=None):
+    """Ranked score bars and the pairwise difference matrix, from stored results"""
+    ranking = comparison['ranking']
+    names = [os.path.basename(comparison['images'][index]) for index in ranking]
+    scores = comparison['scores'][ranking]
+
+    fig, axes = plt.subplots(1, 2, figsize=(15, max(4, 0.4 * len(names) + 2)))
+    fig.suptitle('Cemetery Detection Comparison', fontsize=16)
+
+    axes[0].barh(range(len(names)), scores, color='seagreen')
+    axes[0].set_yticks(range(len(names)))
+    axes[0].set_yticklabels(names)
+    axes[0].invert_yaxis()
+    axes[0].set_xlabel('Cemetery Score')
+    axes[0].set_title('Ranking')
+
+    difference = comparison['difference'][np.ix_(ranking, ranking)]
+    limit = max(np.nanmax(np.abs(difference)), 1e-6) if difference.size else 1
+    image = axes[1].imshow(difference, cmap='RdYlGn', vmin=-limit, vmax=limit)
+    axes[1].set_xticks(range(len(names)))
+    axes[1].set_xticklabels(names, rotation=90)
+    axes[1].set_yticks(range(len(names)))
+    axes[1].set_yticklabels(names)
+    axes[1].set_title('Score Difference (row - column)')
+    fig.colorbar(image, ax=axes[1])
+
+    plt.tight_layout()
+
+    if save_path:
+        plt.savefig(save_path, dpi=300, bbox_inches='tight')
+        print(f"Comparison plot saved as: {save_path}")
+
+    plt.show()
+
+def main():
+    parser = argparse.ArgumentParser(description="Rank any number of images by cemetery likelihood")
+    parser.add_argument('images', nargs='+', help="Images to compare")
+    parser.add_argument('--detector', choices=['robust', 'simple', 'cemetery'], default='robust')
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument('--timeout', type=float, default=None, help="Seconds allowed per image")
+    parser.add_argument('--gsd', type=float, default=None, help="Ground sample distance in meters/pixel")
+    parser.add_argument('--db', default=DEFAULT_STORE_PATH, help="Results database to reuse and update")
+    parser.add_argument('--plot', action='store_true', help="Plot the ranking and difference matrix")
+    args = parser.parse_args()
+
+    with ResultsStore(args.db) as store:
+        comparison = compare_many(args.images, args.detector, store, args.workers, args.timeout, args.gsd)
+
+    print_comparison(comparison)
+    if args.plot:
+        plot_comparison(comparison, "cemetery_comparison.png")
+
+if __name__ == "__main__":
+    main()
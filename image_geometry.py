@@ -0,0 +1,52 @@
+"""
+Geometry helpers for rotated analysis windows.
+
+Rotating an aerial image by an arbitrary angle leaves empty corners, and
+the fill would count as texture and edges. rotate_crop rotates about the
+center and keeps only the largest axis-aligned rectangle that is fully
+covered by image content.
+"""
+
+import math
+
+import cv2
+
+def inscribed_rectangle(width, height, angle):
+    """(width, height) of the largest axis-aligned rectangle inside a
+    width x height rectangle rotated by angle degrees"""
+    if width <= 0 or height <= 0:
+        return 0, 0
+
+    radians = math.radians(angle)
+    sin_a, cos_a = abs(math.sin(radians)), abs(math.cos(radians))
+    long_side, short_side = max(width, height), min(width, height)
+
+    if short_side <= 2.0 * sin_a * cos_a * long_side or abs(sin_a - cos_a) < 1e-10:
+        # Half constrained: two corners of the rectangle touch the longer side
+        x = 0.5 * short_side
+        if width >= height:
+            crop_width, crop_height = x / sin_a if sin_a > 1e-10 else width, x / cos_a
+        else:
+            crop_width, crop_height = x / cos_a, x / sin_a if sin_a > 1e-10 else height
+    else:
+        # Fully constrained: the rectangle touches all four sides
+        cos_2a = cos_a * cos_a - sin_a * sin_a
+        crop_width = (width * cos_a - height * sin_a) / cos_2a
+        crop_height = (height * cos_a - width * sin_a) / cos_2a
+
+    return int(min(crop_width, width)), int(min(crop_height, height))
+
+def rotate_crop(img, angle):
+    """Rotate an image by angle degrees (counter-clockwise) about its center
+    and crop to the largest fully covered axis-aligned rectangle"""
+    height, width = img.shape[:2]
+    if angle % 360 == 0:
+        return img
+
+    matrix = cv2.getRotationMatrix2D((width / 2.0, height / 2.0), angle, 1.0)
+    rotated = cv2.warpAffine(img, matrix, (width, height), flags=cv2.INTER_LINEAR)
+
+    crop_width, crop_height = inscribed_rectangle(width, height, angle)
+    x0 = (width - crop_width) // 2
+    y0 = (height - crop_height) // 2
+    return rotated[y0:y0 + crop_height, x0:x0 + crop_width]
@@ -0,0 +1,102 @@
+"""
+Image decoding at the resolution and representation the features need.
+
+Grayscale-only runs convert the decoded BGR image with the same cvtColor as
+color runs and drop it at once, so no RGB copy is made. The codecs' own
+grayscale decode is not used: on RGBA PNGs it differs from cvtColor by up to
+17 gray levels, which would make the gray features depend on whether color
+features are on. Downsample factors divisible by 2, 4 or 8 use OpenCV's
+IMREAD_REDUCED_* flags, which let the codec produce the smaller image (JPEG
+scales in the DCT and never builds the full-resolution image). Any factor
+left over is applied with INTER_AREA, as GroundScale.resize does.
+
+Usage:
+    python image_loading.py scene.jpg --downsample 4 --gray
+"""
+
+import argparse
+import os
+import time
+
+import cv2
+
+REDUCED_COLOR_FLAGS = {2: cv2.IMREAD_REDUCED_COLOR_2, 4: cv2.IMREAD_REDUCED_COLOR_4,
+                       8: cv2.IMREAD_REDUCED_COLOR_8}
+
+def reduced_decode_factor(downsample):
+    """Largest codec reduction (8, 4 or 2) that divides the downsample factor"""
+    for factor in (8, 4, 2):
+        if downsample % factor == 0:
+            return factor
+    return 1
+
+def read_image(image_path, grayscale=False, downsample=1):
+    """Decode an image at 1/downsample resolution, as BGR or grayscale.
+
+    Grayscale is converted from the BGR decode, exactly as decode_image
+    converts color runs. A reduced decode rounds odd sizes up, so the result
+    can be one pixel larger than resizing a full decode.
+    """
+    factor = reduced_decode_factor(downsample)
+    flags = REDUCED_COLOR_FLAGS[factor] if factor > 1 else cv2.IMREAD_COLOR
+
+    img = cv2.imread(image_path, flags)
+    if img is None:
+        raise ValueError(f"Could not load image: {image_path}")
+
+    remaining = downsample / factor
+    if remaining != 1:
+        img = cv2.resize(img, None, fx=1.0 / remaining, fy=1.0 / remaining,
+                         interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if grayscale else img
+
+def read_covering(image_path, size, grayscale=False):
+    """(image, downsample) decoded at the largest codec reduction whose long
+    side is still at least size, for previews and hashes"""
+    for factor in (8, 4, 2):
+        img = read_image(image_path, grayscale, factor)
+        if max(img.shape[:2]) >= size:
+            return img, factor
+    return read_image(image_path, grayscale), 1
+
+def crop_window(img, window):
+    """Rows y0:y1 and columns x0:x1 of an image (window is (y0, x0, y1, x1))"""
+    if img is None or window is None:
+        return img
+    y0, x0, y1, x1 = window
+    return img[y0:y1, x0:x1]
+
+def decode_image(image_path, downsample=1, color=True, window=None):
+    """(img_rgb, img_gray) at 1/downsample resolution.
+
+    With color=False only the grayscale image is kept and img_rgb is None;
+    it is identical to img_gray of a color decode. window (y0, x0, y1, x1), in downsampled pixels, crops both.
+    """
+    if not color:
+        return None, crop_window(read_image(image_path, grayscale=True, downsample=downsample), window)
+
+    img = crop_window(read_image(image_path, downsample=downsample), window)
+    return cv2.cvtColor(img, cv2.COLOR_BGR2RGB), cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+def main():
+    parser = argparse.ArgumentParser(description="Time full versus reduced image decoding")
+    parser.add_argument('image', help="Image to decode")
+    parser.add_argument('--downsample', type=float, default=1)
+    parser.add_argument('--gray', action='store_true', help="Decode to grayscale only")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    img_rgb, img_gray = decode_image(args.image, 1, True)
+    full_time = time.perf_counter() - start
+    del img_rgb, img_gray
+
+    start = time.perf_counter()
+    img_rgb, img_gray = decode_image(args.image, args.downsample, not args.gray)
+    reduced_time = time.perf_counter() - start
+
+    print(f"🖼️  {os.path.basename(args.image)}: full color decode {full_time * 1000:.1f} ms")
+    print(f"⚡ {'Grayscale' if args.gray else 'Color'} decode at 1/{args.downsample:g}: "
+          f"{reduced_time * 1000:.1f} ms, {img_gray.shape[1]}x{img_gray.shape[0]}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Persisted intermediate maps as chunked, compressed on-disk arrays.
+
+Maps such as grid_pattern, variance_map, edges or the FFT spectrum are split
+into square chunks and written under <root>/<scene>/<tile>/<map name>/.
+A detector's maps (save_maps/load_maps) go under <root>/<scene>/<variant>/,
+where the variant hashes the file's content together with the settings the
+maps depend on (gsd, downsample, grid alignment), so a changed file or a run
+at other settings never picks up stale maps. The features of that run are
+kept beside them. Chunks are zlib-compressed by default. With compress=False they are plain
+.npy files and are opened memory-mapped. Reading a window only touches the
+chunks it overlaps, so visualization, debugging or re-scoring never has to
+rerun the pipeline or load a whole map.
+
+Usage:
+    python map_store.py image1.jpg image2.jpg --detector robust --root cemetery_maps
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import zlib
+
+import numpy as np
+
+DEFAULT_MAP_ROOT = "cemetery_maps"
+
+def file_content_hash(path, block_size=1 << 20):
+    """blake2b digest of a file's bytes"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def map_variant(scene, settings):
+    """Directory name for maps of the scene's current content at the given settings"""
+    key = json.dumps({'content': file_content_hash(scene), 'settings': settings}, sort_keys=True)
+    return hashlib.blake2b(key.encode('utf-8'), digest_size=8).hexdigest()
+
+def scene_directory(scene):
+    """Stable directory name for a scene: readable stem plus a path hash"""
+    stem = re.sub(r'[^A-Za-z0-9_.-]', '_', os.path.splitext(os.path.basename(scene))[0])
+    digest = hashlib.blake2b(os.path.abspath(scene).encode('utf-8'), digest_size=4).hexdigest()
+    return f"{stem}_{digest}"
+
+class ChunkedMap:
+    """Read access to one stored map"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        self.shape = tuple(meta['shape'])
+        self.dtype = np.dtype(meta['dtype'])
+        self.chunk_size = meta['chunk_size']
+        self.compressed = meta['compressed']
+
+    def _chunk_shape(self, i, j):
+        height = min(self.chunk_size, self.shape[0] - i * self.chunk_size)
+        width = min(self.chunk_size, self.shape[1] - j * self.chunk_size)
+        return (height, width) + self.shape[2:]
+
+    def read_chunk(self, i, j):
+        """Chunk (i, j); memory-mapped when stored uncompressed"""
+        if self.compressed:
+            with open(os.path.join(self.path, f"{i}_{j}.zlib"), 'rb') as f:
+                data = zlib.decompress(f.read())
+            return np.frombuffer(data, dtype=self.dtype).reshape(self._chunk_shape(i, j))
+        return np.load(os.path.join(self.path, f"{i}_{j}.npy"), mmap_mode='r')
+
+    def read_window(self, y0, x0, y1, x1):
+        """Rows y0:y1 and columns x0:x1, reading only the overlapping chunks"""
+        y0, x0 = max(y0, 0), max(x0, 0)
+        y1, x1 = min(y1, self.shape[0]), min(x1, self.shape[1])
+        out = np.empty((max(y1 - y0, 0), max(x1 - x0, 0)) + self.shape[2:], dtype=self.dtype)
+        size = self.chunk_size
+
+        for i in range(y0 // size, (y1 - 1) // size + 1 if y1 > y0 else 0):
+            for j in range(x0 // size, (x1 - 1) // size + 1 if x1 > x0 else 0):
+                chunk = self.read_chunk(i, j)
+                cy0, cx0 = max(y0, i * size), max(x0, j * size)
+                cy1, cx1 = min(y1, (i + 1) * size), min(x1, (j + 1) * size)
+                out[cy0 - y0:cy1 - y0, cx0 - x0:cx1 - x0] = \
+                    chunk[cy0 - i * size:cy1 - i * size, cx0 - j * size:cx1 - j * size]
+
+        return out
+
+    def read(self):
+        """The whole map"""
+        return self.read_window(0, 0, self.shape[0], self.shape[1])
+
+class MapStore:
+    """Chunked on-disk store of intermediate maps keyed by scene and tile"""
+
+    def __init__(self, root=DEFAULT_MAP_ROOT, chunk_size=256, compress=True, level=3):
+        self.root = root
+        self.chunk_size = chunk_size
+        self.compress = compress
+        self.level = level
+
+    def map_path(self, scene, name, tile='', variant=''):
+        return os.path.join(self.root, scene_directory(scene), variant, tile or 'full', name)
+
+    def save_map(self, scene, name, array, tile='', variant=''):
+        """Write a map, replacing any stored version"""
+        path = self.map_path(scene, name, tile, variant)
+        os.makedirs(path, exist_ok=True)
+        for entry in os.listdir(path):
+            os.remove(os.path.join(path, entry))
+
+        array = np.asarray(array)
+        size = self.chunk_size
+        for i in range((array.shape[0] + size - 1) // size):
+            for j in range((array.shape[1] + size - 1) // size):
+                chunk = np.ascontiguousarray(array[i * size:(i + 1) * size, j * size:(j + 1) * size])
+                if self.compress:
+                    with open(os.path.join(path, f"{i}_{j}.zlib"), 'wb') as f:
+                        f.write(zlib.compress(chunk.tobytes(), self.level))
+                else:
+                    np.save(os.path.join(path, f"{i}_{j}.npy"), chunk)
+
+        # Metadata last, so a map is only visible once all chunks are written
+        with open(os.path.join(path, 'meta.json'), 'w') as f:
+            json.dump({'shape': list(array.shape), 'dtype': array.dtype.str,
+                       'chunk_size': size, 'compressed': self.compress}, f)
+
+    def open_map(self, scene, name, tile='', variant=''):
+        """ChunkedMap for a stored map, or None if it was never saved"""
+        path = self.map_path(scene, name, tile, variant)
+        if not os.path.exists(os.path.join(path, 'meta.json')):
+            return None
+        return ChunkedMap(path)
+
+    def load_map(self, scene, name, tile='', variant=''):
+        """Whole stored map as an array, or None if it was never saved"""
+        stored = self.open_map(scene, name, tile, variant)
+        return stored.read() if stored is not None else None
+
+    def _features_path(self, scene, prefix, tile, variant):
+        return self.map_path(scene, f"{prefix}_features.json", tile, variant)
+
+    def save_maps(self, scene, prefix, maps, names, settings, features=None, tile=''):
+        """Persist a detector's named maps as <prefix>_<name>, plus its features.
+
+        settings is a JSON-serializable dict of what the maps depend on; with
+        the file's content hash it selects the variant directory.
+        """
+        variant = map_variant(scene, settings)
+        for name in names:
+            if name in maps:
+                self.save_map(scene, f"{prefix}_{name}", maps[name], tile, variant)
+        if features is not None:
+            path = self._features_path(scene, prefix, tile, variant)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as f:
+                json.dump({name: float(value) for name, value in features.items()}, f)
+
+    def load_maps(self, scene, prefix, names, settings, tile=''):
+        """(maps, features) stored by save_maps for the scene's current content
+        and these settings; missing maps are left out, missing features are None"""
+        variant = map_variant(scene, settings)
+        maps = {}
+        for name in names:
+            stored = self.load_map(scene, f"{prefix}_{name}", tile, variant)
+            if stored is not None:
+                maps[name] = stored
+        try:
+            with open(self._features_path(scene, prefix, tile, variant)) as f:
+                features = json.load(f)
+        except (OSError, ValueError):
+            features = None
+        return maps, features
+
+def main():
+    from final_cemetery_detector import RobustCemeteryDetector
+    from simple_cemetery_detector import SimpleCemeteryDetector
+
+    parser = argparse.ArgumentParser(description="Score images and persist their intermediate maps")
+    parser.add_argument('images', nargs='+', help="Images to analyze")
+    parser.add_argument('--detector', choices=['robust', 'simple'], default='robust')
+    parser.add_argument('--root', default=DEFAULT_MAP_ROOT, help="Map store directory")
+    parser.add_argument('--raw', action='store_true', help="Store uncompressed, memory-mappable chunks")
+    parser.add_argument('--gsd', type=float, default=None, help="Ground sample distance in meters/pixel")
+    args = parser.parse_args()
+
+    store = MapStore(args.root, compress=not args.raw)
+    detector_class = RobustCemeteryDetector if args.detector == 'robust' else SimpleCemeteryDetector
+    detector = detector_class(args.gsd, map_store=store)
+
+    for path in args.images:
+        score, _, _ = detector.calculate_cemetery_score(path)
+        print(f"🔍 {os.path.basename(path)}: score {score:.4f}, maps in "
+              f"{os.path.join(args.root, scene_directory(path))}")
+
+if __name__ == "__main__":
+    main()
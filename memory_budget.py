@@ -0,0 +1,218 @@
+"""
+Memory-budgeted execution planning.
+
+Estimates the per-pixel working set of RobustCemeteryDetector for the
+feature stages its settings enable (detector_stages). From that it picks a
+tile size and worker count that keep a run under a max_memory budget, and
+reports the measured peak RSS afterwards. The per-stage figures were
+measured as peak RSS growth on 3000x3000 scenes.
+
+Peak RSS is per run where the OS allows restarting the count (Linux, via
+/proc/self/clear_refs); elsewhere it is the peak over the process lifetime,
+and measure_peak_rss says which one it reports.
+"""
+
+import math
+import os
+import sys
+from collections import namedtuple
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+# Bytes per pixel held for the whole run: RGB (3) and grayscale (1) input
+INPUT_BYTES_PER_PIXEL = 4
+
+# Decoding holds BGR, RGB and grayscale at once
+DECODE_BYTES_PER_PIXEL = 7
+
+# Per-stage bytes per pixel: (transient while the stage runs, kept until scoring ends)
+STAGE_BYTES_PER_PIXEL = {
+    'grid': (4, 1),              # blurred, edges, two openings; grid_pattern kept
+    'texture': (20, 4),          # float32 image, squares, two box filters; variance kept
+    'rectangles': (5, 0),        # threshold map and findContours working copy
+    'color': (4, 0),             # HSV image and green mask
+    'lines': (2, 0),             # Canny edges, the Hough accumulator is small
+    'texture_windows': (46, 5),  # replaces 'texture': integral images and window maps
+    'orientation': (34, 1),      # gradient structure tensor; rotated grid input kept
+    'runs': (4, 0),              # run-length tables of the grid edges
+    'pitch': (2, 0)              # projection profiles and their autocorrelation
+}
+
+# Stages RobustCemeteryDetector runs with default settings
+DEFAULT_STAGES = ('grid', 'texture', 'rectangles', 'color', 'lines')
+
+# A band of tile-size rows in the parent's per-window color pass: HSV, the
+# green mask and its boolean copy
+COLOR_BAND_BYTES_PER_PIXEL = 5
+
+# Fixed cost of one worker process (interpreter, NumPy, OpenCV)
+WORKER_OVERHEAD_BYTES = 150 * 1024 ** 2
+
+# Smallest tile worth scheduling, the tile size workers are sized for, and
+# the granularity tile sizes are rounded to
+MIN_TILE_SIZE = 256
+TARGET_TILE_SIZE = 1024
+TILE_SIZE_STEP = 256
+
+ExecutionPlan = namedtuple('ExecutionPlan', ['tile_size', 'workers', 'bytes_per_pixel',
+                                             'estimated_peak_bytes'])
+
+def parse_memory(value):
+    """Parse a size such as '512M', '4G' or a plain byte count"""
+    if isinstance(value, (int, float)):
+        return int(value)
+    text = value.strip().upper().rstrip('B')
+    units = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+def format_bytes(value):
+    """Human-readable byte count"""
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if abs(value) < 1024:
+            return f"{value:.1f} {unit}"
+        value /= 1024.0
+    return f"{value:.1f} TB"
+
+def detector_stages(detector):
+    """Stages a RobustCemeteryDetector runs with its settings"""
+    stages = ['grid', 'texture_windows' if detector.texture_windows else 'texture', 'rectangles', 'lines']
+    if detector.color_features:
+        stages.append('color')
+    if detector.align_grid:
+        stages.append('orientation')
+    if detector.grid_lengths:
+        stages.append('runs')
+    if detector.pitch_estimator is not None:
+        stages.append('pitch')
+    return tuple(stages)
+
+def estimate_bytes_per_pixel(stages=DEFAULT_STAGES, concurrent=False):
+    """Peak working-set bytes per pixel for scoring one tile.
+
+    Stages run one after another by default, so only the largest transient
+    counts. With concurrent=True all transients are live at once.
+    """
+    transients = [STAGE_BYTES_PER_PIXEL[stage][0] for stage in stages]
+    kept = sum(STAGE_BYTES_PER_PIXEL[stage][1] for stage in stages)
+    peak_transient = sum(transients) if concurrent else max(transients, default=0)
+    return INPUT_BYTES_PER_PIXEL + kept + peak_transient
+
+def plan_execution(max_memory, image_shape, stages=DEFAULT_STAGES, max_workers=None,
+                   shared_scene=True, concurrent=False, tile_size=None, band_bytes_per_pixel=0):
+    """Choose tile size and worker count that keep a run under max_memory.
+
+    stages are the feature stages each worker runs (see detector_stages).
+    With shared_scene the decoded scene (RGB + gray) sits once in shared
+    memory on top of the per-worker tile working sets. band_bytes_per_pixel
+    accounts for a pass the parent runs over bands of tile-size rows while
+    the workers score. A given tile_size is kept and only the worker count
+    is planned. A tile size covering the whole image means no tiling is
+    needed. Raises ValueError when even the smallest (or the given) tile on
+    one worker does not fit.
+    """
+    budget = parse_memory(max_memory)
+    height, width = image_shape[:2]
+    bytes_per_pixel = estimate_bytes_per_pixel(stages, concurrent)
+    max_workers = max_workers or os.cpu_count() or 1
+
+    scene_bytes = height * width * INPUT_BYTES_PER_PIXEL if shared_scene else 0
+    decode_bytes = height * width * DECODE_BYTES_PER_PIXEL
+    available = budget - scene_bytes
+
+    if decode_bytes > budget:
+        raise ValueError(f"Decoding a {width}x{height} scene needs about {format_bytes(decode_bytes)}, "
+                         f"over the {format_bytes(budget)} budget")
+
+    def tile_bytes(size):
+        return min(size, height) * min(size, width) * bytes_per_pixel + WORKER_OVERHEAD_BYTES
+
+    def band_bytes(size):
+        return min(size, height) * width * band_bytes_per_pixel
+
+    smallest = tile_size or MIN_TILE_SIZE
+    if tile_bytes(smallest) + band_bytes(smallest) > available:
+        raise ValueError(f"A {smallest}px tile needs about "
+                         f"{format_bytes(tile_bytes(smallest) + band_bytes(smallest))}, "
+                         f"only {format_bytes(available)} left after the scene")
+
+    if tile_size is not None:
+        tiles = math.ceil(height / tile_size) * math.ceil(width / tile_size)
+        workers = int(max(1, min(max_workers, tiles,
+                                 (available - band_bytes(tile_size)) // tile_bytes(tile_size))))
+    else:
+        # Use as many workers as fit with a target-sized tile each, then give
+        # each worker the largest tile its share allows
+        workers = int(max(1, min(max_workers, available // tile_bytes(TARGET_TILE_SIZE))))
+        per_worker = available // workers - WORKER_OVERHEAD_BYTES
+        tile_size = int(math.sqrt(per_worker / bytes_per_pixel)) // TILE_SIZE_STEP * TILE_SIZE_STEP
+        tile_size = max(MIN_TILE_SIZE, tile_size)
+
+        # No point in tiles larger than the image; shrink tiles until every
+        # worker has one and the parent's band fits too, and never keep more
+        # workers than tiles
+        tile_size = min(tile_size, max(height, width))
+        tiles = math.ceil(height / tile_size) * math.ceil(width / tile_size)
+        while tile_size > MIN_TILE_SIZE and (
+                tiles < workers or workers * tile_bytes(tile_size) + band_bytes(tile_size) > available):
+            tile_size = max(MIN_TILE_SIZE, tile_size - TILE_SIZE_STEP)
+            tiles = math.ceil(height / tile_size) * math.ceil(width / tile_size)
+        workers = min(workers, tiles)
+        while workers > 1 and workers * tile_bytes(tile_size) + band_bytes(tile_size) > available:
+            workers -= 1
+
+    estimated = scene_bytes + band_bytes(tile_size) + workers * tile_bytes(tile_size)
+
+    return ExecutionPlan(tile_size, workers, bytes_per_pixel, estimated)
+
+def _maxrss_bytes(usage):
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return usage.ru_maxrss if sys.platform == 'darwin' else usage.ru_maxrss * 1024
+
+def reset_peak_rss():
+    """Restart this process's peak RSS count where the OS allows it (Linux).
+
+    Returns False where only the lifetime peak is available.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+def process_peak_rss():
+    """Peak resident set size of this process since the last reset_peak_rss
+    (or its lifetime), None where it cannot be measured"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    return _maxrss_bytes(resource.getrusage(resource.RUSAGE_SELF))
+
+def measure_peak_rss(worker_peaks=(), run_only=True):
+    """Peak RSS of this process and of the largest worker for one run.
+
+    worker_peaks are process_peak_rss values reported by the workers.
+    run_only tells whether the counts were reset at the start of the run
+    (reset_peak_rss); otherwise 'self' is the lifetime peak. Returns None
+    where RSS cannot be measured.
+    """
+    peak = process_peak_rss()
+    if peak is None:
+        return None
+    worker_peaks = [value for value in worker_peaks if value is not None]
+    return {
+        'self': peak,
+        'children': max(worker_peaks, default=0),
+        'run_only': run_only
+    }
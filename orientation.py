@@ -0,0 +1,81 @@
+"""
+Dominant grid orientation from the structure tensor.
+
+A cemetery grid has edges along two perpendicular directions. So each
+pixel's gradient angle is taken four times over (4*theta), which maps both
+directions of a grid, in either polarity, to the same phase. The
+magnitude-weighted mean of those phases gives the grid angle modulo 90
+degrees in one cheap pass (two Sobel filters). Its length relative to the
+total weight (coherence) says how strongly one grid orientation dominates.
+
+Angles are in degrees, in image coordinates (y down). They use the same
+convention as the theta of cv2.HoughLines, so 0 means an axis-aligned grid.
+
+Usage:
+    python orientation.py image1.png image2.png
+"""
+
+import argparse
+import math
+import os
+
+import cv2
+import numpy as np
+
+# Below this coherence there is no dominant grid and axis-aligned analysis is kept
+MIN_COHERENCE = 0.05
+
+# Orientations closer than this (degrees) to the axes are treated as axis-aligned
+AXIS_TOLERANCE = 1.0
+
+def dominant_grid_orientation(img_gray):
+    """(angle, coherence) of the dominant grid in a grayscale image.
+
+    angle is in (-45, 45] degrees, and coherence is 0 (no preferred
+    orientation) to 1 (every edge on one grid).
+    """
+    blurred = cv2.GaussianBlur(img_gray, (5, 5), 0)
+    gx = cv2.Sobel(blurred, cv2.CV_32F, 1, 0, ksize=3)
+    gy = cv2.Sobel(blurred, cv2.CV_32F, 0, 1, ksize=3)
+
+    # Squared magnitude and the doubled-angle components m^2 cos 2t, m^2 sin 2t
+    energy = gx * gx + gy * gy
+    cos_2t = gx * gx - gy * gy
+    sin_2t = 2 * gx * gy
+
+    # Quadrupled angle weighted by m^2: (m^2 cos 4t, m^2 sin 4t) = ((c^2 - s^2), 2cs) / m^2
+    safe_energy = np.maximum(energy, 1e-6)
+    cos_4t = float(np.sum((cos_2t * cos_2t - sin_2t * sin_2t) / safe_energy, dtype=np.float64))
+    sin_4t = float(np.sum(2 * cos_2t * sin_2t / safe_energy, dtype=np.float64))
+    total = float(np.sum(energy, dtype=np.float64))
+
+    if total <= 0:
+        return 0.0, 0.0
+
+    angle = math.degrees(math.atan2(sin_4t, cos_4t)) / 4.0
+    coherence = math.hypot(cos_4t, sin_4t) / total
+    return angle, coherence
+
+def grid_angle(img_gray, min_coherence=MIN_COHERENCE, tolerance=AXIS_TOLERANCE):
+    """Angle to align grid analysis to, or 0.0 when there is no clear
+    off-axis grid"""
+    angle, coherence = dominant_grid_orientation(img_gray)
+    if coherence < min_coherence or abs(angle) < tolerance:
+        return 0.0
+    return angle
+
+def main():
+    parser = argparse.ArgumentParser(description="Estimate the dominant grid orientation of images")
+    parser.add_argument('images', nargs='+', help="Images to analyze")
+    args = parser.parse_args()
+
+    for image_path in args.images:
+        img_gray = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+        if img_gray is None:
+            print(f"❌ Could not load image: {image_path}")
+            continue
+        angle, coherence = dominant_grid_orientation(img_gray)
+        print(f"🧭 {os.path.basename(image_path)}: grid at {angle:+.1f}° (coherence {coherence:.3f})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""
+Parallel tile scoring with the scene held in shared memory.
+
+The decoded scene is copied once into multiprocessing.shared_memory blocks.
+Worker processes attach to those blocks when they start and then receive only
+tile coordinates, so no pixel data is pickled to or from the workers. Each
+tile comes back as a small fixed-size feature record. Vegetation statistics
+for every tile come from one per-window pass over the shared scene, run in
+the parent while the workers score the other features.
+
+Usage:
+    python parallel_executor.py scene.png --tile-size 512 --workers 8
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from color_statistics import window_color_statistics
+from final_cemetery_detector import RobustCemeteryDetector
+from dedup import tile_duplicate_groups
+from memory_budget import (plan_execution, detector_stages, measure_peak_rss, reset_peak_rss,
+                           process_peak_rss, format_bytes, COLOR_BAND_BYTES_PER_PIXEL)
+from scene_tiling import tile_grid, tile_grid_shape
+
+FEATURE_NAMES = ('regularity_score', 'texture_uniformity', 'line_regularity',
+                 'rectangular_density', 'green_percentage', 'color_uniformity')
+
+# Fixed-size record returned for every tile
+TILE_RECORD_DTYPE = np.dtype([('row', np.int32), ('col', np.int32), ('score', np.float32)] +
+                             [(name, np.float32) for name in FEATURE_NAMES])
+
+DEFAULT_TILE_SIZE = 512
+
+# Per-process state set up by _attach_scene
+_worker = {}
+
+def _attach_scene(rgb_name, gray_name, shape, gsd, downsample):
+    """Worker initializer: map the shared scene and build a detector.
+
+    Vegetation features come from the parent's per-window pass, so the
+    workers' detector skips the color stage.
+    """
+    reset_peak_rss()
+    rgb_block = shared_memory.SharedMemory(name=rgb_name)
+    gray_block = shared_memory.SharedMemory(name=gray_name)
+    _worker['blocks'] = (rgb_block, gray_block)  # keep the mappings alive
+    _worker['rgb'] = np.ndarray(shape + (3,), dtype=np.uint8, buffer=rgb_block.buf)
+    _worker['gray'] = np.ndarray(shape, dtype=np.uint8, buffer=gray_block.buf)
+    _worker['detector'] = RobustCemeteryDetector(gsd, downsample, color_features=False)
+
+def _score_tile(tile):
+    """Worker task: score one tile of the shared scene.
+
+    Returns the tile's record and the worker's peak RSS so far.
+    """
+    window = (slice(tile.y0, tile.y1), slice(tile.x0, tile.x1))
+    score, features = _worker['detector'].score_image_array(_worker['rgb'][window],
+                                                            _worker['gray'][window])
+    return (tile.row, tile.col, score) + tuple(features[name] for name in FEATURE_NAMES), process_peak_rss()
+
+def _share_array(array):
+    """Copy an array into a new shared memory block"""
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+    return block
+
+def share_decoded(detector, image_path):
+    """Decode a scene with a detector's settings straight into shared memory.
+
+    Returns ((rgb_block, gray_block), shape). The decoded arrays are local
+    to this call, so only the shared copies outlive it.
+    """
+    img_rgb, img_gray = detector.load_image(image_path)
+    rgb_block = _share_array(img_rgb)
+    try:
+        gray_block = _share_array(img_gray)
+    except BaseException:
+        _release((rgb_block,))
+        raise
+    return (rgb_block, gray_block), img_gray.shape
+
+def _release(blocks):
+    """Close and unlink shared memory blocks"""
+    for block in blocks:
+        try:
+            block.close()
+        except BufferError:
+            pass  # a view is still referenced, e.g. by a traceback; the mapping goes with it
+        block.unlink()
+
+class SharedSceneExecutor:
+    """Score all tiles of a scene across processes without copying pixels.
+
+    With max_memory set (bytes or a string such as '4G'), the worker count,
+    and the tile size unless one is given, are chosen per scene by
+    memory_budget.plan_execution for the stages the workers run, with
+    max_workers as the upper bound on workers. With dedup_distance, tiles
+    whose perceptual hashes are that close to an earlier representative
+    tile, and whose edge detail matches it (see dedup), take its grayscale
+    features instead of being scored; vegetation is always their own.
+    """
+
+    def __init__(self, tile_size=None, max_workers=None, gsd=None, downsample=1, max_memory=None,
+                 dedup_distance=None):
+        # None = DEFAULT_TILE_SIZE, or planned from max_memory
+        self.tile_size = tile_size
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.gsd = gsd
+        self.downsample = downsample
+        self.max_memory = max_memory
+        self.dedup_distance = dedup_distance
+        # Plan and measured peak RSS of the most recent run
+        self.last_run = {}
+
+    def score_scene(self, image_path):
+        """Score every tile of a scene.
+
+        Returns (records, score_grid): a TILE_RECORD_DTYPE array with one
+        record per tile, and the tile scores as a rows x cols float32 raster.
+        The scene is decoded straight into shared memory, so the main process
+        holds a single copy of it while the workers run.
+        """
+        run_only = reset_peak_rss()
+        blocks, shape = share_decoded(RobustCemeteryDetector(self.gsd, self.downsample), image_path)
+        return self._score_shared(blocks, shape, run_only)
+
+    def score_arrays(self, img_rgb, img_gray):
+        """Score every tile of an already decoded scene.
+
+        The caller's arrays stay alive next to their shared copies; use
+        score_scene to hold only one copy.
+        """
+        run_only = reset_peak_rss()
+        rgb_block = _share_array(img_rgb)
+        try:
+            gray_block = _share_array(img_gray)
+        except BaseException:
+            _release((rgb_block,))
+            raise
+        return self._score_shared((rgb_block, gray_block), img_gray.shape, run_only)
+
+    def _score_shared(self, blocks, shape, run_only):
+        """Score the scene in the shared blocks, then release them"""
+        rgb_block, gray_block = blocks
+        height, width = shape
+        try:
+            img_rgb = np.ndarray((height, width, 3), dtype=np.uint8, buffer=rgb_block.buf)
+            img_gray = np.ndarray((height, width), dtype=np.uint8, buffer=gray_block.buf)
+            worker_detector = RobustCemeteryDetector(self.gsd, self.downsample, color_features=False)
+
+            tile_size, workers = self.tile_size or DEFAULT_TILE_SIZE, self.max_workers
+            plan = None
+            if self.max_memory is not None:
+                plan = plan_execution(self.max_memory, (height, width), detector_stages(worker_detector),
+                                      max_workers=self.max_workers, tile_size=self.tile_size,
+                                      band_bytes_per_pixel=COLOR_BAND_BYTES_PER_PIXEL)
+                tile_size, workers = plan.tile_size, plan.workers
+            tiles = list(tile_grid(height, width, tile_size))
+            representatives = list(range(len(tiles)))
+            if self.dedup_distance is not None:
+                representatives = tile_duplicate_groups(img_gray, tiles, self.dedup_distance)
+            distinct = [tile for index, tile in enumerate(tiles) if representatives[index] == index]
+
+            with ProcessPoolExecutor(max_workers=workers, initializer=_attach_scene,
+                                     initargs=(rgb_block.name, gray_block.name, (height, width),
+                                               self.gsd, self.downsample)) as executor:
+                chunksize = max(1, len(distinct) // (workers * 4))
+                pending = executor.map(_score_tile, distinct, chunksize=chunksize)
+                color = window_color_statistics(img_rgb, tile_size, partial=True)
+                scored = {}
+                worker_peaks = []
+                for tile, (record, peak) in zip(distinct, pending):
+                    scored[tile.row, tile.col] = record
+                    worker_peaks.append(peak)
+            del img_rgb, img_gray  # views into the blocks released below
+        finally:
+            _release(blocks)
+
+        # Vegetation features from each tile's own window; duplicate tiles
+        # take their representative's grayscale features
+        detector = RobustCemeteryDetector(self.gsd, self.downsample)
+        color_names = ('green_percentage', 'color_uniformity')
+        rows = []
+        for tile, representative in zip(tiles, representatives):
+            source = tiles[representative]
+            features = dict(zip(FEATURE_NAMES, scored[source.row, source.col][3:]))
+            stats = {name: color[name][tile.row, tile.col]
+                     for name in ('green_count', 'green_fraction', 'std')}
+            features.update(zip(color_names, detector.analyze_color_patterns(None, stats)))
+            rows.append((tile.row, tile.col, detector.weighted_score(features))
+                        + tuple(features[name] for name in FEATURE_NAMES))
+        records = np.array(rows, dtype=TILE_RECORD_DTYPE)
+        score_grid = np.zeros(tile_grid_shape(height, width, tile_size), dtype=np.float32)
+        score_grid[records['row'], records['col']] = records['score']
+
+        self.last_run = {
+            'tile_size': tile_size,
+            'workers': workers,
+            'scored_tiles': len(distinct),
+            'plan': plan,
+            'peak_rss': measure_peak_rss(worker_peaks, run_only)
+        }
+
+        return records, score_grid
+
+def main():
+    parser = argparse.ArgumentParser(description="Score scene tiles in parallel from shared memory")
+    parser.add_argument('image', help="Scene to analyze")
+    parser.add_argument('--tile-size', type=int, default=None,
+                        help=f"Tile size in pixels (default: {DEFAULT_TILE_SIZE}, or planned from --max-memory)")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument('--gsd', type=float, default=None, help="Ground sample distance in meters/pixel")
+    parser.add_argument('--max-memory', default=None,
+                        help="Memory budget such as 4G; picks the workers, and the tile size unless given")
+    parser.add_argument('--dedup-distance', type=int, default=None,
+                        help="Copy results between tiles whose perceptual hashes are this close")
+    parser.add_argument('--output', default=None, help="Where to save the tile score raster (.npy)")
+    args = parser.parse_args()
+
+    executor = SharedSceneExecutor(tile_size=args.tile_size, max_workers=args.workers, gsd=args.gsd,
+                                   max_memory=args.max_memory, dedup_distance=args.dedup_distance)
+
+    start = time.perf_counter()
+    records, score_grid = executor.score_scene(args.image)
+    elapsed = time.perf_counter() - start
+
+    output = args.output or f"tile_scores_{os.path.splitext(os.path.basename(args.image))[0]}.npy"
+    np.save(output, score_grid)
+
+    run = executor.last_run
+    print(f"🔍 Scored {len(records)} tiles of {os.path.basename(args.image)} "
+          f"({run['tile_size']}px) with {run['workers']} workers in {elapsed:.2f}s")
+    if run['scored_tiles'] < len(records):
+        print(f"♻️  {len(records) - run['scored_tiles']} duplicate tiles reused a representative's result")
+    if run['plan'] is not None:
+        print(f"🧮 Estimated peak memory: {format_bytes(run['plan'].estimated_peak_bytes)}")
+    if run['peak_rss'] is not None:
+        scope = "" if run['peak_rss']['run_only'] else " (main: process lifetime)"
+        print(f"📏 Measured peak RSS{scope}: {format_bytes(run['peak_rss']['self'])} (main), "
+              f"{format_bytes(run['peak_rss']['children'])} (largest worker)")
+    best = records[np.argmax(records['score'])]
+    print(f"🏆 Highest tile score: {best['score']:.4f} at tile ({best['row']}, {best['col']})")
+    print(f"✅ Tile score raster saved as: {output}")
+
+if __name__ == "__main__":
+    main()
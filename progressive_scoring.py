@@ -0,0 +1,107 @@
+"""
+Anytime scoring: a coarse answer first, refined until full resolution.
+
+progressive_scores is a generator. It yields a score from a heavily
+downsampled decode within tens of milliseconds, then rescored estimates at
+finer pyramid levels, and finally the full-resolution score. GroundScale
+keeps every kernel at the same physical size on each level, so the
+coarse estimates measure the same structures as the final score.
+
+Each estimate carries an error bound: the prior bound for its level, or
+the change from the previous level when that is larger, since an estimate
+still moving by more than its prior cannot be trusted to it. The priors are
+conservative defaults and can be replaced with bounds measured on stored
+coarse/full score pairs. The final estimate is exact (bound 0).
+
+Consumers cancel by leaving the loop (or calling close() on the
+generator). Passing target_error stops the generator once an estimate is
+that good.
+
+Usage:
+    python progressive_scoring.py image.png --target-error 0.15
+"""
+
+import argparse
+import os
+import time
+from collections import namedtuple
+
+from final_cemetery_detector import RobustCemeteryDetector
+from image_loading import decode_image
+
+ProgressiveEstimate = namedtuple('ProgressiveEstimate', ['score', 'features', 'downsample', 'error_bound',
+                                                         'elapsed', 'final', 'timings', 'maps'])
+
+# Pyramid levels scored before full resolution, coarsest first
+DEFAULT_LEVELS = (16, 4)
+
+# Prior error bound of the score at each downsample factor
+LEVEL_ERROR_BOUNDS = {32: 0.30, 16: 0.25, 8: 0.20, 4: 0.15, 2: 0.10}
+
+# Levels that leave fewer pixels than this on the short side are skipped
+MIN_LEVEL_SIZE = 64
+
+def progressive_scores(image_path, levels=DEFAULT_LEVELS, gsd=None, target_error=None,
+                       pyramid_cache=None, stage_workers=None, error_bounds=LEVEL_ERROR_BOUNDS,
+                       keep_maps=False):
+    """Yield ProgressiveEstimate results from coarse to full resolution.
+
+    levels are downsample factors to score before the full-resolution pass.
+    Each level is decoded reduced where the codec allows it, or read from
+    pyramid_cache when it holds it; both give the same pixels, so estimates
+    do not depend on the cache. error_bounds maps
+    downsample factors to prior bounds; unlisted factors get the largest.
+    With keep_maps the final estimate carries the full-resolution maps, so
+    visualization does not have to recompute them; otherwise maps is None.
+    """
+    start = time.perf_counter()
+    levels = sorted({level for level in levels if level > 1}, reverse=True)
+    previous = None
+
+    for level in levels + [1]:
+        if level > 1 and pyramid_cache is not None and level in pyramid_cache.levels:
+            img_rgb, img_gray = pyramid_cache.read_level(image_path, level)
+        else:
+            img_rgb, img_gray = decode_image(image_path, level)
+
+        final = level == 1
+        if not final and min(img_gray.shape) < MIN_LEVEL_SIZE:
+            continue
+
+        detector = RobustCemeteryDetector(gsd, level, stage_workers=stage_workers)
+        maps = {} if final and keep_maps else None
+        score, features = detector.score_image_array(img_rgb, img_gray, maps)
+
+        if final:
+            error_bound = 0.0
+        else:
+            error_bound = error_bounds.get(level, max(error_bounds.values()))
+            if previous is not None:
+                error_bound = max(error_bound, abs(score - previous))
+        previous = score
+
+        yield ProgressiveEstimate(score, features, level, error_bound, time.perf_counter() - start,
+                                  final, detector.last_timings, maps)
+
+        if final or (target_error is not None and error_bound <= target_error):
+            return
+
+def main():
+    parser = argparse.ArgumentParser(description="Score an image progressively, coarse to full resolution")
+    parser.add_argument('image', help="Image to analyze")
+    parser.add_argument('--levels', type=int, nargs='+', default=list(DEFAULT_LEVELS),
+                        help="Downsample factors to score before full resolution")
+    parser.add_argument('--gsd', type=float, default=None, help="Ground sample distance in meters/pixel")
+    parser.add_argument('--target-error', type=float, default=None,
+                        help="Stop once the error bound is at most this")
+    args = parser.parse_args()
+
+    print(f"🔍 Progressive analysis of {os.path.basename(args.image)}")
+    for estimate in progressive_scores(args.image, args.levels, args.gsd, args.target_error,
+                                       stage_workers=os.cpu_count()):
+        label = "full resolution" if estimate.final else f"1/{estimate.downsample}"
+        print(f"   • {label}: {estimate.score:.4f} ± {estimate.error_bound:.4f} "
+              f"after {estimate.elapsed * 1000:.0f} ms")
+
+if __name__ == "__main__":
+    main()
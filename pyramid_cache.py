@@ -0,0 +1,155 @@
+"""
+On-disk overview pyramid cache for multi-scale and preview runs.
+
+The first request for a scene writes overview levels (2x, 4x, 8x by
+default), in RGB and grayscale, as uncompressed MapStore chunks in a
+.cemetery_pyramids directory next to the source. Each level is produced by
+decode_image at that downsample, so a cached level is exactly what the
+uncached path decodes and scores do not depend on whether the cache exists.
+Reduced decodes are cheap for JPEG; other formats decode once per level. Later reads open the
+chunks memory-mapped, so a coarse screening pass or a thumbnail touches
+only the chunks it needs and never decodes the full image.
+
+The cache is keyed on the file's content hash. Size and mtime are checked
+first, and the file is rehashed only when they change.
+
+Usage:
+    python pyramid_cache.py scene1.png scene2.png --levels 2 4 8
+"""
+
+import argparse
+import json
+import os
+import time
+
+from image_loading import decode_image
+from map_store import MapStore, file_content_hash, scene_directory
+
+PYRAMID_DIRECTORY = ".cemetery_pyramids"
+DEFAULT_LEVELS = (2, 4, 8)
+
+# Bumped when levels are built differently, so older pyramids are rebuilt
+PYRAMID_FORMAT = 2
+
+class PyramidCache:
+    """Per-scene overview levels stored as memory-mappable chunks"""
+
+    def __init__(self, levels=DEFAULT_LEVELS, root=None, chunk_size=256):
+        self.levels = tuple(sorted(levels))
+        # None keeps each pyramid next to its source image
+        self.root = root
+        self.chunk_size = chunk_size
+
+    def _store(self, image_path):
+        root = self.root or os.path.join(os.path.dirname(os.path.abspath(image_path)), PYRAMID_DIRECTORY)
+        return MapStore(root, chunk_size=self.chunk_size, compress=False)
+
+    def _meta_path(self, image_path):
+        return os.path.join(self._store(image_path).root, scene_directory(image_path), 'pyramid.json')
+
+    def _read_meta(self, image_path):
+        try:
+            with open(self._meta_path(image_path)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, image_path, meta):
+        with open(self._meta_path(image_path), 'w') as f:
+            json.dump(meta, f)
+
+    def is_valid(self, image_path):
+        """Whether a complete pyramid exists for the current file contents"""
+        meta = self._read_meta(image_path)
+        if meta is None or meta.get('format') != PYRAMID_FORMAT or not set(self.levels) <= set(meta['levels']):
+            return False
+
+        stat = os.stat(image_path)
+        if meta['size'] == stat.st_size and meta['mtime_ns'] == stat.st_mtime_ns:
+            return True
+
+        # Touched but maybe not changed: compare contents before rebuilding
+        if meta['size'] == stat.st_size and meta['content_hash'] == file_content_hash(image_path):
+            meta['mtime_ns'] = stat.st_mtime_ns
+            self._write_meta(image_path, meta)
+            return True
+        return False
+
+    def build(self, image_path):
+        """Write all overview levels, each decoded as decode_image would"""
+        store = self._store(image_path)
+        os.makedirs(os.path.dirname(self._meta_path(image_path)), exist_ok=True)
+        if os.path.exists(self._meta_path(image_path)):
+            os.remove(self._meta_path(image_path))  # invalid until every level is written
+
+        stat = os.stat(image_path)
+        content_hash = file_content_hash(image_path)
+
+        level_shapes = {}
+        for level in self.levels:
+            img_rgb, img_gray = decode_image(image_path, level)
+            store.save_map(image_path, f"level{level}_rgb", img_rgb)
+            store.save_map(image_path, f"level{level}_gray", img_gray)
+            level_shapes[level] = list(img_gray.shape)
+            del img_rgb, img_gray
+
+        # Metadata last, so the pyramid is only used once complete
+        self._write_meta(image_path, {
+            'format': PYRAMID_FORMAT,
+            'content_hash': content_hash,
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'levels': list(self.levels),
+            'level_shapes': level_shapes
+        })
+
+    def ensure(self, image_path):
+        """Build the pyramid unless a valid one is already cached"""
+        if not self.is_valid(image_path):
+            self.build(image_path)
+
+    def read_level(self, image_path, level, window=None, color=True):
+        """(img_rgb, img_gray) of one level, optionally only a window.
+
+        window is (y0, x0, y1, x1) in that level's pixels. Level 1 is the
+        source image itself. With color=False img_rgb is None.
+        """
+        if level == 1:
+            return decode_image(image_path, 1, color, window)
+
+        if level not in self.levels:
+            raise ValueError(f"Pyramid level {level} not cached (levels: {self.levels})")
+        self.ensure(image_path)
+
+        store = self._store(image_path)
+        names = (('rgb', 'gray') if color else ('gray',))
+        images = {}
+        for name in names:
+            stored = store.open_map(image_path, f"level{level}_{name}")
+            images[name] = stored.read() if window is None else stored.read_window(*window)
+        return images.get('rgb'), images['gray']
+
+def main():
+    parser = argparse.ArgumentParser(description="Build overview pyramids for scenes")
+    parser.add_argument('images', nargs='+', help="Scenes to cache")
+    parser.add_argument('--levels', type=int, nargs='+', default=list(DEFAULT_LEVELS))
+    parser.add_argument('--root', default=None, help="Cache directory (default: next to each scene)")
+    args = parser.parse_args()
+
+    cache = PyramidCache(args.levels, args.root)
+    for path in args.images:
+        start = time.perf_counter()
+        cached = cache.is_valid(path)
+        cache.ensure(path)
+        elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        _, overview = cache.read_level(path, cache.levels[-1], color=False)
+        read_time = time.perf_counter() - start
+
+        status = "up to date" if cached else f"built in {elapsed:.2f}s"
+        print(f"🗺️  {os.path.basename(path)}: pyramid {status}; level {cache.levels[-1]} "
+              f"({overview.shape[1]}x{overview.shape[0]}) read in {read_time * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    main()
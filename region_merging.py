@@ -0,0 +1,221 @@
+"""
+Merge positive tiles of a score grid into cemetery candidates.
+
+Tiles scoring at least a threshold are joined with their positive
+neighbours (8-connected by default) into connected regions. Each region
+becomes one candidate with its bounding box, area, tile count and
+mean/max score.
+
+The grid is streamed in row bands, so only the current and previous row
+are ever labeled. Each row is cut into runs of positive tiles. A run joins
+every run of the previous row it touches, found with a two-pointer sweep,
+and the joins are merged with union-find. Once a row is done, regions that
+did not continue into it are complete; they are emitted and forgotten. Work
+is linear in the number of tiles, and memory is linear in the grid width
+plus the number of open regions.
+
+Candidates are ranked by mean score. Regions are disjoint, so every
+candidate is a separate detection. Optionally (drop_enclosed), candidates
+whose box lies inside the box of a stronger one are dropped, e.g. a small
+region enclosed by a ring-shaped cemetery. Kept boxes are then indexed once,
+by their top-left corner, in a grid per power-of-two size class; a box
+containing a point has its corner at most one cell up and left of the
+point's cell in its class, so each candidate checks four cells per class.
+
+Usage:
+    python parallel_executor.py scene.png --tile-size 512 --output tile_scores.npy
+    python region_merging.py tile_scores.npy --threshold 0.4 --tile-size 512
+"""
+
+import argparse
+import csv
+import os
+from collections import namedtuple
+
+import numpy as np
+
+# Bounding box (y0, x0, y1, x1, exclusive) and area are in pixels when a tile
+# size is given, otherwise in tiles
+Candidate = namedtuple('Candidate', ['y0', 'x0', 'y1', 'x1', 'area', 'tile_count', 'mean_score', 'max_score'])
+
+DEFAULT_BAND_ROWS = 256
+
+def iter_row_bands(grid_path, band_rows=DEFAULT_BAND_ROWS):
+    """Row bands of a .npy score grid, memory-mapped so only one band is read at a time"""
+    grid = np.load(grid_path, mmap_mode='r')
+    for start in range(0, grid.shape[0], band_rows):
+        yield np.asarray(grid[start:start + band_rows])
+
+def _row_runs(row, threshold):
+    """(starts, ends) of the runs of tiles scoring at least threshold (ends exclusive)"""
+    positive = np.zeros(row.size + 2, dtype=bool)
+    positive[1:-1] = row >= threshold
+    changes = np.flatnonzero(positive[1:] != positive[:-1])
+    return changes[0::2], changes[1::2]
+
+def merge_regions(bands, threshold, connectivity=8, tile_size=None, scene_shape=None):
+    """Yield a Candidate for every connected region of positive tiles.
+
+    bands is an iterable of 2-D row bands of the score grid, top to bottom.
+    Candidates come out as soon as their region is complete. With tile_size,
+    boxes and areas are in pixels, clipped to scene_shape (height, width)
+    when given.
+    """
+    if connectivity not in (4, 8):
+        raise ValueError(f"Connectivity must be 4 or 8, got {connectivity}")
+    reach = 1 if connectivity == 8 else 0
+
+    # Region statistics by id: [row0, col0, row1, col1, tiles, score sum, max score]
+    regions = {}
+    parent = {}
+    next_id = 0
+
+    def find(region):
+        root = region
+        while parent.get(root, root) != root:
+            root = parent[root]
+        while region != root:
+            parent[region], region = root, parent.get(region, region)
+        return root
+
+    def union(a, b):
+        root_a, root_b = find(a), find(b)
+        if root_a == root_b:
+            return root_a
+        keep, drop = min(root_a, root_b), max(root_a, root_b)
+        kept, dropped = regions[keep], regions.pop(drop)
+        kept[0], kept[1] = min(kept[0], dropped[0]), min(kept[1], dropped[1])
+        kept[2], kept[3] = max(kept[2], dropped[2]), max(kept[3], dropped[3])
+        kept[4] += dropped[4]
+        kept[5] += dropped[5]
+        kept[6] = max(kept[6], dropped[6])
+        parent[drop] = keep
+        return keep
+
+    def candidate(stats):
+        row0, col0, row1, col1, tiles, total, peak = stats
+        if tile_size is None:
+            return Candidate(row0, col0, row1, col1, tiles, tiles, total / tiles, peak)
+        y0, x0, y1, x1 = row0 * tile_size, col0 * tile_size, row1 * tile_size, col1 * tile_size
+        if scene_shape is not None:
+            y1, x1 = min(y1, scene_shape[0]), min(x1, scene_shape[1])
+        return Candidate(y0, x0, y1, x1, tiles * tile_size * tile_size, tiles, total / tiles, peak)
+
+    previous_starts = previous_ends = np.zeros(0, dtype=np.int64)
+    previous_ids = []
+    row_index = 0
+
+    for band in bands:
+        for row in np.asarray(band, dtype=np.float64):
+            starts, ends = _row_runs(row, threshold)
+            sums = peaks = starts
+            if starts.size:
+                # Every other segment between run bounds is a run; the padding
+                # keeps a run ending at the last tile a valid bound
+                bounds = np.stack([starts, ends], axis=1).ravel()
+                padded = np.append(row, 0.0)
+                sums = np.add.reduceat(padded, bounds)[::2]
+                peaks = np.maximum.reduceat(padded, bounds)[::2]
+
+            current_ids = []
+            j = 0
+            for start, end, total, peak in zip(starts.tolist(), ends.tolist(), sums.tolist(), peaks.tolist()):
+                region = next_id
+                next_id += 1
+                regions[region] = [row_index, start, row_index + 1, end, end - start, total, peak]
+
+                # Previous-row runs that end too early cannot touch this or later runs
+                while j < len(previous_ids) and previous_ends[j] + reach <= start:
+                    j += 1
+                k = j
+                while k < len(previous_ids) and previous_starts[k] < end + reach:
+                    region = union(region, previous_ids[k])
+                    k += 1
+                current_ids.append(region)
+
+            # Regions that did not continue into this row are complete
+            current_ids = [find(region) for region in current_ids]
+            continuing = set(current_ids)
+            for region in dict.fromkeys(find(region) for region in previous_ids):
+                if region not in continuing:
+                    yield candidate(regions.pop(region))
+            parent.clear()
+
+            previous_starts, previous_ends, previous_ids = starts, ends, current_ids
+            row_index += 1
+
+    for region in dict.fromkeys(previous_ids):
+        yield candidate(regions.pop(region))
+
+def _size_class(candidate):
+    """Smallest c with both box sides at most 2 ** c"""
+    return (max(candidate.y1 - candidate.y0, candidate.x1 - candidate.x0, 1) - 1).bit_length()
+
+def _is_enclosed(candidate, classes):
+    """Whether a box indexed in classes contains the candidate's box"""
+    for size_class, buckets in classes.items():
+        cell = 1 << size_class
+        row, col = candidate.y0 // cell, candidate.x0 // cell
+        for key in ((row, col), (row - 1, col), (row, col - 1), (row - 1, col - 1)):
+            for other in buckets.get(key, ()):
+                if (other.y0 <= candidate.y0 and other.x0 <= candidate.x0 and
+                        candidate.y1 <= other.y1 and candidate.x1 <= other.x1):
+                    return True
+    return False
+
+def rank_candidates(candidates, min_tiles=1, top=None, drop_enclosed=False):
+    """Candidates by mean score (then size); with drop_enclosed, without
+    those whose box lies inside a stronger candidate's box"""
+    ranked = sorted((candidate for candidate in candidates if candidate.tile_count >= min_tiles),
+                    key=lambda candidate: (-candidate.mean_score, -candidate.tile_count))
+    if not drop_enclosed:
+        return ranked[:top]
+
+    # Kept boxes by size class, then by the cell of their top-left corner
+    classes = {}
+    kept = []
+    for candidate in ranked:
+        if _is_enclosed(candidate, classes):
+            continue
+        kept.append(candidate)
+        if top is not None and len(kept) >= top:
+            break
+        size_class = _size_class(candidate)
+        cell = 1 << size_class
+        classes.setdefault(size_class, {}).setdefault((candidate.y0 // cell, candidate.x0 // cell),
+                                                      []).append(candidate)
+    return kept
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge positive tiles of a score grid into cemetery candidates")
+    parser.add_argument('grid', help="Tile score grid (.npy), e.g. from parallel_executor.py")
+    parser.add_argument('--threshold', type=float, default=0.4, help="Minimum tile score")
+    parser.add_argument('--tile-size', type=int, default=None, help="Tile size in pixels, for pixel boxes")
+    parser.add_argument('--connectivity', type=int, choices=[4, 8], default=8)
+    parser.add_argument('--band-rows', type=int, default=DEFAULT_BAND_ROWS, help="Grid rows read at a time")
+    parser.add_argument('--min-tiles', type=int, default=1, help="Smallest candidate to report")
+    parser.add_argument('--top', type=int, default=20, help="Candidates to print")
+    parser.add_argument('--drop-enclosed', action='store_true',
+                        help="Drop candidates whose box lies inside a stronger candidate's box")
+    parser.add_argument('--output', default=None, help="Where to save all candidates (.csv)")
+    args = parser.parse_args()
+
+    candidates = rank_candidates(merge_regions(iter_row_bands(args.grid, args.band_rows), args.threshold,
+                                               args.connectivity, args.tile_size),
+                                 args.min_tiles, drop_enclosed=args.drop_enclosed)
+
+    output = args.output or f"candidates_{os.path.splitext(os.path.basename(args.grid))[0]}.csv"
+    with open(output, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(Candidate._fields)
+        writer.writerows(candidates)
+
+    unit = "px" if args.tile_size else "tiles"
+    print(f"🗺️  {len(candidates)} cemetery candidates at score >= {args.threshold:g}")
+    for rank, candidate in enumerate(candidates[:args.top], 1):
+        print(f"   {rank}. ({candidate.x0}, {candidate.y0})-({candidate.x1}, {candidate.y1}) {unit}: "
+              f"{candidate.tile_count} tiles, mean {candidate.mean_score:.3f}, max {candidate.max_score:.3f}")
+    print(f"✅ Candidates saved as: {output}")
+
+if __name__ == "__main__":
+    main()
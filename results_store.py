@@ -0,0 +1,127 @@
+import json
+import sqlite3
+import time
+
+DEFAULT_STORE_PATH = "cemetery_results.db"
+
+# Columns added after the first schema, as (name, type)
+ADDED_COLUMNS = (('gsd', 'REAL'), ('downsample', 'REAL'), ('duplicate_of', 'TEXT'))
+
+RESULT_COLUMNS = ("scene, tile, detector, score, features, status, message, content_hash, "
+                  "gsd, downsample, duplicate_of")
+
+class ResultsStore:
+    """SQLite-backed store of detector results.
+
+    Each row is keyed by scene (usually the image path), tile and detector
+    name. Whole-image results use an empty tile key; tiled workflows use
+    tile_key(row, col). Features are stored as JSON so any detector's
+    feature dict can be saved without a schema change. gsd and downsample
+    record the resolution a result was computed at (NULL when unknown), so
+    reuse checks can tell a full-resolution score from a reduced one.
+    duplicate_of names the scene whose result a near-duplicate copied; such
+    rows were never scored themselves.
+    """
+
+    def __init__(self, db_path=DEFAULT_STORE_PATH):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                scene TEXT NOT NULL,
+                tile TEXT NOT NULL DEFAULT '',
+                detector TEXT NOT NULL,
+                score REAL,
+                features TEXT,
+                status TEXT NOT NULL DEFAULT 'ok',
+                message TEXT,
+                content_hash TEXT,
+                updated REAL,
+                gsd REAL,
+                downsample REAL,
+                duplicate_of TEXT,
+                PRIMARY KEY (scene, tile, detector)
+            )
+        """)
+        # Databases written before a column existed get it added, NULL in old rows
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(results)")}
+        for name, kind in ADDED_COLUMNS:
+            if name not in columns:
+                self.conn.execute(f"ALTER TABLE results ADD COLUMN {name} {kind}")
+        self.conn.commit()
+
+    def close(self):
+        """Close the underlying database connection"""
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def save_result(self, scene, detector, score, features, tile='',
+                    status='ok', message=None, content_hash=None, commit=True,
+                    gsd=None, downsample=None, duplicate_of=None):
+        """Insert or replace a single result row"""
+        self.conn.execute(
+            f"INSERT OR REPLACE INTO results ({RESULT_COLUMNS}, updated) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (scene, tile, detector,
+             None if score is None else float(score),
+             json.dumps({key: float(value) for key, value in features.items()}),
+             status, message, content_hash, gsd, downsample, duplicate_of, time.time())
+        )
+        if commit:
+            self.conn.commit()
+
+    def get_result(self, scene, detector, tile=''):
+        """Return the stored result dict for one key, or None if missing"""
+        row = self.conn.execute(
+            f"SELECT {RESULT_COLUMNS} FROM results WHERE scene = ? AND tile = ? AND detector = ?",
+            (scene, tile, detector)
+        ).fetchone()
+        return _row_to_result(row) if row else None
+
+    def iter_results(self, detector=None, scene=None, status='ok'):
+        """Yield stored results, optionally filtered by detector, scene and status"""
+        query = f"SELECT {RESULT_COLUMNS} FROM results WHERE 1 = 1"
+        params = []
+        if detector is not None:
+            query += " AND detector = ?"
+            params.append(detector)
+        if scene is not None:
+            query += " AND scene = ?"
+            params.append(scene)
+        if status is not None:
+            query += " AND status = ?"
+            params.append(status)
+        query += " ORDER BY scene, tile"
+
+        for row in self.conn.execute(query, params):
+            yield _row_to_result(row)
+
+    def commit(self):
+        """Commit rows saved with commit=False"""
+        self.conn.commit()
+
+def _row_to_result(row):
+    (scene, tile, detector, score, features, status, message, content_hash,
+     gsd, downsample, duplicate_of) = row
+    return {
+        'scene': scene,
+        'tile': tile,
+        'detector': detector,
+        'score': score,
+        'features': json.loads(features) if features else {},
+        'status': status,
+        'message': message,
+        'content_hash': content_hash,
+        'gsd': gsd,
+        'downsample': downsample,
+        'duplicate_of': duplicate_of
+    }
+
+def tile_key(row, col):
+    """Store key for the tile at grid position (row, col)"""
+    return f"{row}_{col}"
@@ -0,0 +1,123 @@
+"""
+Rotation test-time augmentation with shared computation.
+
+Reports the mean score and its spread over rotated and flipped copies of an
+image, as an uncertainty estimate for confidence mapping.
+
+Each orientation is scored under all eight D4 transforms (rotations by
+multiples of 90 degrees, and flips), sharing what does not change:
+
+- Texture variance, color statistics and the rectangle count do not depend
+  on orientation, so they come from one full pass.
+- Grid and line regularity are only nearly invariant. Morphology anchors
+  and Hough accumulator bins are not symmetric, so on the sample images
+  the eight transforms' scores spread by about 0.002. These two features
+  are recomputed for the seven other transforms.
+
+Each extra angle (between 0 and 45 degrees) adds a full pass on the largest
+crop that is fully covered after rotation, plus the grid and line stages of
+its other seven transforms.
+
+Usage:
+    python rotation_augmentation.py image1.png image2.png --angles 22.5 45
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+from final_cemetery_detector import RobustCemeteryDetector
+from image_geometry import rotate_crop
+
+def d4_transforms(img):
+    """The eight rotations by multiples of 90 degrees and their flips, identity first"""
+    rotations = [np.rot90(img, k) for k in range(4)]
+    return [np.ascontiguousarray(transformed) for rotation in rotations
+            for transformed in (rotation, rotation[:, ::-1])]
+
+def canonical_angle(angle):
+    """Angle in [0, 45] whose D4 transforms cover the same orientations"""
+    angle = angle % 90
+    return 90 - angle if angle > 45 else angle
+
+class RotationAugmenter:
+    """Score images under rotations and flips, reporting mean and spread.
+
+    extra_angles are off-axis rotations in degrees. Angles equivalent under
+    the D4 symmetry (e.g. 30 and 60, or 45 and 135) are scored once, with
+    all eight transforms.
+    """
+
+    def __init__(self, detector=None, extra_angles=(45,)):
+        self.detector = detector or RobustCemeteryDetector()
+        angles = {canonical_angle(angle) for angle in extra_angles}
+        self.angles = (0,) + tuple(sorted(angle for angle in angles if angle != 0))
+
+    def score_image_array(self, img_rgb, img_gray):
+        """Augmented score of an already loaded image.
+
+        Returns a dict with mean, std, min and max over all augmented
+        orientations, per-angle scores (the mean over the angle's eight
+        transforms) and features (of the untransformed crop), and transforms
+        (the number of orientations the statistics cover).
+        """
+        scores = {}
+        features = {}
+        all_scores = []
+        for angle in self.angles:
+            if angle == 0:
+                rgb, gray = img_rgb, img_gray
+            else:
+                rgb, gray = rotate_crop(img_rgb, angle), rotate_crop(img_gray, angle)
+            score, features[angle] = self.detector.score_image_array(rgb, gray)
+
+            # Only the orientation-dependent features are recomputed
+            orbit = [score]
+            for transformed in d4_transforms(gray)[1:]:
+                orbit.append(self.detector.weighted_score(
+                    dict(features[angle], **self.detector.orientation_features(transformed))))
+            scores[angle] = float(np.mean(orbit))
+            all_scores.extend(orbit)
+
+        values = np.array(all_scores)
+        return {
+            'mean': float(np.mean(values)),
+            'std': float(np.std(values)),
+            'min': float(np.min(values)),
+            'max': float(np.max(values)),
+            'scores': scores,
+            'features': features,
+            'transforms': len(values)
+        }
+
+    def score_image(self, image_path):
+        """Augmented score of an image file"""
+        img_rgb, img_gray = self.detector.load_image(image_path)
+        return self.score_image_array(img_rgb, img_gray)
+
+def main():
+    parser = argparse.ArgumentParser(description="Cemetery scores with rotation test-time augmentation")
+    parser.add_argument('images', nargs='+', help="Images to analyze")
+    parser.add_argument('--angles', type=float, nargs='*', default=[45],
+                        help="Extra off-axis rotations in degrees (D4 transforms are always included)")
+    parser.add_argument('--gsd', type=float, default=None, help="Ground sample distance in meters/pixel")
+    args = parser.parse_args()
+
+    augmenter = RotationAugmenter(RobustCemeteryDetector(args.gsd), args.angles)
+
+    for image_path in args.images:
+        start = time.perf_counter()
+        result = augmenter.score_image(image_path)
+        elapsed = time.perf_counter() - start
+
+        print(f"\n📸 {os.path.basename(image_path)}")
+        print(f"   🎯 Augmented Score: {result['mean']:.4f} ± {result['std']:.4f} "
+              f"(range {result['min']:.4f}-{result['max']:.4f})")
+        for angle, score in result['scores'].items():
+            print(f"   • {angle:g}° orbit: {score:.4f}")
+        print(f"   ⏱️  {result['transforms']} orientations in {elapsed:.2f}s")
+
+if __name__ == "__main__":
+    main()
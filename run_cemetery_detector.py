@@ -13,6 +13,8 @@ HOW TO USE:
 import os
 import sys
 from final_cemetery_detector import RobustCemeteryDetector
+from image_comparison import compare_many, print_comparison, plot_comparison
+from progressive_scoring import progressive_scores
 
 def detect_cemetery_in_image(image_path):
     """
@@ -24,8 +26,13 @@ def detect_cemetery_in_image(image_path):
     print("-" * 50)
     
     try:
-        # Run the detection
-        score, features, img = detector.calculate_cemetery_score(image_path)
+        # Show coarse estimates while the full-resolution score is computed,
+        # with independent feature stages running concurrently
+        for estimate in progressive_scores(image_path, stage_workers=os.cpu_count(), keep_maps=True):
+            if not estimate.final:
+                print(f"⏳ Estimate at 1/{estimate.downsample} resolution: "
+                      f"{estimate.score:.4f} ± {estimate.error_bound:.4f}")
+        score, features = estimate.score, estimate.features
         
         # Display results
         print(f"🎯 CEMETERY LIKELIHOOD SCORE: {score:.4f}")
@@ -42,10 +49,15 @@ def detect_cemetery_in_image(image_path):
         for key, value in features.items():
             feature_name = key.replace('_', ' ').title()
             print(f"   • {feature_name}: {value:.4f}")
+        
+        if estimate.timings:
+            print(f"\n⏱️  STAGE TIMINGS:")
+            for stage, seconds in estimate.timings.items():
+                print(f"   • {stage.title()}: {seconds:.2f}s")
             
         # Generate visualization
         print(f"\n📊 Generating visual analysis...")
-        detector.visualize_analysis(image_path)
+        detector.visualize_analysis(image_path, results=(score, features, estimate.maps))
         
         return score, features
         
@@ -161,18 +173,10 @@ def main():
             elif choice == "3":
                 print(f"\n🔍 ANALYZING ALL {len(image_files)} IMAGES")
                 print("=" * 50)
-                results = []
-                for img in image_files:
-                    score, features = detect_cemetery_in_image(img)
-                    results.append((img, score))
-                    print("-" * 50)
-                
-                # Show summary
-                print(f"\n📊 SUMMARY - ALL IMAGES RANKED:")
-                results.sort(key=lambda x: x[1], reverse=True)
-                for i, (img, score) in enumerate(results, 1):
-                    status = "🏆" if score >= 0.7 else "⚠️" if score >= 0.4 else "❌"
-                    print(f"   {i}. {status} {img}: {score:.4f}")
+                # Score every image once in parallel; nothing is stored
+                comparison = compare_many(image_files, store=None)
+                print_comparison(comparison)
+                plot_comparison(comparison, "cemetery_analysis_ranking.png")
             
         except (ValueError, IndexError):
             print("❌ Invalid choice. Running default analysis...")
@@ -0,0 +1,24 @@
+"""
+Tile grid helpers shared by the tiled and scene-level workflows.
+"""
+
+from collections import namedtuple
+
+# Tile bounds are half-open: rows y0:y1, columns x0:x1
+Tile = namedtuple('Tile', ['row', 'col', 'y0', 'x0', 'y1', 'x1'])
+
+def tile_grid_shape(height, width, tile_size):
+    """Number of tile rows and columns covering an image"""
+    return (height + tile_size - 1) // tile_size, (width + tile_size - 1) // tile_size
+
+def tile_grid(height, width, tile_size):
+    """Yield the tiles covering an image in row-major order.
+
+    Tiles on the right and bottom edges are cut short rather than padded.
+    """
+    rows, cols = tile_grid_shape(height, width, tile_size)
+    for row in range(rows):
+        for col in range(cols):
+            y0 = row * tile_size
+            x0 = col * tile_size
+            yield Tile(row, col, y0, x0, min(y0 + tile_size, height), min(x0 + tile_size, width))
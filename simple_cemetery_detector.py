@@ -2,24 +2,37 @@ import cv2
 import numpy as np
 import matplotlib.pyplot as plt
 import os
+
+from color_statistics import masked_color_statistics
+from image_loading import decode_image
+from ground_scale import (GroundScale, LINE_SEGMENT_M, PLOT_AREA_MIN_M2,
+                          LEGACY_RECT_DENSITY_UNIT_M2, VARIANCE_WINDOW_M, THRESHOLD_BLOCK_M)
 from scipy import ndimage
 
 class SimpleCemeteryDetector:
-    def __init__(self):
+    # Intermediate maps that can be persisted to a MapStore, stored as <prefix>_<name>
+    MAP_PREFIX = 'simple'
+    PERSISTABLE_MAPS = ('grid_pattern', 'variance_map', 'freq_spectrum')
+    
+    def __init__(self, gsd=None, downsample=1, map_store=None, persist_maps=PERSISTABLE_MAPS,
+                 pyramid_cache=None):
         self.features = {}
+        # Ground sample distance (meters/pixel) and processing downsample factor
+        self.scale = GroundScale(gsd, downsample)
+        # Optional MapStore that keeps the chosen intermediate maps after scoring
+        self.map_store = map_store
+        self.persist_maps = persist_maps
+        # Optional PyramidCache; cached levels are read instead of decoding the source
+        self.pyramid_cache = pyramid_cache
         
-    def load_image(self, image_path):
-        """Load and preprocess the image"""
-        img = cv2.imread(image_path)
-        if img is None:
-            raise ValueError(f"Could not load image: {image_path}")
+    def load_image(self, image_path, window=None):
+        """Load and preprocess the image, optionally only a (y0, x0, y1, x1) window"""
+        # Overview levels from the pyramid cache skip the full decode
+        if self.pyramid_cache is not None and self.scale.downsample in self.pyramid_cache.levels:
+            return self.pyramid_cache.read_level(image_path, self.scale.downsample, window)
         
-        # Convert to RGB for display
-        img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        # Convert to grayscale for analysis
-        img_gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        
-        return img_rgb, img_gray
+        # Decode at the processing resolution, RGB for display and grayscale for analysis
+        return decode_image(image_path, self.scale.downsample, window=window)
     
     def detect_regular_patterns(self, img_gray):
         """Detect regular grid patterns typical of cemeteries"""
@@ -30,8 +43,9 @@ class SimpleCemeteryDetector:
         edges = cv2.Canny(blurred, 50, 150)
         
         # Detect horizontal and vertical lines using morphological operations
-        horizontal_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (25, 1))
-        vertical_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (1, 25))
+        line_length = self.scale.pixels(LINE_SEGMENT_M)
+        horizontal_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (line_length, 1))
+        vertical_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (1, line_length))
         
         horizontal_lines = cv2.morphologyEx(edges, cv2.MORPH_OPEN, horizontal_kernel)
         vertical_lines = cv2.morphologyEx(edges, cv2.MORPH_OPEN, vertical_kernel)
@@ -47,7 +61,8 @@ class SimpleCemeteryDetector:
     def analyze_texture_variance(self, img_gray):
         """Analyze texture using local variance"""
         # Calculate local variance using a sliding window
-        kernel = np.ones((9, 9), np.float32) / 81
+        window = self.scale.odd_pixels(VARIANCE_WINDOW_M)
+        kernel = np.ones((window, window), np.float32) / (window * window)
         mean = cv2.filter2D(img_gray.astype(np.float32), -1, kernel)
         sq_mean = cv2.filter2D((img_gray.astype(np.float32))**2, -1, kernel)
         variance = sq_mean - mean**2
@@ -61,14 +76,16 @@ class SimpleCemeteryDetector:
     def detect_rectangular_structures(self, img_gray):
         """Detect rectangular structures typical of cemetery plots"""
         # Apply adaptive threshold
+        block_size = self.scale.odd_pixels(THRESHOLD_BLOCK_M)
         thresh = cv2.adaptiveThreshold(img_gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-                                     cv2.THRESH_BINARY, 11, 2)
+                                     cv2.THRESH_BINARY, block_size, 2)
         
         # Find contours
         contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
         
         rectangular_count = 0
         total_area = 0
+        min_area = self.scale.area_pixels(PLOT_AREA_MIN_M2)
         
         for contour in contours:
             # Approximate contour to polygon
@@ -78,33 +95,28 @@ class SimpleCemeteryDetector:
             # Check if it's roughly rectangular (4 sides)
             if len(approx) == 4:
                 area = cv2.contourArea(contour)
-                if area > 100:  # Filter out very small rectangles
+                if area > min_area:  # Filter out very small rectangles
                     rectangular_count += 1
                     total_area += area
         
         # Calculate rectangular density
         image_area = img_gray.shape[0] * img_gray.shape[1]
-        rectangular_density = rectangular_count / (image_area / 10000)  # per 100x100 pixels
+        density_unit = self.scale.area_pixels(LEGACY_RECT_DENSITY_UNIT_M2)
+        rectangular_density = rectangular_count / (image_area / density_unit)  # per 100 m² (100x100 pixels)
         
         return rectangular_count, rectangular_density
     
     def analyze_color_patterns(self, img_rgb):
         """Analyze color distribution patterns"""
-        # Convert to HSV for better color analysis
-        hsv = cv2.cvtColor(img_rgb, cv2.COLOR_RGB2HSV)
-        
-        # Focus on vegetation (green areas)
-        lower_green = np.array([35, 40, 40])
-        upper_green = np.array([85, 255, 255])
-        green_mask = cv2.inRange(hsv, lower_green, upper_green)
+        # Green mask, green fraction and green pixel mean/std in one masked pass
+        stats = masked_color_statistics(img_rgb)
         
         # Calculate green vegetation percentage
-        green_percentage = np.sum(green_mask > 0) / (img_rgb.shape[0] * img_rgb.shape[1])
+        green_percentage = stats['green_fraction']
         
         # Analyze color uniformity in green regions
-        if np.sum(green_mask) > 0:
-            green_pixels = img_rgb[green_mask > 0]
-            color_std = np.mean(np.std(green_pixels, axis=0))
+        if stats['green_count'] > 0:
+            color_std = np.mean(stats['std'])
             color_uniformity = 1.0 / (1.0 + color_std)
         else:
             color_uniformity = 0
@@ -133,54 +145,110 @@ class SimpleCemeteryDetector:
         
         return magnitude_spectrum, pattern_regularity
     
-    def calculate_cemetery_score(self, image_path):
-        """Calculate overall cemetery likelihood score"""
+    def calculate_cemetery_score(self, image_path, raise_errors=False):
+        """Calculate overall cemetery likelihood score.
+        
+        Errors are printed and give (0, {}, None) unless raise_errors is set.
+        """
         try:
             # Load image
             img_rgb, img_gray = self.load_image(image_path)
             
-            # Extract features
-            grid_pattern, regularity_score = self.detect_regular_patterns(img_gray)
-            variance_map, uniformity = self.analyze_texture_variance(img_gray)
-            rect_count, rect_density = self.detect_rectangular_structures(img_gray)
-            green_pct, color_uniformity = self.analyze_color_patterns(img_rgb)
-            freq_spectrum, pattern_regularity = self.detect_periodic_patterns(img_gray)
-            
-            # Store features for analysis
-            features = {
-                'regularity_score': regularity_score,
-                'texture_uniformity': uniformity,
-                'pattern_regularity': pattern_regularity,
-                'rectangular_density': rect_density,
-                'green_percentage': green_pct,
-                'color_uniformity': color_uniformity
-            }
-            
-            # Calculate weighted cemetery score
-            cemetery_score = (
-                regularity_score * 0.25 +           # Regular grid patterns
-                uniformity * 0.20 +                 # Texture uniformity
-                pattern_regularity * 0.20 +         # Frequency domain patterns
-                min(rect_density, 1.0) * 0.15 +     # Rectangular structures
-                green_pct * 0.10 +                  # Vegetation presence
-                color_uniformity * 0.10              # Color uniformity
-            )
+            maps = {} if self.map_store is not None else None
+            cemetery_score, features = self.score_image_array(img_rgb, img_gray, maps)
+            if maps:
+                self.map_store.save_maps(image_path, self.MAP_PREFIX, maps, self.persist_maps,
+                                         self.map_settings(), features)
             
             return cemetery_score, features, img_rgb
             
         except Exception as e:
+            if raise_errors:
+                raise
             print(f"Error processing {image_path}: {e}")
             return 0, {}, None
     
-    def visualize_analysis(self, image_path, save_plots=True):
-        """Visualize the analysis results"""
+    def score_image_array(self, img_rgb, img_gray, maps=None):
+        """Calculate the cemetery score for an already loaded image.
+        
+        If a maps dict is given, the intermediate maps are added to it.
+        """
+        # Extract features
+        grid_pattern, regularity_score = self.detect_regular_patterns(img_gray)
+        variance_map, uniformity = self.analyze_texture_variance(img_gray)
+        rect_count, rect_density = self.detect_rectangular_structures(img_gray)
+        green_pct, color_uniformity = self.analyze_color_patterns(img_rgb)
+        freq_spectrum, pattern_regularity = self.detect_periodic_patterns(img_gray)
+        
+        if maps is not None:
+            maps.update(grid_pattern=grid_pattern, variance_map=variance_map, freq_spectrum=freq_spectrum)
+        
+        # Store features for analysis
+        features = {
+            'regularity_score': regularity_score,
+            'texture_uniformity': uniformity,
+            'pattern_regularity': pattern_regularity,
+            'rectangular_density': rect_density,
+            'green_percentage': green_pct,
+            'color_uniformity': color_uniformity
+        }
+        
+        return self.weighted_score(features), features
+    
+    def weighted_score(self, features):
+        """Weighted cemetery score of the features"""
+        return (
+            features['regularity_score'] * 0.25 +               # Regular grid patterns
+            features['texture_uniformity'] * 0.20 +             # Texture uniformity
+            features['pattern_regularity'] * 0.20 +             # Frequency domain patterns
+            min(features['rectangular_density'], 1.0) * 0.15 +  # Rectangular structures
+            features['green_percentage'] * 0.10 +               # Vegetation presence
+            features['color_uniformity'] * 0.10                 # Color uniformity
+        )
+    
+    def map_settings(self):
+        """Settings the persisted maps and features depend on, part of their map store key"""
+        return {'detector': self.MAP_PREFIX, 'gsd': self.scale.source_gsd, 'downsample': self.scale.downsample}
+    
+    def visualize_analysis(self, image_path, save_plots=True, results=None):
+        """Visualize the analysis results.
+        
+        results is the (score, features, maps) of a pass that already ran.
+        Without it, maps and features persisted for the current file contents
+        and settings are used, and only if there are none is the image
+        analyzed, once.
+        """
         try:
             img_rgb, img_gray = self.load_image(image_path)
             
-            # Get analysis results
-            grid_pattern, regularity_score = self.detect_regular_patterns(img_gray)
-            variance_map, uniformity = self.analyze_texture_variance(img_gray)
-            freq_spectrum, pattern_regularity = self.detect_periodic_patterns(img_gray)
+            # Get analysis results without rerunning the pipeline when possible
+            if results is not None:
+                score, features, maps = results
+                maps = maps or {}
+            elif self.map_store is not None:
+                maps, features = self.map_store.load_maps(image_path, self.MAP_PREFIX, self.persist_maps,
+                                                          self.map_settings())
+            else:
+                maps, features = {}, None
+            if features is None:
+                maps = {}
+                score, features = self.score_image_array(img_rgb, img_gray, maps)
+                if self.map_store is not None:
+                    self.map_store.save_maps(image_path, self.MAP_PREFIX, maps, self.persist_maps,
+                                             self.map_settings(), features)
+            elif results is None:
+                score = self.weighted_score(features)
+            
+            regularity_score = features['regularity_score']
+            uniformity = features['texture_uniformity']
+            if 'grid_pattern' in maps:
+                grid_pattern = maps['grid_pattern']
+            else:
+                grid_pattern, _ = self.detect_regular_patterns(img_gray)
+            if 'variance_map' in maps:
+                variance_map = maps['variance_map']
+            else:
+                variance_map, _ = self.analyze_texture_variance(img_gray)
             
             # Create visualization
             fig, axes = plt.subplots(2, 3, figsize=(15, 10))
@@ -213,7 +281,6 @@ class SimpleCemeteryDetector:
             axes[1, 1].axis('off')
             
             # Feature summary
-            score, features, _ = self.calculate_cemetery_score(image_path)
             feature_text = f"""Cemetery Score: {score:.4f}
             
 Features:
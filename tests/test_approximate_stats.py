@@ -0,0 +1,37 @@
+import os
+
+import numpy as np
+import pytest
+
+from approximate_stats import STATISTICS, SampledStatistics, exact_statistics
+from image_loading import decode_image
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _scene(name, tiles):
+    img_rgb, img_gray = decode_image(os.path.join(ROOT, name))
+    return np.tile(img_rgb, tiles + (1,)), np.tile(img_gray, tiles)
+
+def test_full_sample_is_exact():
+    img_rgb, img_gray = _scene('cemetry_image_2.png', (2, 2))
+    exact = exact_statistics(img_rgb, img_gray)
+    estimates = SampledStatistics(1.0, min_pixels=0).estimate(img_rgb, img_gray)
+    for name in STATISTICS:
+        assert estimates[name].exact
+        assert estimates[name].value == pytest.approx(exact[name].value, rel=1e-6)
+
+@pytest.mark.parametrize('name', ['cemetry_image_1.png', 'cemetry_image_2.png'])
+def test_intervals_cover_exact_values(name):
+    img_rgb, img_gray = _scene(name, (2, 2))
+    exact = exact_statistics(img_rgb, img_gray)
+    runs = 100
+    covered = dict.fromkeys(STATISTICS, 0)
+    for seed in range(runs):
+        estimates = SampledStatistics(0.05, seed=seed, min_pixels=0).estimate(img_rgb, img_gray)
+        for statistic in STATISTICS:
+            covered[statistic] += estimates[statistic].lower <= exact[statistic].value <= estimates[statistic].upper
+
+    # Nominal 95%; the normal approximation over about a hundred blocks may
+    # run a few points low, a biased sampler misses far more often
+    for statistic in STATISTICS:
+        assert covered[statistic] >= 88, (statistic, covered[statistic])
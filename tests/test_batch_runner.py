@@ -0,0 +1,43 @@
+import multiprocessing
+import os
+import time
+
+import pytest
+
+import batch_runner
+from batch_runner import BatchRunner
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The fake detectors reach the workers by inheriting the patched module
+pytestmark = pytest.mark.skipif(multiprocessing.get_start_method() != 'fork',
+                                reason="workers must inherit the patched create_detector")
+
+class _FakeDetector:
+    """Runs out of memory at full resolution, scores instantly otherwise"""
+
+    def __init__(self, downsample):
+        self.downsample = downsample
+
+    def calculate_cemetery_score(self, image_path, raise_errors=False):
+        if self.downsample == 1:
+            raise MemoryError("Unable to allocate array")
+        return 0.5, {'rectangular_density': 1.0}, None
+
+@pytest.fixture
+def image_path():
+    return os.path.join(ROOT, 'cemetry_image_1.png')
+
+def test_memory_error_is_retried_at_reduced_resolution(image_path, monkeypatch):
+    monkeypatch.setattr(batch_runner, 'create_detector',
+                        lambda name, gsd=None, downsample=1: _FakeDetector(downsample))
+    result, = BatchRunner(timeout=30, max_workers=1, retry_downsample=2).run([image_path])
+    assert (result['status'], result['downsample'], result['attempts']) == ('ok', 2, 2)
+
+def test_detector_setup_is_not_charged_to_the_first_image(image_path, monkeypatch):
+    def slow_create(name, gsd=None, downsample=1):
+        time.sleep(1.0)  # imports and detector setup
+        return _FakeDetector(2)
+    monkeypatch.setattr(batch_runner, 'create_detector', slow_create)
+    result, = BatchRunner(timeout=0.5, max_workers=1).run([image_path])
+    assert result['status'] == 'ok'
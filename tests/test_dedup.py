@@ -0,0 +1,37 @@
+import cv2
+import numpy as np
+
+from dedup import DEFAULT_MAX_DISTANCE, duplicate_groups, perceptual_hash, tile_duplicate_groups
+from scene_tiling import tile_grid
+
+def _field(size=256, seed=0):
+    rng = np.random.default_rng(seed)
+    field = cv2.GaussianBlur(rng.normal(120, 25, (size, size)).astype(np.float32), (0, 0), 2)
+    return np.clip(field, 0, 255).astype(np.uint8)
+
+def _with_grid(field, spacing=12, contrast=25):
+    grid = field.astype(np.int16)
+    grid[::spacing, :] -= contrast
+    grid[:, ::spacing] -= contrast
+    return np.clip(grid, 0, 255).astype(np.uint8)
+
+def _recompressed(img, quality=75):
+    return cv2.imdecode(cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, quality])[1],
+                        cv2.IMREAD_GRAYSCALE)
+
+def test_grid_tile_does_not_merge_with_plain_tile():
+    plain = _field()
+    grid = _with_grid(plain)
+    assert bin(perceptual_hash(plain) ^ perceptual_hash(grid)).count('1') <= DEFAULT_MAX_DISTANCE
+
+    scene = np.hstack([plain, grid, _recompressed(plain)])
+    tiles = list(tile_grid(scene.shape[0], scene.shape[1], plain.shape[0]))
+    assert tile_duplicate_groups(scene, tiles) == [0, 1, 0]
+
+def test_members_join_representatives_not_chains():
+    # 3 bits from the first hash, then 3 more: 6 bits from the representative
+    hashes = [0b000000, 0b000111, 0b111111]
+    assert duplicate_groups(hashes, max_distance=3) == [0, 0, 2]
+
+def test_confirm_rejects_hash_matches():
+    assert duplicate_groups([5, 5, 5], confirm=lambda representative, item: item != 1) == [0, 1, 0]
@@ -0,0 +1,23 @@
+import os
+
+import pytest
+
+from final_cemetery_detector import RobustCemeteryDetector
+from halo_executor import HaloSceneExecutor
+from image_loading import decode_image
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.mark.parametrize('name', ['cemetry_image_1.png', 'cemetry_image_2.png'])
+@pytest.mark.parametrize('tile_size', [256, 300])
+def test_scene_score_matches_whole_image(name, tile_size):
+    img_rgb, img_gray = decode_image(os.path.join(ROOT, name))
+    whole_score, whole_features = RobustCemeteryDetector().score_image_array(img_rgb, img_gray)
+
+    score, features, rasters = HaloSceneExecutor(tile_size, max_workers=1).score_arrays(img_rgb, img_gray)
+
+    assert score == pytest.approx(whole_score, abs=1e-6)
+    for feature, value in whole_features.items():
+        assert features[feature] == pytest.approx(value, abs=1e-6)
+    assert rasters['score'].shape == ((img_gray.shape[0] + tile_size - 1) // tile_size,
+                                      (img_gray.shape[1] + tile_size - 1) // tile_size)
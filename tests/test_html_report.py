@@ -0,0 +1,18 @@
+import os
+import shutil
+
+from html_report import render_assets
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_assets_are_redrawn_for_new_settings(tmp_path):
+    image_path = str(tmp_path / 'scene.png')
+    shutil.copy(os.path.join(ROOT, 'cemetry_image_1.png'), image_path)
+    asset_dir = str(tmp_path / 'assets')
+    os.makedirs(asset_dir)
+
+    names = render_assets(image_path, asset_dir, overlay_size=320)
+    assert render_assets(image_path, asset_dir, overlay_size=320) == names
+    assert render_assets(image_path, asset_dir, gsd=0.2, overlay_size=320) != names
+    assert render_assets(image_path, asset_dir, overlay_size=480) != names
+    assert render_assets(image_path, asset_dir, thumbnail_size=80, overlay_size=320) != names
@@ -0,0 +1,57 @@
+import os
+import sqlite3
+
+import pytest
+
+from ground_scale import GroundScale
+from image_comparison import compare_many
+from pyramid_cache import file_content_hash
+from results_store import ResultsStore
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMAGE = os.path.join(ROOT, 'cemetry_image_1.png')
+STORED_SCORE = 0.123
+
+def _store_row(store, gsd=None, downsample=1):
+    store.save_result(IMAGE, 'robust', STORED_SCORE, {}, content_hash=file_content_hash(IMAGE),
+                      gsd=GroundScale(gsd).source_gsd, downsample=downsample)
+
+def test_full_resolution_row_is_reused(tmp_path):
+    with ResultsStore(str(tmp_path / 'results.db')) as store:
+        _store_row(store)
+        comparison = compare_many([IMAGE], store=store, max_workers=1)
+    assert comparison['reused'] == 1
+    assert comparison['scores'][0] == STORED_SCORE
+
+@pytest.mark.parametrize('gsd, downsample', [(None, 2), (0.5, 1)])
+def test_rows_at_other_resolutions_are_rescored(tmp_path, gsd, downsample):
+    with ResultsStore(str(tmp_path / 'results.db')) as store:
+        _store_row(store, gsd, downsample)
+        comparison = compare_many([IMAGE], store=store, max_workers=1)
+        assert comparison['reused'] == 0
+        assert comparison['scores'][0] != STORED_SCORE
+        assert store.get_result(IMAGE, 'robust')['downsample'] == 1
+
+def test_old_databases_gain_resolution_columns(tmp_path):
+    path = str(tmp_path / 'old.db')
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE results (scene TEXT NOT NULL, tile TEXT NOT NULL DEFAULT '', "
+                 "detector TEXT NOT NULL, score REAL, features TEXT, status TEXT NOT NULL DEFAULT 'ok', "
+                 "message TEXT, content_hash TEXT, updated REAL, PRIMARY KEY (scene, tile, detector))")
+    conn.execute("INSERT INTO results (scene, detector, score, features, content_hash) "
+                 "VALUES (?, 'robust', 0.5, '{}', ?)", (IMAGE, file_content_hash(IMAGE)))
+    conn.commit()
+    conn.close()
+
+    with ResultsStore(path) as store:
+        stored = store.get_result(IMAGE, 'robust')
+        assert stored['gsd'] is None and stored['downsample'] is None
+        assert compare_many([IMAGE], store=store, max_workers=1)['reused'] == 0
+
+def test_copied_duplicate_rows_are_rescored(tmp_path):
+    with ResultsStore(str(tmp_path / 'results.db')) as store:
+        store.save_result(IMAGE, 'robust', STORED_SCORE, {}, content_hash=file_content_hash(IMAGE),
+                          gsd=GroundScale(None).source_gsd, downsample=1, duplicate_of='other.png')
+        comparison = compare_many([IMAGE], store=store, max_workers=1)
+        assert comparison['reused'] == 0
+        assert store.get_result(IMAGE, 'robust')['duplicate_of'] is None
@@ -0,0 +1,28 @@
+import os
+
+import numpy as np
+import pytest
+
+from final_cemetery_detector import RobustCemeteryDetector
+from image_loading import decode_image
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.mark.parametrize('name', ['cemetry_image_1.png', 'cemetry_image_2.png'])
+@pytest.mark.parametrize('downsample', [1, 2, 3])
+def test_grayscale_only_decode_matches_color_decode(name, downsample):
+    path = os.path.join(ROOT, name)
+    _, color_gray = decode_image(path, downsample)
+    img_rgb, gray = decode_image(path, downsample, color=False)
+
+    assert img_rgb is None
+    assert np.array_equal(gray, color_gray)
+
+def test_gray_features_do_not_depend_on_color_features():
+    path = os.path.join(ROOT, 'cemetry_image_1.png')
+    _, features = RobustCemeteryDetector().score_image_array(*decode_image(path))
+    _, gray_features = RobustCemeteryDetector(color_features=False).score_image_array(
+        *decode_image(path, color=False))
+
+    for name in ('regularity_score', 'texture_uniformity', 'line_regularity', 'rectangular_density'):
+        assert gray_features[name] == features[name]
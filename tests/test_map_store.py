@@ -0,0 +1,47 @@
+import os
+import shutil
+
+import matplotlib
+matplotlib.use('Agg')
+import pytest
+
+from final_cemetery_detector import RobustCemeteryDetector
+from map_store import MapStore
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture
+def scene(tmp_path):
+    path = str(tmp_path / 'scene.png')
+    shutil.copy(os.path.join(ROOT, 'cemetry_image_1.png'), path)
+    return path
+
+def test_maps_are_keyed_on_content_and_settings(scene, tmp_path):
+    store = MapStore(str(tmp_path / 'maps'))
+    detector = RobustCemeteryDetector(map_store=store)
+    score, features, _ = detector.calculate_cemetery_score(scene, raise_errors=True)
+
+    maps, stored = store.load_maps(scene, detector.MAP_PREFIX, detector.persist_maps, detector.map_settings())
+    assert set(maps) == set(detector.persist_maps)
+    assert detector.weighted_score(stored) == pytest.approx(score)
+
+    other = RobustCemeteryDetector(gsd=0.5, map_store=store)
+    assert store.load_maps(scene, other.MAP_PREFIX, other.persist_maps, other.map_settings()) == ({}, None)
+
+    shutil.copy(os.path.join(ROOT, 'cemetry_image_2.png'), scene)
+    assert store.load_maps(scene, detector.MAP_PREFIX, detector.persist_maps, detector.map_settings()) == ({}, None)
+
+def test_visualization_reuses_persisted_results(scene, tmp_path, monkeypatch):
+    store = MapStore(str(tmp_path / 'maps'))
+    detector = RobustCemeteryDetector(map_store=store)
+    detector.calculate_cemetery_score(scene, raise_errors=True)
+
+    def rescore(*args, **kwargs):
+        raise AssertionError("visualization reran the pipeline")
+    monkeypatch.setattr(detector, 'score_image_array', rescore)
+    monkeypatch.setattr(detector, 'detect_regular_patterns', rescore)
+    monkeypatch.setattr(detector, 'analyze_texture_uniformity', rescore)
+    monkeypatch.chdir(tmp_path)
+    detector.visualize_analysis(scene)
+
+    assert os.path.exists(tmp_path / 'cemetery_analysis_scene.png')
@@ -0,0 +1,18 @@
+from final_cemetery_detector import RobustCemeteryDetector
+from memory_budget import detector_stages, estimate_bytes_per_pixel, parse_memory, plan_execution
+
+def test_given_tile_size_is_kept():
+    plan = plan_execution('2G', (8000, 8000), tile_size=768, max_workers=8)
+    assert plan.tile_size == 768
+    assert plan.estimated_peak_bytes <= parse_memory('2G')
+
+def test_planned_run_fits_budget():
+    plan = plan_execution('1G', (8000, 8000), max_workers=8, band_bytes_per_pixel=5)
+    assert plan.estimated_peak_bytes <= parse_memory('1G')
+
+def test_stages_follow_detector_settings():
+    plain = detector_stages(RobustCemeteryDetector(color_features=False))
+    assert 'color' not in plain
+    extended = detector_stages(RobustCemeteryDetector(align_grid=True, texture_windows=[2.0]))
+    assert 'orientation' in extended and 'texture_windows' in extended
+    assert estimate_bytes_per_pixel(extended) > estimate_bytes_per_pixel(plain)
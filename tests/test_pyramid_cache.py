@@ -0,0 +1,20 @@
+import os
+
+import numpy as np
+import pytest
+
+from image_loading import decode_image
+from pyramid_cache import PyramidCache
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.mark.parametrize('name', ['cemetry_image_1.png', 'cemetry_image_2.png'])
+def test_cached_levels_match_decoded_levels(name, tmp_path):
+    path = os.path.join(ROOT, name)
+    cache = PyramidCache((2, 3, 4, 8), root=str(tmp_path))
+
+    for level in cache.levels:
+        cached_rgb, cached_gray = cache.read_level(path, level)
+        img_rgb, img_gray = decode_image(path, level)
+        assert np.array_equal(cached_rgb, img_rgb)
+        assert np.array_equal(cached_gray, img_gray)
@@ -0,0 +1,39 @@
+import random
+
+import numpy as np
+
+from region_merging import Candidate, merge_regions, rank_candidates
+
+def _ring_grid():
+    grid = np.zeros((40, 40), dtype=np.float32)
+    grid[5:35, 5:35] = 0.9
+    grid[6:34, 6:34] = 0.0
+    grid[10:30:4, 10:30:4] = 0.5  # isolated tiles inside the ring
+    grid[37, 37] = 0.6            # and one outside it
+    return grid
+
+def test_separate_regions_are_all_kept():
+    candidates = rank_candidates(merge_regions([_ring_grid()], 0.4))
+    assert len(candidates) == 1 + 25 + 1
+    assert candidates[0].tile_count == 4 * 29
+
+def test_drop_enclosed_keeps_outside_regions():
+    candidates = rank_candidates(merge_regions([_ring_grid()], 0.4), drop_enclosed=True)
+    assert [(candidate.y0, candidate.x0) for candidate in candidates] == [(5, 5), (37, 37)]
+
+def test_drop_enclosed_matches_pairwise_check():
+    rng = random.Random(1)
+    candidates = []
+    for _ in range(2000):
+        y0, x0 = rng.randrange(500), rng.randrange(500)
+        height, width = rng.choice([1, 2, 3, 8, 40, 200]), rng.choice([1, 2, 3, 8, 40, 200])
+        candidates.append(Candidate(y0, x0, y0 + height, x0 + width, height * width, height * width,
+                                    rng.random(), 1.0))
+
+    expected = []
+    for candidate in sorted(candidates, key=lambda c: (-c.mean_score, -c.tile_count)):
+        if not any(other.y0 <= candidate.y0 and other.x0 <= candidate.x0 and
+                   candidate.y1 <= other.y1 and candidate.x1 <= other.x1 for other in expected):
+            expected.append(candidate)
+
+    assert rank_candidates(candidates, drop_enclosed=True) == expected
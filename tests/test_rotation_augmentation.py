@@ -0,0 +1,24 @@
+import os
+
+import numpy as np
+import pytest
+
+from final_cemetery_detector import RobustCemeteryDetector
+from image_loading import decode_image
+from rotation_augmentation import RotationAugmenter, d4_transforms
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_augmented_scores_match_explicit_d4_transforms():
+    img_rgb, img_gray = decode_image(os.path.join(ROOT, 'cemetry_image_1.png'))
+    result = RotationAugmenter(extra_angles=()).score_image_array(img_rgb, img_gray)
+
+    detector = RobustCemeteryDetector()
+    explicit = [detector.score_image_array(rgb, gray)[0]
+                for rgb, gray in zip(d4_transforms(img_rgb), d4_transforms(img_gray))]
+
+    assert result['transforms'] == 8
+    assert result['mean'] == pytest.approx(np.mean(explicit), abs=1e-6)
+    assert result['std'] == pytest.approx(np.std(explicit), abs=1e-6)
+    assert result['min'] == pytest.approx(min(explicit), abs=1e-6)
+    assert result['max'] == pytest.approx(max(explicit), abs=1e-6)
@@ -0,0 +1,53 @@
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from results_store import ResultsStore, tile_key
+from temporal_analysis import CARRIED, TemporalChangeDetector
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TILE = 128
+
+@pytest.fixture
+def acquisitions(tmp_path):
+    base = cv2.imread(os.path.join(ROOT, 'cemetry_image_2.png'))[:256, :256]
+    noisy = base.copy()
+    noisy[::7, ::5] ^= 1  # sensor noise: new bytes, same thumbnails
+    different = np.ascontiguousarray(base[::-1, ::-1])
+    paths = {}
+    for name, img in (('a', base), ('b', noisy), ('c', different)):
+        paths[name] = str(tmp_path / f'{name}.png')
+        cv2.imwrite(paths[name], img)
+    return paths
+
+def test_rerunning_a_pair_reads_the_store(acquisitions, tmp_path):
+    with ResultsStore(str(tmp_path / 'results.db')) as store:
+        detector = TemporalChangeDetector(store, tile_size=TILE)
+        first = detector.rescan(acquisitions['a'], acquisitions['b'])
+        second = detector.rescan(acquisitions['a'], acquisitions['b'])
+
+    assert not first['changed'].any()
+    assert second['rescored_tiles'] == 0
+    assert np.array_equal(second['scores'], first['scores'])
+
+def test_changed_tile_with_carried_row_is_rescored(acquisitions, tmp_path):
+    with ResultsStore(str(tmp_path / 'results.db')) as store:
+        detector = TemporalChangeDetector(store, tile_size=TILE)
+        detector.rescan(acquisitions['a'], acquisitions['b'])
+        assert store.get_result(acquisitions['b'], 'robust', tile=tile_key(0, 0))['message'] == CARRIED
+
+        result = detector.rescan(acquisitions['c'], acquisitions['b'])
+        assert result['changed'].all()
+        assert result['rescored_tiles'] == result['total_tiles']
+
+        img_rgb, img_gray = detector.detector.load_image(acquisitions['b'])
+        for row in range(2):
+            for col in range(2):
+                window = (slice(row * TILE, (row + 1) * TILE), slice(col * TILE, (col + 1) * TILE))
+                score, _ = detector.detector.score_image_array(img_rgb[window], img_gray[window])
+                stored = store.get_result(acquisitions['b'], 'robust', tile=tile_key(row, col))
+                assert stored['message'] is None
+                assert stored['score'] == pytest.approx(score, abs=1e-12)
+                assert result['scores'][row, col] == pytest.approx(score, abs=1e-6)
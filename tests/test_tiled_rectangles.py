@@ -0,0 +1,42 @@
+import os
+
+import numpy as np
+import pytest
+
+from final_cemetery_detector import RobustCemeteryDetector
+from image_loading import decode_image
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture(scope='module')
+def image_2_gray():
+    return decode_image(os.path.join(ROOT, 'cemetry_image_2.png'))[1]
+
+@pytest.fixture(scope='module')
+def plot_scene():
+    """Textured field with a lattice of dark plots, some inside larger dark
+    regions, spaced so that plots straddle the seams of every tile size"""
+    rng = np.random.default_rng(0)
+    size = 1500
+    img = np.full((size, size), 110, np.uint8)
+    img[150:700, 900:1450] = 60
+    img[900:1400, 100:600] = 60
+    img[rng.random((size, size)) < 0.1] = 255
+    for y in range(40, size - 60, 95):
+        for x in range(30, size - 60, 115):
+            h, w = 30 + (x % 3) * 8, 40 + (y % 4) * 6
+            img[y:y + h, x:x + w] = 20
+    return img
+
+@pytest.mark.parametrize('tile_size', [200, 256, 333, 512])
+def test_tiled_count_matches_whole_image(plot_scene, tile_size):
+    whole = RobustCemeteryDetector().detect_rectangular_structures(plot_scene)
+    tiled = RobustCemeteryDetector(rect_tile_size=tile_size).detect_rectangular_structures(plot_scene)
+    assert whole[0] > 0
+    assert tiled == whole
+
+def test_frame_sliver_is_not_a_plot(image_2_gray):
+    # A thin contour along the whole image frame has a plot-sized area but
+    # spans the image; it must not count in either path
+    count, _ = RobustCemeteryDetector().detect_rectangular_structures(image_2_gray)
+    assert count == 0
@@ -0,0 +1,264 @@
+"""
+Seam-aware tiled rectangle detection for big scenes.
+
+The adaptive threshold and contour stage of detect_rectangular_structures
+runs per tile on a thread pool, in three passes:
+
+1. Each tile thresholds its core and labels its dark (background) regions.
+2. Dark regions are joined across tile seams with union-find, and regions
+   that reach the image border are marked as outside.
+3. Each tile finds contours in a halo-padded window. Contours cut by the
+   window edge are dropped, and each remaining rectangle is kept only by
+   the tile that owns its centroid. A rectangle counts only if the dark
+   region around it is outside, which matches RETR_EXTERNAL on the whole
+   image: plots inside holes of larger structures are skipped.
+
+Rectangles are limited to a bounding box extent (max_extent) as well as an
+area, in both the whole-image and the tiled search. With a halo of at least
+rectangle_halo(max_extent, block_size) every such rectangle lies whole
+inside its owning tile's window, so the count matches the whole-image pass
+exactly. Memory is bounded by tile size times worker count.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from scene_tiling import tile_grid, tile_grid_shape
+
+def _threshold(img_gray, block_size):
+    return cv2.adaptiveThreshold(img_gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                                 cv2.THRESH_BINARY, block_size, 2)
+
+def rectangle_halo(max_extent, block_size):
+    """Smallest halo that keeps every rectangle up to max_extent pixels wide
+    clear of the untrusted threshold band of its owning tile's window"""
+    return max_extent + block_size // 2 + 1
+
+def _rectangle_contours(thresh, min_area, max_area, max_extent=None):
+    """Yield (contour, area) for every roughly rectangular external contour
+    within the area range and, if given, max_extent pixels on each side"""
+    contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    for contour in contours:
+        epsilon = 0.02 * cv2.arcLength(contour, True)
+        approx = cv2.approxPolyDP(contour, epsilon, True)
+
+        if len(approx) == 4:
+            area = cv2.contourArea(contour)
+            if area > min_area and (max_area is None or area < max_area):
+                if max_extent is None or max(cv2.boundingRect(contour)[2:]) <= max_extent:
+                    yield contour, area
+
+def _describe(contour, area, offset):
+    """(cx, cy, area, x, y, w, h) for a contour, shifted by offset (x, y)"""
+    x, y, w, h = cv2.boundingRect(contour)
+    moments = cv2.moments(contour)
+    if moments['m00'] != 0:
+        cx = moments['m10'] / moments['m00']
+        cy = moments['m01'] / moments['m00']
+    else:
+        cx, cy = x + w / 2.0, y + h / 2.0
+    return (cx + offset[0], cy + offset[1], area, x + offset[0], y + offset[1], w, h)
+
+def _threshold_core(img_gray, tile, block_size):
+    """Threshold of a tile's core, identical to the whole-image threshold"""
+    height, width = img_gray.shape
+    pad = block_size // 2 + 1
+    wy0, wx0 = max(tile.y0 - pad, 0), max(tile.x0 - pad, 0)
+    wy1, wx1 = min(tile.y1 + pad, height), min(tile.x1 + pad, width)
+    thresh = _threshold(img_gray[wy0:wy1, wx0:wx1], block_size)
+    return thresh[tile.y0 - wy0:tile.y1 - wy0, tile.x0 - wx0:tile.x1 - wx0]
+
+def _dark_labels(img_gray, tile, block_size):
+    """4-connected labels of the dark pixels in a tile core (0 = bright)"""
+    dark = (_threshold_core(img_gray, tile, block_size) == 0).astype(np.uint8)
+    return cv2.connectedComponents(dark, connectivity=4)
+
+def _dark_edges(img_gray, tile, block_size):
+    """Pass 1 for one tile: label count and the labels along its four edges"""
+    count, labels = _dark_labels(img_gray, tile, block_size)
+    return count, (labels[0].copy(), labels[-1].copy(), labels[:, 0].copy(), labels[:, -1].copy())
+
+def _join_dark_regions(tiles, grid_shape, counts, edges):
+    """Pass 2: union dark regions across seams, mark those on the image border.
+
+    counts and edges map (row, col) to a tile's pass 1 output. Returns
+    (offsets, outside): each tile's first global label, and whether each
+    global label belongs to a region reaching the image border.
+    """
+    offsets = {}
+    total = 0
+    for key in sorted(counts):
+        offsets[key] = total
+        total += counts[key]
+
+    parent = np.arange(total)
+
+    def find(label):
+        root = label
+        while parent[root] != root:
+            root = parent[root]
+        while parent[label] != root:
+            parent[label], label = root, parent[label]
+        return root
+
+    def union_edges(key_a, edge_a, key_b, edge_b):
+        touching = (edge_a > 0) & (edge_b > 0)
+        pairs = np.unique(np.stack([edge_a[touching] + offsets[key_a],
+                                    edge_b[touching] + offsets[key_b]], axis=1), axis=0)
+        for a, b in pairs:
+            root_a, root_b = find(a), find(b)
+            if root_a != root_b:
+                parent[root_b] = root_a
+
+    rows, cols = grid_shape
+    for (row, col), (top, bottom, left, right) in edges.items():
+        if col + 1 < cols:
+            union_edges((row, col), right, (row, col + 1), edges[row, col + 1][2])
+        if row + 1 < rows:
+            union_edges((row, col), bottom, (row + 1, col), edges[row + 1, col][0])
+
+    outside = np.zeros(total, dtype=bool)
+    for (row, col), (top, bottom, left, right) in edges.items():
+        offset = offsets[row, col]
+        border_labels = []
+        if row == 0:
+            border_labels.append(top)
+        if row == rows - 1:
+            border_labels.append(bottom)
+        if col == 0:
+            border_labels.append(left)
+        if col == cols - 1:
+            border_labels.append(right)
+        for labels in border_labels:
+            for label in np.unique(labels[labels > 0]):
+                outside[find(label + offset)] = True
+
+    # Flatten the forest so every label points straight at its root
+    roots = parent
+    while True:
+        next_roots = roots[roots]
+        if np.array_equal(next_roots, roots):
+            break
+        roots = next_roots
+    return offsets, outside[roots]
+
+class _DarkRegions:
+    """Scene-wide dark regions, joined across tile seams.
+
+    Built from the pass 1 outputs with build(). Without offsets and outside
+    it can only look up tile-local labels with label_at, e.g. in a worker
+    process while the join runs elsewhere.
+    """
+
+    def __init__(self, img_gray, tiles, tile_size, block_size, offsets=None, outside=None):
+        self.img_gray = img_gray
+        self.tile_size = tile_size
+        self.block_size = block_size
+        self.tiles = {(tile.row, tile.col): tile for tile in tiles}
+        self.offsets = offsets
+        self.outside = outside
+        self._cache = threading.local()
+
+    @classmethod
+    def build(cls, img_gray, tiles, tile_size, block_size, executor):
+        """Label every tile core on the executor and join the regions"""
+        counts = {}
+        edges = {}
+        for tile, (count, tile_edges) in zip(tiles, executor.map(
+                lambda tile: _dark_edges(img_gray, tile, block_size), tiles)):
+            counts[tile.row, tile.col] = count
+            edges[tile.row, tile.col] = tile_edges
+
+        grid_shape = tile_grid_shape(img_gray.shape[0], img_gray.shape[1], tile_size)
+        offsets, outside = _join_dark_regions(tiles, grid_shape, counts, edges)
+        return cls(img_gray, tiles, tile_size, block_size, offsets, outside)
+
+    def label_at(self, x, y):
+        """(tile key, tile-local dark label) of the pixel at (x, y); 0 = bright"""
+        key = (y // self.tile_size, x // self.tile_size)
+        cache = getattr(self._cache, 'labels', None)
+        if cache is None:
+            cache = self._cache.labels = {}
+        if key not in cache:
+            cache.clear()  # keep one tile of labels per thread
+            cache[key] = _dark_labels(self.img_gray, self.tiles[key], self.block_size)[1]
+        tile = self.tiles[key]
+        return key, int(cache[key][y - tile.y0, x - tile.x0])
+
+    def is_outside(self, x, y):
+        """Whether the dark pixel at (x, y) is connected to the image border"""
+        key, label = self.label_at(x, y)
+        return bool(label) and bool(self.outside[self.offsets[key] + label])
+
+def _tile_candidates(img_gray, tile, halo, block_size, min_area, max_area, max_extent=None):
+    """Rectangles owned by one tile, found in its halo-padded window.
+
+    Yields (rect, probe): probe is the (x, y) pixel just above the
+    rectangle's topmost point, which lies in the dark region around it, or
+    None when the rectangle touches the top of the image.
+    """
+    height, width = img_gray.shape
+    wy0, wx0 = max(tile.y0 - halo, 0), max(tile.x0 - halo, 0)
+    wy1, wx1 = min(tile.y1 + halo, height), min(tile.x1 + halo, width)
+    thresh = _threshold(img_gray[wy0:wy1, wx0:wx1], block_size)
+
+    # Threshold values within half a block of a cut edge differ from the
+    # whole-image pass, so contours reaching that band are not trusted
+    margin = block_size // 2 + 1
+    top = wy0 + margin if wy0 > 0 else -1
+    left = wx0 + margin if wx0 > 0 else -1
+    bottom = wy1 - margin if wy1 < height else height + 1
+    right = wx1 - margin if wx1 < width else width + 1
+
+    for contour, area in _rectangle_contours(thresh, min_area, max_area, max_extent):
+        rect = _describe(contour, area, (wx0, wy0))
+        cx, cy, area, x, y, w, h = rect
+        if y <= top or x <= left or y + h >= bottom or x + w >= right:
+            continue  # truncated by the window, the owning tile sees it whole
+        if not (tile.x0 <= cx < tile.x1 and tile.y0 <= cy < tile.y1):
+            continue  # centroid belongs to another tile
+
+        px, py = contour[np.argmin(contour[:, 0, 1]), 0]
+        px, py = int(px) + wx0, int(py) + wy0
+        yield rect, ((px, py - 1) if py > 0 else None)
+
+def _tile_rectangles(img_gray, tile, halo, block_size, min_area, max_area, max_extent, regions):
+    """Rectangles owned by one tile whose surrounding dark region is outside"""
+    return [rect for rect, probe in _tile_candidates(img_gray, tile, halo, block_size, min_area,
+                                                     max_area, max_extent)
+            if probe is None or regions.is_outside(*probe)]
+
+def detect_rectangles_tiled(img_gray, tile_size=1024, halo=128, block_size=11,
+                            min_area=100, max_area=None, max_extent=None, max_workers=None):
+    """Find rectangular plots tile by tile and merge them into one list.
+
+    Each rectangle is (cx, cy, area, x, y, w, h), with the centroid taken
+    from contour moments. They come in tile order, with cross-seam
+    duplicates removed. With max_extent the halo is widened to
+    rectangle_halo(max_extent, block_size) when needed.
+    """
+    halo = max(halo, block_size)
+    if max_extent is not None:
+        halo = max(halo, rectangle_halo(max_extent, block_size))
+    tiles = list(tile_grid(img_gray.shape[0], img_gray.shape[1], tile_size))
+
+    with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count() or 1) as executor:
+        regions = _DarkRegions.build(img_gray, tiles, tile_size, block_size, executor)
+        per_tile = executor.map(lambda tile: _tile_rectangles(img_gray, tile, halo, block_size, min_area,
+                                                              max_area, max_extent, regions), tiles)
+
+        rectangles = []
+        seen = set()
+        for tile_rectangles in per_tile:
+            for rect in tile_rectangles:
+                key = rect[2:]  # same area and bounding box means the same contour
+                if key not in seen:
+                    seen.add(key)
+                    rectangles.append(rect)
+
+    return rectangles
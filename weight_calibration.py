@@ -0,0 +1,234 @@
+"""
+Weight calibration for the cemetery score.
+
+Works on a feature matrix (images x features) read from the results store, so
+candidate weightings are evaluated without touching any pixels. Thousands of
+weight vectors are scored in one matrix product, and a logistic model can be
+fitted on the same matrix. Besides the per-weighting AUC and accuracy report,
+the full ROC curves of the default, best and logistic weightings are written
+to a second CSV.
+
+Usage:
+    python weight_calibration.py --labels labels.csv --detector robust
+
+labels.csv needs an `image` column (path or file name) and a `label` column
+(1 = cemetery, 0 = not a cemetery).
+"""
+
+import argparse
+import csv
+import os
+
+import numpy as np
+from scipy.stats import rankdata
+
+from results_store import ResultsStore, DEFAULT_STORE_PATH
+
+# Feature order per detector, matching the weights in calculate_cemetery_score
+DETECTOR_FEATURES = {
+    'cemetery': ['regularity_score', 'texture_uniformity', 'pattern_consistency',
+                 'rectangular_density', 'green_percentage', 'color_uniformity'],
+    'simple': ['regularity_score', 'texture_uniformity', 'pattern_regularity',
+               'rectangular_density', 'green_percentage', 'color_uniformity'],
+    'robust': ['regularity_score', 'texture_uniformity', 'line_regularity',
+               'rectangular_density', 'green_percentage', 'color_uniformity']
+}
+
+DEFAULT_WEIGHTS = np.array([0.25, 0.20, 0.20, 0.15, 0.10, 0.10])
+
+def load_labels(labels_path):
+    """Read image labels from a CSV with `image` and `label` columns"""
+    labels = {}
+    with open(labels_path, newline='') as f:
+        for row in csv.DictReader(f):
+            labels[row['image'].strip()] = int(row['label'])
+    return labels
+
+def build_feature_matrix(store, detector, labels):
+    """Build (images, X, y) for every stored result that has a label.
+
+    Labels may be keyed by full path or by file name. Rectangular density is
+    clipped to 1.0 as in the score formula.
+    """
+    feature_names = DETECTOR_FEATURES[detector]
+    images, rows, targets = [], [], []
+
+    for result in store.iter_results(detector=detector):
+        if result['tile']:
+            continue
+        scene = result['scene']
+        label = labels.get(scene, labels.get(os.path.basename(scene)))
+        if label is None:
+            continue
+        features = result['features']
+        if not all(name in features for name in feature_names):
+            continue
+
+        images.append(scene)
+        rows.append([features[name] for name in feature_names])
+        targets.append(label)
+
+    X = np.array(rows, dtype=np.float64).reshape(-1, len(feature_names))
+    X[:, feature_names.index('rectangular_density')] = np.minimum(
+        X[:, feature_names.index('rectangular_density')], 1.0)
+    y = np.array(targets, dtype=np.int8)
+
+    return images, X, y
+
+def random_weightings(n_weightings, n_features, seed=0):
+    """Sample weight vectors uniformly on the simplex, default weights first"""
+    rng = np.random.default_rng(seed)
+    W = rng.dirichlet(np.ones(n_features), size=n_weightings)
+    W[0] = DEFAULT_WEIGHTS[:n_features]
+    return W
+
+def evaluate_weightings(X, y, W, threshold=0.5):
+    """Evaluate every weighting in W (weightings x features) at once.
+
+    Returns a dict of per-weighting arrays: ROC AUC, accuracy at the given
+    threshold, and the best achievable accuracy with its threshold.
+    """
+    S = X @ W.T                                   # images x weightings
+    y = np.asarray(y, dtype=bool)
+    n_pos = np.count_nonzero(y)
+    n_neg = len(y) - n_pos
+
+    # ROC AUC from the Mann-Whitney U statistic, ties get average ranks
+    if n_pos and n_neg:
+        ranks = rankdata(S, axis=0)
+        auc = (ranks[y].sum(axis=0) - n_pos * (n_pos + 1) / 2.0) / (n_pos * n_neg)
+    else:
+        auc = np.full(W.shape[0], np.nan)
+
+    accuracy = np.mean((S >= threshold) == y[:, None], axis=0)
+
+    # Best accuracy: predict the top-k images positive for every k
+    order = np.argsort(-S, axis=0)
+    y_sorted = y[order]
+    tp = np.cumsum(y_sorted, axis=0)
+    fp = np.cumsum(~y_sorted, axis=0)
+    correct = np.vstack([np.full((1, W.shape[0]), n_neg), tp + (n_neg - fp)])
+    best_k = np.argmax(correct, axis=0)
+    best_accuracy = correct[best_k, np.arange(W.shape[0])] / len(y)
+    sorted_scores = np.take_along_axis(S, order, axis=0)
+    best_threshold = np.where(best_k > 0,
+                              sorted_scores[np.maximum(best_k - 1, 0), np.arange(W.shape[0])],
+                              np.inf)
+
+    return {
+        'auc': auc,
+        'accuracy': accuracy,
+        'best_accuracy': best_accuracy,
+        'best_threshold': best_threshold
+    }
+
+def roc_curve(scores, y):
+    """ROC curve points (fpr, tpr, thresholds) for a single score vector"""
+    y = np.asarray(y, dtype=bool)
+    order = np.argsort(-scores)
+    thresholds = scores[order]
+    tp = np.concatenate([[0], np.cumsum(y[order])])
+    fp = np.concatenate([[0], np.cumsum(~y[order])])
+    tpr = tp / max(np.count_nonzero(y), 1)
+    fpr = fp / max(np.count_nonzero(~y), 1)
+    return fpr, tpr, np.concatenate([[np.inf], thresholds])
+
+def fit_logistic(X, y, l2=1e-3, n_iter=50):
+    """Fit a logistic model with Newton's method (IRLS).
+
+    Returns (coefficients, intercept). Coefficients are in the same feature
+    order as X, so their normalized positive part is a candidate weighting.
+    """
+    Xb = np.hstack([X, np.ones((X.shape[0], 1))])
+    beta = np.zeros(Xb.shape[1])
+    penalty = l2 * np.eye(Xb.shape[1])
+    penalty[-1, -1] = 0  # do not penalize the intercept
+
+    for _ in range(n_iter):
+        p = 1.0 / (1.0 + np.exp(-(Xb @ beta)))
+        gradient = Xb.T @ (p - y) + penalty @ beta
+        hessian = (Xb * (p * (1 - p))[:, None]).T @ Xb + penalty
+        step = np.linalg.solve(hessian, gradient)
+        beta -= step
+        if np.max(np.abs(step)) < 1e-8:
+            break
+
+    return beta[:-1], beta[-1]
+
+def write_calibration_report(output_path, feature_names, W, metrics):
+    """Write one CSV row per weighting, best AUC first"""
+    order = np.argsort(-np.nan_to_num(metrics['auc'], nan=-1.0), kind='stable')
+    with open(output_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['rank'] + [f"w_{name}" for name in feature_names] +
+                        ['auc', 'accuracy', 'best_accuracy', 'best_threshold'])
+        for rank, i in enumerate(order, 1):
+            writer.writerow([rank] + [f"{w:.4f}" for w in W[i]] +
+                            [f"{metrics['auc'][i]:.4f}", f"{metrics['accuracy'][i]:.4f}",
+                             f"{metrics['best_accuracy'][i]:.4f}",
+                             f"{metrics['best_threshold'][i]:.4f}"])
+
+def write_roc_curves(output_path, curves, y):
+    """Write the ROC points of named score vectors ({name: scores}) to one CSV"""
+    with open(output_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['weighting', 'threshold', 'fpr', 'tpr'])
+        for name, scores in curves.items():
+            fpr, tpr, thresholds = roc_curve(np.asarray(scores), y)
+            for threshold, false_rate, true_rate in zip(thresholds, fpr, tpr):
+                writer.writerow([name, f"{threshold:.4f}", f"{false_rate:.4f}", f"{true_rate:.4f}"])
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate cemetery score weights from stored results")
+    parser.add_argument('--labels', required=True, help="CSV with image,label columns")
+    parser.add_argument('--store', default=DEFAULT_STORE_PATH, help="Results database")
+    parser.add_argument('--detector', default='robust', choices=sorted(DETECTOR_FEATURES))
+    parser.add_argument('--weightings', type=int, default=5000, help="Number of random weightings")
+    parser.add_argument('--threshold', type=float, default=0.5, help="Decision threshold for accuracy")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--logistic', action='store_true', help="Also fit a logistic model")
+    parser.add_argument('--output', default='weight_calibration.csv')
+    parser.add_argument('--roc-output', default='weight_calibration_roc.csv',
+                        help="ROC curves of the default, best and logistic weightings")
+    args = parser.parse_args()
+
+    feature_names = DETECTOR_FEATURES[args.detector]
+    with ResultsStore(args.store) as store:
+        images, X, y = build_feature_matrix(store, args.detector, load_labels(args.labels))
+
+    if len(images) == 0:
+        print("❌ No labelled results found in the store")
+        return
+
+    print(f"📊 {len(images)} labelled images ({int(y.sum())} cemeteries)")
+
+    W = random_weightings(args.weightings, len(feature_names), seed=args.seed)
+    metrics = evaluate_weightings(X, y, W, threshold=args.threshold)
+    write_calibration_report(args.output, feature_names, W, metrics)
+
+    best = int(np.nanargmax(metrics['auc'])) if not np.all(np.isnan(metrics['auc'])) else 0
+    curves = {'default': X @ W[0], 'best': X @ W[best]}
+    print(f"\n🎯 Default weights: AUC {metrics['auc'][0]:.4f}, "
+          f"accuracy {metrics['accuracy'][0]:.4f}")
+    print(f"🏆 Best weighting:  AUC {metrics['auc'][best]:.4f}, "
+          f"accuracy {metrics['accuracy'][best]:.4f}")
+    for name, weight in zip(feature_names, W[best]):
+        print(f"   • {name.replace('_', ' ').title()}: {weight:.4f}")
+
+    if args.logistic:
+        coefficients, intercept = fit_logistic(X, y)
+        probabilities = 1.0 / (1.0 + np.exp(-(X @ coefficients + intercept)))
+        logistic_metrics = evaluate_weightings(probabilities[:, None], y, np.ones((1, 1)))
+        print(f"\n📈 Logistic model: AUC {logistic_metrics['auc'][0]:.4f}, "
+              f"accuracy {logistic_metrics['accuracy'][0]:.4f}")
+        for name, coefficient in zip(feature_names, coefficients):
+            print(f"   • {name.replace('_', ' ').title()}: {coefficient:.4f}")
+        print(f"   • Intercept: {intercept:.4f}")
+        curves['logistic'] = probabilities
+
+    write_roc_curves(args.roc_output, curves, y)
+    print(f"\n✅ Report saved as: {args.output}")
+    print(f"✅ ROC curves saved as: {args.roc_output}")
+
+if __name__ == "__main__":
+    main()